@@ -1,18 +1,102 @@
 # admin_routes.py
-from flask import Blueprint, render_template, request
-from db import SessionLocal
+from flask import Blueprint, render_template, request, jsonify, Response
+from db import get_db
 from models import Recommendation, Feedback, Product, ModelVersion
+from analytics import rollup_summary, backfill_rollups
+from metrics import render_prometheus
+from memory_registry import memory_report
+from shadow import shadow_summary
+from drift_monitor import drift_summary, run_drift_check, build_reference, DRIFT_WINDOW_DAYS, DRIFT_REFERENCE_PATH
+import click
+from sqlalchemy.orm import load_only
 from sqlalchemy import desc
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
 @admin_bp.route("/")
 def dashboard():
-    db = SessionLocal()
-    try:
-        recs = db.query(Recommendation).order_by(desc(Recommendation.created_at)).limit(50).all()
-        feedbacks = db.query(Feedback).order_by(desc(Feedback.created_at)).limit(50).all()
-        models = db.query(ModelVersion).all()
-        return render_template("admin_dashboard.html", recs=recs, feedbacks=feedbacks, models=models)
-    finally:
-        db.close()
+    db = get_db()
+    recs = db.query(Recommendation).order_by(desc(Recommendation.created_at)).limit(50).all()
+    feedbacks = db.query(Feedback).order_by(desc(Feedback.created_at)).limit(50).all()
+    # only columns every deployed schema has (older databases lack model_type)
+    models = db.query(ModelVersion).options(
+        load_only(ModelVersion.model_id, ModelVersion.model_name, ModelVersion.version)
+    ).all()
+    shadow = shadow_summary(db)
+    drift = drift_summary(db)
+    return render_template("admin_dashboard.html", recs=recs, feedbacks=feedbacks, models=models,
+                           shadow=shadow, drift=drift, model_names={m.model_id: m.model_name for m in models})
+
+
+# ──────────────────────────────────────────────
+# ANALYTICS (reads rollup tables only)
+# ──────────────────────────────────────────────
+@admin_bp.route("/analytics")
+def analytics():
+    days = request.args.get("days", 30, type=int)
+    db = get_db()
+    summary = rollup_summary(db, days=days)
+    models = dict(db.query(ModelVersion.model_id, ModelVersion.model_name).all())
+    return render_template("admin_analytics.html", summary=summary, models=models, days=days)
+
+
+@admin_bp.route("/analytics.json")
+def analytics_json():
+    days = request.args.get("days", 30, type=int)
+    db = get_db()
+    return jsonify(rollup_summary(db, days=days))
+
+
+# ──────────────────────────────────────────────
+# PROMETHEUS METRICS (per-process stage timings)
+# ──────────────────────────────────────────────
+@admin_bp.route("/metrics")
+def metrics():
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+# ──────────────────────────────────────────────
+# MEMORY FOOTPRINT (models / encoder / product frames / TF-IDF index)
+# ──────────────────────────────────────────────
+@admin_bp.route("/memory")
+def memory():
+    # models load lazily on the first prediction; ?load=1 forces them in so the report is complete
+    if request.args.get("load") == "1":
+        from feature_engineering import load_models, load_encoder
+        load_encoder()
+        load_models()
+    return jsonify(memory_report())
+
+
+# ──────────────────────────────────────────────
+# CLI: flask admin backfill-rollups
+# ──────────────────────────────────────────────
+@admin_bp.cli.command("backfill-rollups")
+def backfill_rollups_command():
+    """Rebuild analytics rollups from historical recommendations and feedback."""
+    db = get_db()
+    count = backfill_rollups(db)
+    print(f"✅ Backfilled {count} rollup rows.")
+
+
+# ──────────────────────────────────────────────
+# CLI: input drift (see drift_monitor.py)
+# ──────────────────────────────────────────────
+@admin_bp.cli.command("drift-reference")
+@click.option("--csv", "csv_path", default=None, help="training survey export (default: the encoder's training CSV)")
+def drift_reference_command(csv_path):
+    """Snapshot the encoder's training answer distribution for drift checks."""
+    snapshot = build_reference(csv_path) if csv_path else build_reference()
+    print(f"✅ {len(snapshot['columns'])} columns from {snapshot['rows']} rows → {DRIFT_REFERENCE_PATH}")
+
+
+@admin_bp.cli.command("drift-check")
+@click.option("--days", type=int, default=DRIFT_WINDOW_DAYS, show_default=True)
+def drift_check_command(days):
+    """Score recent live survey answers against the reference snapshot (run periodically)."""
+    db = get_db()
+    scores = run_drift_check(db, days=days)
+    drifted = [s for s in scores if s.divergence is not None]
+    print(f"✅ Scored {len(drifted)} of {len(scores)} columns over the last {days} days.")
+    for s in sorted(drifted, key=lambda s: -s.divergence)[:5]:
+        print(f"   {s.column_name}: JS={s.divergence:.3f} unknown={s.unknown_rate:.1%}")
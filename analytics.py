@@ -0,0 +1,146 @@
+# analytics.py
+from datetime import date, timedelta
+from collections import defaultdict
+
+from sqlalchemy import func, case
+from sqlalchemy.exc import IntegrityError
+
+from models import DailyModelRollup, Recommendation, Feedback
+
+COUNTERS = ("recommendations", "feedback", "thumbs_up")
+
+
+# ──────────────────────────────────────────────
+# INCREMENTAL UPDATES (called on every write)
+# ──────────────────────────────────────────────
+def bump_rollup(db, day, model_id, model_prediction, **deltas):
+    """
+    Add `deltas` (e.g. recommendations=1) to the rollup row for
+    (day, model_id, model_prediction), creating it if needed.
+    Does not commit — the caller owns the transaction.
+    """
+    if model_id is None:
+        return
+
+    key = {"day": day, "model_id": model_id, "model_prediction": model_prediction or ""}
+    values = {getattr(DailyModelRollup, k): getattr(DailyModelRollup, k) + v for k, v in deltas.items()}
+
+    query = db.query(DailyModelRollup).filter_by(**key)
+    if query.update(values, synchronize_session=False):
+        return
+
+    try:
+        with db.begin_nested():
+            db.add(DailyModelRollup(**key, **deltas))
+    except IntegrityError:
+        # another request created the row first → just increment it
+        query.update(values, synchronize_session=False)
+
+
+def record_recommendation(db, rec):
+    bump_rollup(db, date.today(), rec.model_id, rec.model_prediction, recommendations=1)
+
+
+def record_feedback(db, rec, rating):
+    if rec is None:
+        return
+    bump_rollup(
+        db, date.today(), rec.model_id, rec.model_prediction,
+        feedback=1, thumbs_up=1 if rating == 1 else 0
+    )
+
+
+# ──────────────────────────────────────────────
+# BACKFILL (historical data, full scan — run once)
+# ──────────────────────────────────────────────
+def _as_date(value):
+    # func.date() is a DATE on MySQL but a string on SQLite
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def backfill_rollups(db):
+    """Rebuild every rollup row from recommendations + feedback. Returns row count."""
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    prediction = func.coalesce(Recommendation.model_prediction, "")
+
+    rec_rows = (
+        db.query(func.date(Recommendation.created_at), Recommendation.model_id, prediction, func.count())
+        .filter(Recommendation.model_id.isnot(None))
+        .group_by(func.date(Recommendation.created_at), Recommendation.model_id, prediction)
+    )
+    for day, model_id, label, count in rec_rows:
+        totals[(_as_date(day), model_id, label)]["recommendations"] += count
+
+    fb_rows = (
+        db.query(
+            func.date(Feedback.created_at), Recommendation.model_id, prediction,
+            func.count(), func.sum(case((Feedback.rating == 1, 1), else_=0))
+        )
+        .join(Recommendation, Recommendation.rec_id == Feedback.rec_id)
+        .filter(Recommendation.model_id.isnot(None))
+        .group_by(func.date(Feedback.created_at), Recommendation.model_id, prediction)
+    )
+    for day, model_id, label, count, ups in fb_rows:
+        totals[(_as_date(day), model_id, label)]["feedback"] += count
+        totals[(_as_date(day), model_id, label)]["thumbs_up"] += int(ups or 0)
+
+    db.query(DailyModelRollup).delete()
+    for (day, model_id, label), counters in totals.items():
+        db.add(DailyModelRollup(day=day, model_id=model_id, model_prediction=label, **counters))
+    db.commit()
+    return len(totals)
+
+
+# ──────────────────────────────────────────────
+# READS (rollups only — never touches raw tables)
+# ──────────────────────────────────────────────
+def rollup_summary(db, days=30):
+    since = date.today() - timedelta(days=days - 1)
+
+    per_label = (
+        db.query(
+            DailyModelRollup.model_id, DailyModelRollup.model_prediction,
+            *(func.sum(getattr(DailyModelRollup, c)) for c in COUNTERS)
+        )
+        .filter(DailyModelRollup.day >= since)
+        .group_by(DailyModelRollup.model_id, DailyModelRollup.model_prediction)
+        .order_by(DailyModelRollup.model_id, DailyModelRollup.model_prediction)
+        .all()
+    )
+    daily = (
+        db.query(
+            DailyModelRollup.day,
+            *(func.sum(getattr(DailyModelRollup, c)) for c in COUNTERS)
+        )
+        .filter(DailyModelRollup.day >= since)
+        .group_by(DailyModelRollup.day)
+        .order_by(DailyModelRollup.day)
+        .all()
+    )
+
+    def thumbs_up_rate(ups, feedback):
+        return round(ups / feedback, 3) if feedback else None
+
+    return {
+        "since": since.isoformat(),
+        "per_label": [
+            {
+                "model_id": model_id,
+                "model_prediction": label or None,
+                "recommendations": int(recs or 0),
+                "feedback": int(fb or 0),
+                "thumbs_up": int(ups or 0),
+                "thumbs_up_rate": thumbs_up_rate(int(ups or 0), int(fb or 0)),
+            }
+            for model_id, label, recs, fb, ups in per_label
+        ],
+        "daily": [
+            {
+                "day": _as_date(day).isoformat(),
+                "recommendations": int(recs or 0),
+                "feedback": int(fb or 0),
+                "thumbs_up": int(ups or 0),
+            }
+            for day, recs, fb, ups in daily
+        ],
+    }
@@ -1,5 +1,7 @@
+import os
+import logging
 from flask import Flask, render_template, request, redirect, url_for, session, flash
-from db import init_db, SessionLocal
+from db import init_db, get_db, close_db
 from auth import create_user, authenticate_user
 
 # BLUEPRINT IMPORTS
@@ -9,13 +11,22 @@ from diagnostic_routes import diagnostic_bp
 from admin_routes import admin_bp
 from survey_routes import survey_bp
 from feedback_route import feedback_bp
+from asset_routes import assets_bp
+from upload_store import MAX_UPLOAD_BYTES
+
+# LOGGING (DEBUG shows the per-stage prediction details that used to be printed)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper())
 
 # APP INIT
 app = Flask(__name__, static_folder="static", template_folder="templates")
 app.secret_key = "supersecret"  # use .env in production
+# reject oversized request bodies before werkzeug spools them (upload_store enforces the image limit)
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + 1024 * 1024
 
 # DB INIT
 init_db()
+# one session per request, opened lazily by get_db() and committed / rolled back here
+app.teardown_appcontext(close_db)
 
 # REGISTER BLUEPRINTS
 app.register_blueprint(user_bp)
@@ -24,6 +35,7 @@ app.register_blueprint(recommend_bp)
 app.register_blueprint(diagnostic_bp)
 app.register_blueprint(admin_bp)
 app.register_blueprint(feedback_bp)
+app.register_blueprint(assets_bp)
 
 # ------------------------
 # ROUTES
@@ -41,7 +53,7 @@ def register():
         name = request.form.get('name')
         email = request.form.get('email')
         password = request.form.get('password')
-        user = create_user(name, email, password)
+        user = create_user(get_db(), name, email, password)
         if user is None:
             flash("Email already registered.", "warning")
             return redirect(url_for('register'))
@@ -55,7 +67,7 @@ def login():
     if request.method == 'POST':
         email = request.form.get('email')
         password = request.form.get('password')
-        user = authenticate_user(email, password)
+        user = authenticate_user(get_db(), email, password)
         if user:
             session['user_id'] = user.user_id
             flash("Login successful!", "success")
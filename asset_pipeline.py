@@ -0,0 +1,221 @@
+# asset_pipeline.py
+"""
+Build step for static assets: content-hashed copies, image variants, precompression.
+
+    flask assets build
+
+For every file under static/ (uploads excluded) writes static/dist/<name>.<hash>.<ext>
+and records it in static/dist/manifest.json. Large PNG/JPEG images also get WebP and
+AVIF versions plus resized widths; text assets get .gz (and .br when the optional
+`brotli` package is installed) next to them. Templates resolve names through
+asset_url() / image_srcset() / background_rules(), which fall back to plain /static
+URLs when no build exists.
+
+A rebuild keeps the files of the previous manifest (pages rendered before it still
+reference them) and prunes anything older; running workers pick up the new manifest
+when its mtime changes.
+"""
+import os
+import io
+import json
+import gzip
+import hashlib
+import logging
+
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = "static"
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+SKIP_DIRS = {"uploads", "dist"}
+
+VARIANT_MIN_BYTES = 100 * 1024          # only images at least this large get variants
+VARIANT_WIDTHS = (480, 960, 1920)       # only widths smaller than the original are produced
+IMAGE_QUALITY = {"webp": 80, "avif": 60, "jpeg": 82}
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt")
+ENCODING_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+def _fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _hashed_name(name, data, ext=None):
+    stem, original_ext = os.path.splitext(name)
+    return f"{stem}.{_fingerprint(data)}{ext or original_ext}"
+
+
+def _write(rel_path, data):
+    path = os.path.join(DIST_DIR, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path):  # content-addressed: same name ⇒ same bytes
+        with open(path, "wb") as f:
+            f.write(data)
+    return rel_path.replace(os.sep, "/")
+
+
+def _encode(img, fmt):
+    buf = io.BytesIO()
+    if fmt == "jpeg" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    img.save(buf, fmt.upper(), quality=IMAGE_QUALITY.get(fmt, 85), optimize=True)
+    return buf.getvalue()
+
+
+def _image_variants(name, data):
+    """(fmt / fmt@width → hashed path, for WebP, AVIF and the source format; original width)."""
+    img = Image.open(io.BytesIO(data))
+    img.load()
+    source_fmt = (img.format or "png").lower()
+    formats = ["webp"] + (["avif"] if features.check("avif") else [])
+
+    stem = os.path.splitext(name)[0]
+    variants = {}
+    sizes = [(None, img)] + [
+        (width, img.resize((width, round(img.height * width / img.width)), Image.LANCZOS))
+        for width in VARIANT_WIDTHS if width < img.width
+    ]
+    for width, resized in sizes:
+        suffix = f"@{width}" if width else ""
+        for fmt in formats + ([source_fmt] if width else []):
+            encoded = _encode(resized, fmt)
+            ext = ".jpg" if fmt == "jpeg" else f".{fmt}"
+            variants[f"{fmt}{suffix}"] = _write(_hashed_name(f"{stem}-{width or 'full'}", encoded, ext), encoded)
+    return variants, img.width
+
+
+def _precompress(rel_path, data):
+    encodings = []
+    path = os.path.join(DIST_DIR, rel_path)
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    encodings.append("gzip")
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+        encodings.append("br")
+    return encodings
+
+
+def _referenced(manifest):
+    """Every dist file a manifest points at (hashed copies, variants, precompressed copies)."""
+    paths = set()
+    for entry in manifest.values():
+        paths.add(entry["path"])
+        paths.update(entry.get("variants", {}).values())
+        paths.update(entry["path"] + ENCODING_SUFFIX[enc] for enc in entry.get("encodings", []))
+    return paths
+
+
+def _prune(keep):
+    removed = 0
+    for root, _, files in os.walk(DIST_DIR):
+        for filename in files:
+            path = os.path.join(root, filename)
+            rel = os.path.relpath(path, DIST_DIR).replace(os.sep, "/")
+            if rel != "manifest.json" and rel not in keep:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def build_assets(static_dir=STATIC_DIR):
+    """
+    Update static/dist and its manifest. Returns the manifest dict.
+    Files of the previous build stay (content-addressed names never collide) so pages
+    rendered against it keep working; anything older is pruned.
+    """
+    previous = _read_manifest()
+    os.makedirs(DIST_DIR, exist_ok=True)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if not (root == static_dir and d in SKIP_DIRS))
+        for filename in sorted(files):
+            src = os.path.join(root, filename)
+            name = os.path.relpath(src, static_dir).replace(os.sep, "/")
+            with open(src, "rb") as f:
+                data = f.read()
+
+            entry = {"path": _write(_hashed_name(name, data), data), "bytes": len(data)}
+            ext = os.path.splitext(filename)[1].lower()
+            if ext in (".png", ".jpg", ".jpeg") and len(data) >= VARIANT_MIN_BYTES:
+                entry["variants"], entry["width"] = _image_variants(name, data)
+            if ext in COMPRESSIBLE:
+                entry["encodings"] = _precompress(entry["path"], data)
+            manifest[name] = entry
+
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)  # readers see the old or the new manifest, never half of one
+    _prune(_referenced(manifest) | _referenced(previous))
+    return manifest
+
+
+# ──────────────────────────────────────────────
+# LOOKUP (templates)
+# ──────────────────────────────────────────────
+_manifest = None
+_manifest_mtime = None
+_encodings = {}
+
+
+def load_manifest():
+    """The current manifest, re-read whenever `flask assets build` replaces the file."""
+    global _manifest, _manifest_mtime, _encodings
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if _manifest is None or mtime != _manifest_mtime:
+        manifest = _read_manifest()
+        if not manifest:
+            logger.info("no %s — serving unfingerprinted /static assets", MANIFEST_PATH)
+        _encodings = {entry["path"]: entry["encodings"] for entry in manifest.values() if entry.get("encodings")}
+        _manifest, _manifest_mtime = manifest, mtime
+    return _manifest
+
+
+def resolve(name, fmt=None, width=None):
+    """Hashed dist path for `name` (optionally a format / width variant), or None if not built."""
+    entry = load_manifest().get(name)
+    if entry is None:
+        return None
+    if fmt or width:
+        variants = entry.get("variants", {})
+        source_fmt = os.path.splitext(name)[1].lstrip(".").lower().replace("jpg", "jpeg")
+        key = f"{fmt or source_fmt}{f'@{width}' if width else ''}"
+        if key in variants:
+            return variants[key]
+    return entry["path"]
+
+
+def widths(name):
+    """Resized widths built for `name`, ascending, then the original width ([] when none)."""
+    entry = load_manifest().get(name)
+    if entry is None or "width" not in entry:
+        return []
+    built = {int(key.split("@")[1]) for key in entry.get("variants", {}) if "@" in key}
+    return sorted(built) + [entry["width"]]
+
+
+def encodings(dist_path):
+    """Precompressed encodings available for a hashed dist path."""
+    load_manifest()
+    return _encodings.get(dist_path, [])
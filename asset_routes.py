@@ -0,0 +1,112 @@
+# asset_routes.py
+"""
+Fingerprinted static assets.
+
+    flask assets build        # static/ → static/dist/ + manifest.json (run on deploy)
+
+/assets/<hashed path> is served with a one-year immutable Cache-Control (the name
+changes whenever the bytes do) and picks a precompressed .br / .gz copy from
+Accept-Encoding. Templates call asset_url() / image_srcset() / background_rules()
+instead of url_for('static'); the resized widths reach the browser through srcset
+and width media queries.
+"""
+import os
+import mimetypes
+
+from flask import Blueprint, request, send_from_directory, url_for, abort
+from markupsafe import Markup
+
+from asset_pipeline import DIST_DIR, ENCODING_SUFFIX, build_assets, resolve, encodings, widths
+
+assets_bp = Blueprint("assets", __name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@assets_bp.route("/assets/<path:filename>")
+def serve(filename):
+    if filename == "manifest.json":
+        abort(404)
+    accepted = request.accept_encodings
+    served = filename
+    encoding = next((enc for enc in ("br", "gzip") if enc in encodings(filename) and accepted[enc]), None)
+    if encoding:
+        served = filename + ENCODING_SUFFIX[encoding]
+
+    response = send_from_directory(
+        os.path.abspath(DIST_DIR), served, max_age=31536000,
+        mimetype=mimetypes.guess_type(filename)[0],
+    )
+    response.headers["Cache-Control"] = IMMUTABLE
+    if encodings(filename):
+        response.vary.add("Accept-Encoding")
+    if encoding:
+        response.content_encoding = encoding
+    return response
+
+
+# ──────────────────────────────────────────────
+# TEMPLATE HELPERS
+# ──────────────────────────────────────────────
+@assets_bp.app_template_global()
+def asset_url(filename, fmt=None, width=None):
+    """Fingerprinted URL for static/<filename> (or one of its variants); plain /static when not built."""
+    path = resolve(filename, fmt=fmt, width=width)
+    if path is None:
+        return url_for("static", filename=filename)
+    return url_for("assets.serve", filename=path)
+
+
+@assets_bp.app_template_global()
+def background_image(filename, width=None):
+    """
+    style="" declarations for a background: a plain url() for older browsers, then an
+    image-set() preferring the AVIF / WebP variants when the build produced them.
+    """
+    fallback = asset_url(filename, width=width)
+    declarations = f"background-image: url('{fallback}');"
+    candidates = [(fmt, resolve(filename, fmt=fmt, width=width)) for fmt in ("avif", "webp")]
+    options = [
+        f"url('{url_for('assets.serve', filename=path)}') type('image/{fmt}')"
+        for fmt, path in candidates if path and path.endswith(f".{fmt}")
+    ]
+    if options:
+        options.append(f"url('{fallback}') type('{mimetypes.guess_type(filename)[0]}')")
+        declarations += f" background-image: image-set({', '.join(options)});"
+    return Markup(declarations)
+
+
+@assets_bp.app_template_global()
+def image_srcset(filename, fmt=None):
+    """srcset="" value over the resized widths and the original; "" when the build made none."""
+    built = widths(filename)
+    candidates = [
+        f"{asset_url(filename, fmt=fmt, width=width if width != built[-1] else None)} {width}w"
+        for width in built
+    ]
+    return ", ".join(candidates)
+
+
+@assets_bp.app_template_global()
+def background_rules(selector, filename):
+    """
+    CSS for a full-bleed background on `selector`: the original image by default, and a
+    resized width on viewports no wider than it at 1x pixel density, or half as wide at 2x.
+    """
+    rules = [f"{selector} {{ {background_image(filename)} }}"]
+    for width in reversed(widths(filename)[:-1]):  # widest first, so the narrowest match wins
+        query = f"(max-width: {width}px) and (max-resolution: 1dppx), (max-width: {width // 2}px)"
+        rules.append(f"@media {query} {{ {selector} {{ {background_image(filename, width)} }} }}")
+    return Markup("\n".join(rules))
+
+
+# ──────────────────────────────────────────────
+# CLI
+# ──────────────────────────────────────────────
+@assets_bp.cli.command("build")
+def build_command():
+    """Write fingerprinted copies, image variants and precompressed CSS to static/dist."""
+    manifest = build_assets()
+    variants = sum(len(entry.get("variants", {})) for entry in manifest.values())
+    compressed = sum(len(entry.get("encodings", [])) for entry in manifest.values())
+    print(f"✅ {len(manifest)} assets, {variants} image variants, {compressed} precompressed files → {DIST_DIR}")
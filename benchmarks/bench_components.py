@@ -0,0 +1,183 @@
+# benchmarks/bench_components.py
+"""
+Component microbenchmarks: encoder, predictors and ranker.
+
+    python benchmarks/bench_components.py                          # all components, batches 1/32/1024
+    python benchmarks/bench_components.py --batch-sizes 1 32 -c fetch_rule predict_porosity
+    python benchmarks/bench_components.py --save-baseline          # record benchmarks/baseline.json
+    python benchmarks/bench_components.py --threshold 0.15         # fail on >15 % p50 regression
+
+Uses DATABASE_URL if set, otherwise the SQLite restore from local_db.py.
+"""
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import (  # noqa: E402
+    setup_repo, quiet, SyntheticSurveys, time_call, measure_allocations,
+    summarize, run_metadata, save_json, compare_to_baseline,
+)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "components.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+def build_components(models):
+    """name → fn(batch) for every component under test. Imports happen after setup_repo()."""
+    import numpy as np
+    import pandas as pd
+    from feature_engineering import encode_survey_data, load_encoder
+    from predictions import predict_dnn, predict_porosity, predict_breakage, recommend_ingredients_grouped
+    from recommendation_routes import fetch_rule
+    from db import SessionLocal
+
+    encoder = load_encoder()
+    db = SessionLocal.session_factory()  # one session for the whole run, like a request
+    rule_models = ["porosity_model", "breakage_model", "disease_model"]
+    rule_classes = {"porosity_model": 3, "breakage_model": 5, "disease_model": 10}
+
+    def encoder_transform(batch):
+        df = pd.DataFrame(batch)
+        df["Consumed_water_per_day_L"] = pd.to_numeric(df["Consumed_water_per_day_L"], errors="coerce").fillna(0)
+        return encoder.transform(df)
+
+    def encoder_transform_batch(batch):
+        df = pd.DataFrame(batch)
+        df["Consumed_water_per_day_L"] = pd.to_numeric(df["Consumed_water_per_day_L"], errors="coerce").fillna(0)
+        return encoder.transform_batch(df)
+
+    def dnn_batch(batch):
+        X = encoder_transform(batch).drop(columns=["Current_Hair_condition"], errors="ignore").to_numpy()
+        return models["dnn_model"].predict(X, verbose=0)
+
+    def ranker(batch):
+        return [recommend_ingredients_grouped(db, "dnn_model", i % 4, top_n=3) for i in range(len(batch))]
+
+    def rules(batch):
+        out = []
+        for i in range(len(batch)):
+            model_type = rule_models[i % len(rule_models)]
+            out.append(fetch_rule(db, model_type, i % rule_classes[model_type]))
+        return out
+
+    components = {
+        "encode_survey_data": lambda batch: [encode_survey_data(s) for s in batch],
+        "SurveyEncoder.transform": encoder_transform,
+        "SurveyEncoder.transform_batch": encoder_transform_batch,
+        "predict_porosity": lambda batch: [predict_porosity(models, s) for s in batch],
+        "predict_breakage": lambda batch: [predict_breakage(models, s) for s in batch],
+        "recommend_ingredients_grouped": ranker,
+        "fetch_rule": rules,
+    }
+    if "dnn_model" in models:
+        components["predict_dnn"] = lambda batch: [predict_dnn(models, s) for s in batch]
+        components["dnn_model.predict"] = dnn_batch
+
+        keras_dnn = getattr(models["dnn_model"], "model", None)  # CompiledKerasModel wraps the Keras model
+        if keras_dnn is not None:
+            encoded = {}
+
+            def single_rows(batch):
+                # encode once per batch so only inference is timed
+                if id(batch) not in encoded:
+                    X = encoder_transform(batch).drop(columns=["Current_Hair_condition"], errors="ignore").to_numpy()
+                    encoded.clear()
+                    encoded[id(batch)] = X.astype(np.float32)
+                return encoded[id(batch)]
+
+            # one request = one row: compare the per-call overhead of the two paths
+            components["dnn_single.keras_predict"] = lambda batch: [
+                keras_dnn.predict(row[None, :], verbose=0) for row in single_rows(batch)]
+            components["dnn_single.compiled"] = lambda batch: [
+                models["dnn_model"].predict(row[None, :]) for row in single_rows(batch)]
+    return components
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 1024])
+    parser.add_argument("-c", "--components", nargs="+", help="subset of components to run")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds of timing per component/batch (default 2)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", help="override DATABASE_URL")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p50 slowdown vs baseline (default 0.2)")
+    args = parser.parse_args()
+
+    database_url = setup_repo(args.database_url)
+    from feature_engineering import load_models
+
+    with quiet():
+        models = load_models()
+    components = build_components(models)
+    if args.components:
+        unknown = set(args.components) - set(components)
+        if unknown:
+            parser.error(f"unknown components: {', '.join(sorted(unknown))}")
+        components = {k: v for k, v in components.items() if k in args.components}
+
+    surveys = SyntheticSurveys(seed=args.seed)
+    if "SurveyEncoder.transform_batch" in components:
+        # the batch path is only worth timing if it is a drop-in replacement
+        batch = surveys.sample(max(args.batch_sizes))
+        expected = build_components(models)["SurveyEncoder.transform"](batch).to_numpy(dtype=float)
+        if not np.array_equal(expected, components["SurveyEncoder.transform_batch"](batch), equal_nan=True):
+            sys.exit("❌ SurveyEncoder.transform_batch differs from transform")
+    if "dnn_single.compiled" in components:
+        batch = surveys.sample(64)
+        expected = np.vstack(build_components(models)["dnn_single.keras_predict"](batch))
+        got = np.vstack(components["dnn_single.compiled"](batch))
+        if not np.allclose(expected, got, atol=1e-5) or not (expected.argmax(1) == got.argmax(1)).all():
+            sys.exit("❌ compiled DNN inference differs from model.predict")
+    results = {}
+    for name, fn in components.items():
+        results[name] = {}
+        for batch_size in args.batch_sizes:
+            batch = surveys.sample(batch_size)
+            with quiet():
+                samples = time_call(lambda: fn(batch), budget_s=args.budget)
+                allocs = measure_allocations(lambda: fn(batch))
+            stats = {**summarize(samples, batch_size), **allocs}
+            results[name][str(batch_size)] = stats
+            print(f"{name:<32} batch={batch_size:<5} p50={stats['p50_ms']:>10.3f}ms "
+                  f"p95={stats['p95_ms']:>10.3f}ms p99={stats['p99_ms']:>10.3f}ms "
+                  f"peak={stats['peak_alloc_bytes'] / 1024:>9.1f}KiB")
+
+    report = {
+        "meta": run_metadata(database_url=database_url.split("@")[-1], batch_sizes=args.batch_sizes, seed=args.seed),
+        "results": results,
+    }
+    save_json(args.output, report)
+    print(f"\n✅ Results written to {args.output}")
+
+    if args.save_baseline:
+        save_json(args.baseline, report)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("ℹ No baseline found — run with --save-baseline to create one.")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    if not regressions:
+        print(f"✅ No regressions above {args.threshold:.0%} vs baseline.")
+        return
+
+    print(f"\n❌ {len(regressions)} regression(s) above {args.threshold:.0%}:")
+    for name, batch_size, base, current, ratio in regressions:
+        print(f"  {name:<32} batch={batch_size:<5} {base:.3f}ms → {current:.3f}ms (x{ratio:.2f})")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
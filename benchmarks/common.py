@@ -0,0 +1,176 @@
+# benchmarks/common.py
+"""Shared helpers for the benchmark scripts: repo setup, synthetic surveys, timing."""
+import os
+import sys
+import json
+import time
+import platform
+import tracemalloc
+import contextlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SURVEY_CSV = os.path.join(REPO_ROOT, "Module training code", "survey_data_analysis", "HAIRSURVEY_clean.csv")
+
+
+# ──────────────────────────────────────────────
+# REPO / DATABASE SETUP
+# ──────────────────────────────────────────────
+def setup_repo(database_url=None):
+    """
+    Make the app modules importable with their relative model paths, and point
+    DATABASE_URL at the local SQLite restore when nothing else is configured.
+    Synthetic surveys stay out of the drift counters (DRIFT_MONITOR=0), and the
+    app's own tables, which the restored dump lacks, are created.
+    Must run before importing db / predictions.
+    """
+    os.chdir(REPO_ROOT)
+    os.environ["DRIFT_MONITOR"] = "0"
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    if not os.getenv("DATABASE_URL"):
+        from local_db import restore_dump, DEFAULT_SQLITE
+        restore_dump(sqlite_path=DEFAULT_SQLITE)
+        os.environ["DATABASE_URL"] = f"sqlite:///{DEFAULT_SQLITE}"
+
+    # SQL echo is a dev aid — it would dominate every DB-touching measurement
+    import db
+    db.engine.echo = False
+    with quiet():
+        db.init_db()
+    return os.environ["DATABASE_URL"]
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence print() debugging inside the measured code."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# ──────────────────────────────────────────────
+# SYNTHETIC SURVEYS
+# ──────────────────────────────────────────────
+class SyntheticSurveys:
+    """Sample survey dicts column-by-column from the answer distributions in HAIRSURVEY_clean.csv."""
+
+    def __init__(self, csv_path=SURVEY_CSV, seed=0):
+        from survey_columns import rename_form_columns
+
+        df = rename_form_columns(pd.read_csv(csv_path))
+        df = df.loc[:, ~df.columns.duplicated()]
+        self.rng = np.random.default_rng(seed)
+        self.columns = {}
+        for col in df.columns:
+            freq = df[col].value_counts(dropna=False, normalize=True)
+            if col == "Consumed_water_per_day_L":
+                values = [None if pd.isna(v) else float(v) for v in freq.index]
+            else:
+                # hairsurvey stores answers as text and unanswered questions as '' (what the encoder was fitted on)
+                values = ["" if pd.isna(v) else str(v) for v in freq.index]
+            self.columns[col] = (values, freq.to_numpy())
+
+    def _answered(self, col):
+        values, probs = self.columns[col]
+        keep = [i for i, v in enumerate(values) if v not in ("", None)]
+        p = probs[keep]
+        return keep, p / p.sum()
+
+    def sample(self, n, required=("Hair_porosity", "Hair_Breakage")):
+        """`required` columns are always answered (the wizard makes them mandatory)."""
+        draws = {}
+        for col, (values, probs) in self.columns.items():
+            if col in required:
+                keep, p = self._answered(col)
+                draws[col] = np.asarray(keep)[self.rng.choice(len(keep), size=n, p=p)]
+            else:
+                draws[col] = self.rng.choice(len(values), size=n, p=probs)
+        return [
+            {col: self.columns[col][0][draws[col][i]] for col in self.columns}
+            for i in range(n)
+        ]
+
+
+# ──────────────────────────────────────────────
+# MEASUREMENT
+# ──────────────────────────────────────────────
+def time_call(fn, min_repeats=3, max_repeats=50, budget_s=2.0):
+    """Run fn() until the time budget is spent (within repeat bounds). Returns seconds per call."""
+    fn()  # warm-up: lazy imports, caches, TF graph building
+    samples = []
+    deadline = time.perf_counter() + budget_s
+    while len(samples) < max_repeats:
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+        if len(samples) >= min_repeats and time.perf_counter() > deadline:
+            break
+    return samples
+
+
+def measure_allocations(fn):
+    """Peak and net Python heap allocation (bytes) for a single fn() call."""
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_alloc_bytes": peak - before, "net_alloc_bytes": after - before}
+
+
+def summarize(samples, batch_size):
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "repeats": len(samples),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "min_ms": round(float(ms.min()), 4),
+        "per_item_us": round(float(np.percentile(ms, 50)) * 1000.0 / batch_size, 3),
+    }
+
+
+def run_metadata(**extra):
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        **extra,
+    }
+
+
+# ──────────────────────────────────────────────
+# RESULTS / BASELINE
+# ──────────────────────────────────────────────
+def save_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def compare_to_baseline(results, baseline, threshold, metric="p50_ms"):
+    """
+    Return [(component, batch_size, baseline_value, current_value, ratio)] for every
+    entry whose `metric` grew by more than `threshold` (0.2 → 20 %).
+    """
+    regressions = []
+    for component, by_batch in results.items():
+        for batch_size, stats in by_batch.items():
+            base = baseline.get(component, {}).get(batch_size)
+            if not base or not base.get(metric):
+                continue
+            ratio = stats[metric] / base[metric]
+            if ratio > 1.0 + threshold:
+                regressions.append((component, batch_size, base[metric], stats[metric], ratio))
+    return regressions
@@ -0,0 +1,357 @@
+# benchmarks/load_flow.py
+"""
+Concurrent end-to-end load harness for the survey → recommendation → feedback flow.
+
+    python benchmarks/load_flow.py                           # concurrency 1 2 4 8, 4 users per worker
+    python benchmarks/load_flow.py -c 1 4 16 --users-per-worker 2
+
+Starts the app on a local threaded WSGI server (separate process) against a scratch
+copy of the SQLite restore, then drives simulated users through:
+register → login → survey page2–page5 → image upload → build_all_recommendations
+(background job, polled until ready) → feedback page → submit feedback → improved recommendations.
+
+Reports throughput and p50/p95/p99 per route for each concurrency level, and checks
+every saved DNN ingredient ranking against a single-threaded recomputation to catch
+cross-request interference (e.g. shared mutable state in predictions.py).
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import shutil
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlencode, urlsplit
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import REPO_ROOT, setup_repo, quiet, SyntheticSurveys, summarize, run_metadata, save_json  # noqa: E402
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results", "load_flow.json")
+SAMPLE_IMAGE = os.path.join(REPO_ROOT, "static", "uploads", "158.jpg")
+
+# wizard form field → HairSurvey column (see templates/page2.html … page5.html)
+PAGE_FIELDS = {
+    "page2": {"age": "Age", "race": "Race", "gender": "Gender", "country": "Country"},
+    "page3": {"hair_type": "Hair_type", "hair_porosity": "Hair_porosity",
+              "hair_texture": "Hair_texture", "hair_density": "Hair_density"},
+    "page4": {"hair_edges_condition": "Hair_edges_condition", "hair_loss_state": "Hair_Loss_state",
+              "hair_breakage": "Hair_Breakage", "current_hair_condition": "Current_Hair_condition"},
+    "page5": {"Eating_diet": "Eating_diet", "Consumed_water_per_day_L": "Consumed_water_per_day_L",
+              "Hair_length_Current_Hair_Length": "Hair_length_Current_Hair_Length",
+              "Hair_length_Hair_goal": "Hair_length_Hair_goal",
+              "Satin_scarfbonnet_or_pillowcase": "Satin_scarfbonnet_or_pillowcase"},
+}
+
+
+# ──────────────────────────────────────────────
+# SERVER (child process)
+# ──────────────────────────────────────────────
+def serve(port):
+    setup_repo()
+    from werkzeug.serving import make_server
+    with quiet():
+        from app import app
+    print("ready", flush=True)
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(database_url, port):
+    env = {**os.environ, "DATABASE_URL": database_url, "UPLOAD_ROOT": tempfile.mkdtemp(prefix="load_uploads_")}
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(port)],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    if proc.stdout.readline().strip() != "ready":
+        proc.kill()
+        raise RuntimeError("app server failed to start")
+    return proc, env["UPLOAD_ROOT"]
+
+
+# ──────────────────────────────────────────────
+# MINIMAL HTTP CLIENT (stdlib only, keeps the Flask session cookie)
+# ──────────────────────────────────────────────
+class Client:
+    def __init__(self, port, recorder):
+        self.port = port
+        self.cookies = {}
+        self.recorder = recorder
+
+    def request(self, route, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=300)
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            data = resp.read()
+        finally:
+            conn.close()
+        self.recorder.record(route, time.perf_counter() - start, resp.status)
+        for name, value in resp.getheaders():
+            if name.lower() == "set-cookie":
+                key, _, rest = value.partition("=")
+                self.cookies[key] = rest.split(";", 1)[0]
+        return resp.status, resp.getheader("Location"), data.decode("utf-8", "replace")
+
+    def get(self, route, path):
+        return self.request(route, "GET", path)
+
+    def post(self, route, path, form):
+        body = urlencode(form)
+        return self.request(route, "POST", path, body, {"Content-Type": "application/x-www-form-urlencoded"})
+
+    def upload(self, route, path, form, field, filename, content):
+        boundary = uuid.uuid4().hex
+        parts = [
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode()
+            for k, v in form.items()
+        ]
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: image/jpeg\r\n\r\n".encode() + content + b"\r\n"
+        )
+        body = b"".join(parts) + f"--{boundary}--\r\n".encode()
+        return self.request(route, "POST", path, body, {"Content-Type": f"multipart/form-data; boundary={boundary}"})
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, status):
+        with self.lock:
+            self.latencies[route].append(seconds)
+            if status >= 400:
+                self.errors[route] += 1
+
+    def error(self, route):
+        with self.lock:
+            self.errors[route] += 1
+
+
+# ──────────────────────────────────────────────
+# ONE SIMULATED USER
+# ──────────────────────────────────────────────
+def _path(location):
+    return urlsplit(location).path if location else ""
+
+
+def run_user(port, recorder, survey, image, tag):
+    """Walk one user through the whole flow. Returns (user_id, survey_id) or None on failure."""
+    c = Client(port, recorder)
+    email = f"load-{tag}@example.test"
+
+    c.post("POST /register", "/register", {"name": "Load Test", "email": email, "password": "pw"})
+    status, location, _ = c.post("POST /login", "/login", {"email": email, "password": "pw"})
+    if "/survey/page2" not in _path(location):
+        recorder.error("POST /login")
+        return None
+
+    for page, fields in PAGE_FIELDS.items():
+        form = {name: "" if survey.get(col) is None else survey[col] for name, col in fields.items()}
+        status, location, _ = c.post(f"POST /survey/{page}", f"/survey/{page}", form)
+
+    match = re.search(r"/diagnostic_choice/(\d+)", _path(location))
+    if not match:
+        recorder.error("POST /survey/page5")
+        return None
+    survey_id = int(match.group(1))
+
+    c.upload("POST /imagesaved", f"/imagesaved/{survey_id}", {"survey_id": survey_id},
+             "image_file", "scalp.jpg", image)
+
+    # build is a background job: the route redirects to the job page, which is polled until ready
+    start = time.perf_counter()
+    status, location, _ = c.get("GET /recommend/build_all_recommendations", f"/recommend/build_all_recommendations/{survey_id}")
+    job_match = re.search(r"/recommend/jobs/(\w+)/result", _path(location))
+    if status != 302 or not job_match:
+        recorder.error("GET /recommend/build_all_recommendations")
+        return None
+    job_id = job_match.group(1)
+    job = {"status": "queued"}
+    while job["status"] in ("queued", "running"):
+        time.sleep(0.2)
+        status, _, body = c.get("GET /recommend/jobs/<id>", f"/recommend/jobs/{job_id}")
+        job = json.loads(body) if status == 200 else {"status": "failed"}
+    status, _, _ = c.get("GET /recommend/jobs/<id>/result", f"/recommend/jobs/{job_id}/result")
+    recorder.record("recommendation ready (end-to-end)", time.perf_counter() - start, status)
+    if job["status"] != "done" or status != 200:
+        recorder.error("recommendation job")
+        return None
+
+    status, location, html = c.get("GET /feedback", f"/feedback/{survey_id}")
+    rec_ids = re.findall(r'name="rec_(\d+)"', html)
+    user_match = re.search(r"/feedback/submit/(\d+)", html)
+    if status != 200 or not rec_ids or not user_match:
+        recorder.error("GET /feedback")
+        return None
+    user_id = int(user_match.group(1))
+
+    ratings = {f"rec_{rid}": random.choice(["0", "1"]) for rid in dict.fromkeys(rec_ids)}
+    status, location, _ = c.post("POST /feedback/submit", f"/feedback/submit/{user_id}", ratings)
+    if "/recommend/improved" not in _path(location):
+        recorder.error("POST /feedback/submit")
+
+    status, location, _ = c.get("GET /recommend/improved", f"/recommend/improved/{user_id}")
+    if status != 200:
+        recorder.error("GET /recommend/improved")  # the route flashes + redirects home on failure
+
+    return user_id, survey_id
+
+
+# ──────────────────────────────────────────────
+# CORRECTNESS: re-rank every saved DNN recommendation single-threaded
+# ──────────────────────────────────────────────
+def check_rankings(survey_ids):
+    """Return [(survey_id, label)] whose saved first DNN ranking differs from a fresh recomputation."""
+    from db import SessionLocal
+    from models import Recommendation
+    from predictions import recommend_ingredients_grouped, LABEL_MAP
+
+    label_to_cls = {v: k for k, v in LABEL_MAP["dnn_model"].items()}
+    mismatches = []
+    db = SessionLocal()
+    try:
+        for survey_id in survey_ids:
+            rec = (
+                db.query(Recommendation)
+                .filter_by(survey_id=survey_id, model_id=1)
+                .order_by(Recommendation.rec_id)
+                .first()
+            )
+            if rec is None or rec.model_prediction not in label_to_cls:
+                continue
+            saved = rec.recommendation_json
+            saved = json.loads(saved) if isinstance(saved, str) else saved
+            with quiet():
+                expected = recommend_ingredients_grouped(db, "dnn_model", label_to_cls[rec.model_prediction], top_n=3)
+            if json.loads(json.dumps(expected)) != saved:
+                mismatches.append((survey_id, rec.model_prediction))
+    finally:
+        db.close()
+    return mismatches
+
+
+# ──────────────────────────────────────────────
+# DRIVER
+# ──────────────────────────────────────────────
+def run_level(port, concurrency, users_per_worker, surveys, image, run_tag):
+    recorder = Recorder()
+    n_users = concurrency * users_per_worker
+    batch = surveys.sample(n_users)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(run_user, port, recorder, batch[i], image, f"{run_tag}-c{concurrency}-{i}")
+            for i in range(n_users)
+        ]
+        outcomes = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+
+    completed = [o for o in outcomes if o]
+    total_requests = sum(len(v) for v in recorder.latencies.values())
+    routes = {
+        route: {**summarize(samples, 1), "count": len(samples), "errors": recorder.errors.get(route, 0)}
+        for route, samples in sorted(recorder.latencies.items())
+    }
+    return {
+        "concurrency": concurrency,
+        "users": n_users,
+        "completed_flows": len(completed),
+        "elapsed_s": round(elapsed, 3),
+        "flows_per_s": round(len(completed) / elapsed, 3),
+        "requests_per_s": round(total_requests / elapsed, 3),
+        "routes": routes,
+    }, [survey_id for _, survey_id in completed]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-c", "--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--users-per-worker", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-db", action="store_true", help="keep the scratch database afterwards")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.serve)
+
+    # scratch copy of the restored dump so load-test writes never touch the real data
+    sys.path.insert(0, REPO_ROOT)
+    from local_db import restore_dump, DEFAULT_SQLITE
+    restore_dump(sqlite_path=DEFAULT_SQLITE)
+    scratch = tempfile.mkdtemp(prefix="load_flow_")
+    db_path = os.path.join(scratch, "load.db")
+    shutil.copyfile(DEFAULT_SQLITE, db_path)
+    database_url = f"sqlite:///{db_path}?timeout=30"
+    setup_repo(database_url)
+
+    random.seed(args.seed)
+    surveys = SyntheticSurveys(seed=args.seed)
+    with open(SAMPLE_IMAGE, "rb") as f:
+        image = f.read()
+
+    port = _free_port()
+    proc, upload_root = start_server(database_url, port)
+    run_tag = uuid.uuid4().hex[:8]
+    levels, survey_ids = [], []
+    try:
+        for concurrency in args.concurrency:
+            level, ids = run_level(port, concurrency, args.users_per_worker, surveys, image, run_tag)
+            levels.append(level)
+            survey_ids.extend(ids)
+            print(f"\n── concurrency={concurrency}: {level['completed_flows']}/{level['users']} flows, "
+                  f"{level['flows_per_s']} flows/s, {level['requests_per_s']} req/s")
+            for route, s in level["routes"].items():
+                print(f"  {route:<42} n={s['count']:<4} p50={s['p50_ms']:>9.1f}ms "
+                      f"p95={s['p95_ms']:>9.1f}ms p99={s['p99_ms']:>9.1f}ms err={s['errors']}")
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(upload_root, ignore_errors=True)
+
+    # the harness process reads the same scratch DB to re-rank single-threaded
+    mismatches = check_rankings(survey_ids)
+    print(f"\n{'❌' if mismatches else '✅'} ingredient ranking mismatches: {len(mismatches)} / {len(survey_ids)}")
+    for survey_id, label in mismatches[:20]:
+        print(f"  survey {survey_id} ({label})")
+
+    save_json(args.output, {
+        "meta": run_metadata(users_per_worker=args.users_per_worker, seed=args.seed),
+        "levels": levels,
+        "ranking_mismatches": [{"survey_id": s, "label": l} for s, l in mismatches],
+    })
+    print(f"✅ Results written to {args.output}")
+
+    if not args.keep_db:
+        shutil.rmtree(scratch, ignore_errors=True)
+    else:
+        print(f"   scratch DB kept at {db_path}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
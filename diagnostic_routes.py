@@ -1,15 +1,16 @@
 # diagnostic_routes.py
 import os
-import uuid
 from datetime import datetime
 
 from flask import Blueprint, request, render_template, redirect, url_for, flash
-from werkzeug.utils import secure_filename
 from sqlalchemy.orm import joinedload
 
-from db import SessionLocal
+from db import get_db
 from models import HairSurvey, Recommendation, ModelVersion
 from feature_engineering import load_models
+from analytics import record_recommendation
+from upload_store import save_survey_image, UploadError
+from disease_service import predict_image, DiseaseServiceBusy
 
 import numpy as np
 from PIL import Image
@@ -21,7 +22,6 @@ diagnostic_bp = Blueprint("diagnostic", __name__)
 #   CONFIG
 # -------------------------
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp"}
-UPLOAD_FOLDER = "static/uploads"
 
 
 # -------------------------
@@ -51,9 +51,7 @@ def preprocess_image(image_path):
 @diagnostic_bp.route("/diagnostic_choice/<int:survey_id>")
 def diagnostic_choice(survey_id):
 
-    db = SessionLocal()
-    survey = db.query(HairSurvey).filter_by(survey_id=survey_id).first()
-    db.close()
+    survey = get_db().query(HairSurvey).filter_by(survey_id=survey_id).first()
 
     if not survey:
         flash("Survey not found.", "error")
@@ -90,7 +88,7 @@ def diagnostic_skip(survey_id):
 
 @diagnostic_bp.route("/imagesaved/<int:survey_id>", methods=["POST"])
 def imagesaved(survey_id):
-    survey_id = request.form.get("survey_id")
+    survey_id = request.form.get("survey_id", survey_id, type=int)
     file = request.files.get("image_file")
 
     if not file:
@@ -100,10 +98,13 @@ def imagesaved(survey_id):
             error="No image selected"
         )
 
-    # save file with name = survey_id.jpg
-    filename = f"{survey_id}.jpg"
-    save_path = os.path.join("static", "uploads", filename)
-    file.save(save_path)
+    # stream into content-addressed storage + record survey → image mapping
+    db = get_db()
+    try:
+        save_survey_image(db, survey_id, file)
+    except UploadError as e:
+        db.rollback()
+        return render_template("diagnostic_upload.html", survey_id=survey_id, error=str(e))
 
     # After saving → redirect to user_types.html
     return redirect(url_for("user.user_type", survey_id=survey_id))
@@ -128,34 +129,35 @@ def diagnostic_process(survey_id):
         flash("Invalid image format.", "error")
         return redirect(url_for("diagnostic.diagnostic_upload", survey_id=survey_id))
 
-    # Ensure folder exists
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-    # Save file
-    filename = secure_filename(f"{uuid.uuid4()}_{file.filename}")
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(filepath)
+    # Save file (content-addressed, size-limited)
+    db = get_db()
+    try:
+        image = save_survey_image(db, survey_id, file)
+        filepath = image.path
+    except UploadError as e:
+        db.rollback()
+        flash(str(e), "error")
+        return redirect(url_for("diagnostic.diagnostic_upload", survey_id=survey_id))
 
     # Preprocess
     arr = preprocess_image(filepath)
 
-    # Load disease model
-    models = load_models()
-    disease_model = models.get("disease_model")
+    # Run prediction (in-process model or the disease_service worker pool)
+    try:
+        pred = predict_image(load_models(), arr)
+    except DiseaseServiceBusy:
+        flash("The diagnostic model is busy — please try again in a moment.", "error")
+        return redirect(url_for("diagnostic.diagnostic_upload", survey_id=survey_id))
 
-    if disease_model is None:
+    if pred is None:
         flash("Disease diagnostic model not loaded.", "error")
         return redirect(url_for("diagnostic.diagnostic_upload", survey_id=survey_id))
 
-    # Run prediction
-    pred = disease_model.predict(arr)
     disease_score = float(pred[0][0])
 
     # ---------------------------------------------------------
     #  SAVE DIAGNOSTIC OUTPUT AS A Recommendation ENTRY
     # ---------------------------------------------------------
-    db = SessionLocal()
-
     model_ver = (
         db.query(ModelVersion)
         .filter_by(model_name="Disease Diagnostic", model_type="diagnostic")
@@ -165,7 +167,6 @@ def diagnostic_process(survey_id):
 
     if not model_ver:
         flash("Diagnostic model metadata missing in DB.", "error")
-        db.close()
         return redirect(url_for("diagnostic.diagnostic_upload", survey_id=survey_id))
 
     rec = Recommendation(
@@ -174,15 +175,15 @@ def diagnostic_process(survey_id):
         recommendation_json={
             "diagnostic_score": disease_score,
             "confidence": round(disease_score * 100, 2),
-            "image_file": filename,
+            "image_file": filepath,
             "timestamp": datetime.utcnow().isoformat()
         }
     )
 
     db.add(rec)
+    record_recommendation(db, rec)
     db.commit()
     rec_id = rec.rec_id
-    db.close()
 
     return redirect(url_for("diagnostic.diagnostic_result", rec_id=rec_id))
 
@@ -193,14 +194,12 @@ def diagnostic_process(survey_id):
 @diagnostic_bp.route("/diagnostic_result/<int:rec_id>")
 def diagnostic_result(rec_id):
 
-    db = SessionLocal()
     rec = (
-        db.query(Recommendation)
+        get_db().query(Recommendation)
         .options(joinedload(Recommendation.model))
         .filter_by(rec_id=rec_id)
         .first()
     )
-    db.close()
 
     if not rec:
         flash("Diagnostic result not found.", "error")
@@ -0,0 +1,161 @@
+# disease_service.py
+"""
+Optional out-of-process inference for the disease CNN.
+
+    DISEASE_SERVICE_WORKERS=2        processes, each loading the CNN once (0 = run in the web process)
+    DISEASE_SERVICE_MAX_PENDING=4    images in flight before callers have to wait (default 2 × workers)
+    DISEASE_SERVICE_WAIT_S=5         how long a caller waits for a free slot before DiseaseServiceBusy
+    DISEASE_SERVICE_TIMEOUT_S=30     how long a caller waits for a worker's prediction before DiseaseServiceBusy
+
+When enabled, the web process never loads the CNN: image tensors are copied into
+a multiprocessing.shared_memory block and only its name, shape and dtype are sent to
+a worker, which predicts on a zero-copy view. Each web process owns its own pool;
+if a worker dies (OOM, segfault) the broken pool is replaced and the call retried once.
+"""
+import os
+import atexit
+import logging
+import threading
+from multiprocessing import get_context, shared_memory
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from metrics import Counter, register
+
+logger = logging.getLogger(__name__)
+
+DISEASE_MODEL_PATH = os.getenv("DISEASE_MODEL_PATH", os.path.join("models", "hair_disease_classifier_accur_v1.h5"))
+DISEASE_SERVICE_WORKERS = int(os.getenv("DISEASE_SERVICE_WORKERS", "0"))
+DISEASE_SERVICE_MAX_PENDING = int(os.getenv("DISEASE_SERVICE_MAX_PENDING", str(2 * DISEASE_SERVICE_WORKERS or 1)))
+DISEASE_SERVICE_WAIT_S = float(os.getenv("DISEASE_SERVICE_WAIT_S", "5"))
+DISEASE_SERVICE_TIMEOUT_S = float(os.getenv("DISEASE_SERVICE_TIMEOUT_S", "30"))
+
+DISEASE_SERVICE_REJECTED = register(Counter(
+    "ai_hair_disease_service_rejected_total", "Disease CNN requests refused: pool saturated, broken or timed out.", "reason"
+))
+
+
+class DiseaseServiceBusy(RuntimeError):
+    """The worker pool could not answer in time (saturated, broken twice, or a prediction timed out)."""
+
+
+def service_enabled():
+    return DISEASE_SERVICE_WORKERS > 0 and os.path.exists(DISEASE_MODEL_PATH)
+
+
+# ──────────────────────────────────────────────
+# WORKER PROCESS
+# ──────────────────────────────────────────────
+_model = None
+
+
+def _init_worker(model_path):
+    global _model
+    from quantize import load_inference_model
+    _model = load_inference_model(model_path)
+
+
+def _attach(name):
+    """Open the parent's block without registering it for cleanup here (the parent unlinks it)."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python ≥ 3.13
+    except TypeError:
+        # spawned workers share the parent's resource tracker, so this registration is a no-op duplicate
+        return shared_memory.SharedMemory(name=name)
+
+
+def _predict_view(buf, shape, dtype):
+    return _model.predict(np.ndarray(shape, dtype=dtype, buffer=buf), verbose=0)
+
+
+def _predict_shared(shm_name, shape, dtype):
+    shm = _attach(shm_name)
+    try:
+        return _predict_view(shm.buf, shape, dtype)
+    finally:
+        try:
+            shm.close()
+        except BufferError:  # a traceback still holds the view; the mapping goes with it
+            pass
+
+
+# ──────────────────────────────────────────────
+# CLIENT (web process)
+# ──────────────────────────────────────────────
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(DISEASE_SERVICE_MAX_PENDING)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn, not fork: the parent may already have TensorFlow initialised
+                _pool = ProcessPoolExecutor(
+                    max_workers=DISEASE_SERVICE_WORKERS, mp_context=get_context("spawn"),
+                    initializer=_init_worker, initargs=(DISEASE_MODEL_PATH,),
+                )
+                atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    return _pool
+
+
+def _reset_pool(broken):
+    """Drop a pool whose worker died; the next _get_pool() spawns a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(shm_name, shape, dtype):
+    """One prediction in the pool, replacing it and retrying once if a worker has died."""
+    for attempt in (1, 2):
+        pool = _get_pool()
+        try:
+            future = pool.submit(_predict_shared, shm_name, shape, dtype)
+            return future.result(timeout=DISEASE_SERVICE_TIMEOUT_S)
+        except BrokenProcessPool:
+            logger.warning("disease service: worker pool broken (attempt %d), restarting it", attempt)
+            _reset_pool(pool)
+        except TimeoutError:
+            future.cancel()
+            DISEASE_SERVICE_REJECTED.inc("timeout")
+            raise DiseaseServiceBusy(f"disease model worker gave no answer within {DISEASE_SERVICE_TIMEOUT_S:g} s")
+    DISEASE_SERVICE_REJECTED.inc("broken")
+    raise DiseaseServiceBusy("disease model workers keep dying")
+
+
+def predict_remote(batch, wait=DISEASE_SERVICE_WAIT_S):
+    """Run the CNN on `batch` (N, 224, 224, 3) in the worker pool; raises DiseaseServiceBusy when saturated."""
+    if not _slots.acquire(timeout=wait):
+        DISEASE_SERVICE_REJECTED.inc("saturated")
+        raise DiseaseServiceBusy("disease model workers are busy")
+    try:
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        shm = shared_memory.SharedMemory(create=True, size=batch.nbytes)
+        try:
+            np.ndarray(batch.shape, dtype=batch.dtype, buffer=shm.buf)[:] = batch
+            return _submit(shm.name, batch.shape, batch.dtype.str)
+        finally:
+            shm.close()
+            shm.unlink()
+    finally:
+        _slots.release()
+
+
+def predict_image(models, batch, wait=DISEASE_SERVICE_WAIT_S):
+    """
+    Disease CNN output for a preprocessed image batch — via the worker pool when
+    enabled, otherwise the in-process model. None when no disease model is available.
+    """
+    if service_enabled():
+        return predict_remote(batch, wait=wait)
+    cnn = models.get("disease_model")
+    if cnn is None:
+        return None
+    return cnn.predict(batch, verbose=0)
@@ -0,0 +1,268 @@
+# drift_monitor.py
+"""
+Input drift: live survey answers vs. the distribution the SurveyEncoder was fitted on.
+
+    flask admin drift-reference      # training CSV → models/drift_reference_v1.json (once per encoder)
+    flask admin drift-check          # cron, e.g. hourly: divergence per column → /admin/
+
+Every encode_survey_data() call bumps an in-process counter per (column, answer) —
+the answer keyed exactly as the encoder sees it, flagged when the encoder does not
+know it (LabelBinarizer columns fall back to classes_[0], ordinal ones to -1). A
+daemon thread adds the counters to input_drift_counts every DRIFT_FLUSH_S seconds.
+drift-check reads only the last DRIFT_WINDOW_DAYS of those daily rows and stores a
+Jensen–Shannon divergence (0 = same distribution, 1 = disjoint) and unknown rate per column.
+
+    DRIFT_FLUSH_S=60
+    DRIFT_WINDOW_DAYS=7
+    DRIFT_MONITOR=1              0 = count nothing (benchmarks, load tests, test suite)
+"""
+import os
+import json
+import math
+import atexit
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from collections import Counter, defaultdict
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from models import InputDriftCount, InputDriftScore
+
+logger = logging.getLogger(__name__)
+
+DRIFT_REFERENCE_PATH = os.path.join("models", "drift_reference_v1.json")
+TRAINING_CSV = os.path.join("Module training code", "survey_data_analysis", "HAIRSURVEY_clean.csv")
+DRIFT_FLUSH_S = float(os.getenv("DRIFT_FLUSH_S", "60"))
+DRIFT_WINDOW_DAYS = int(os.getenv("DRIFT_WINDOW_DAYS", "7"))
+DRIFT_MONITOR = os.getenv("DRIFT_MONITOR", "1") == "1"
+UNKNOWN = "__unknown__"
+MAX_VALUE_LEN = 255
+
+
+# ──────────────────────────────────────────────
+# KEYS: the value each encoder actually compares
+# ──────────────────────────────────────────────
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def ordinal_key(value):
+    # OrdinalEncoder matches the raw string exactly
+    return "" if _missing(value) else str(value)
+
+
+def nominal_key(value):
+    # SurveyEncoder._transform_label_binarizer: astype(str).lower().strip()
+    return str(value).lower().strip()
+
+
+def column_specs(encoder):
+    """[(column, key_fn, known values)] for every categorical column, each column once."""
+    specs, seen = [], set()
+    for col, categories in zip(encoder.ordinal_columns, encoder.ordinal_encoder.categories_):
+        if col not in seen:
+            seen.add(col)
+            specs.append((col, ordinal_key, frozenset(str(c) for c in categories)))
+    for col in encoder.nominal_columns + encoder.binary_columns:
+        if col not in seen:
+            seen.add(col)
+            specs.append((col, nominal_key, frozenset(str(c) for c in encoder.nominal_encoders[col].classes_)))
+    return specs
+
+
+# ──────────────────────────────────────────────
+# LIVE COUNTERS (request path: O(columns) dict increments)
+# ──────────────────────────────────────────────
+_specs = None
+_lock = threading.Lock()
+_pending = Counter()   # (day, column, value, unknown) → count
+_flusher = None
+
+
+def _get_specs():
+    global _specs
+    if _specs is None:
+        from feature_engineering import load_encoder
+        _specs = column_specs(load_encoder())
+    return _specs
+
+
+def record_survey(data):
+    """Count one raw survey dict's categorical answers. Never raises into the caller."""
+    if not DRIFT_MONITOR:
+        return
+    try:
+        specs = _get_specs()
+        today = date.today()
+        with _lock:
+            for col, key_fn, known in specs:
+                key = key_fn(data.get(col, ""))
+                _pending[(today, col, key[:MAX_VALUE_LEN], key not in known)] += 1
+        _ensure_flusher()
+    except Exception:
+        logger.exception("drift counter update failed")
+
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is None:
+        with _lock:
+            if _flusher is None:
+                _flusher = threading.Thread(target=_flush_loop, name="drift-flush", daemon=True)
+                _flusher.start()
+                atexit.register(flush)
+
+
+def _flush_loop():
+    stop = threading.Event()
+    while not stop.wait(DRIFT_FLUSH_S):
+        flush()
+
+
+def flush():
+    """Add the pending counters to input_drift_counts. Returns rows touched."""
+    from db import SessionLocal
+
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+    if not batch:
+        return 0
+
+    db = SessionLocal.session_factory()
+    try:
+        for (day, col, value, unknown), count in batch.items():
+            key = {"day": day, "column_name": col, "value": value}
+            query = db.query(InputDriftCount).filter_by(**key)
+            increment = {InputDriftCount.count: InputDriftCount.count + count}
+            if query.update(increment, synchronize_session=False):
+                continue
+            try:
+                with db.begin_nested():
+                    db.add(InputDriftCount(**key, count=count, unknown=unknown))
+            except IntegrityError:
+                # another process created the row first → just increment it
+                query.update(increment, synchronize_session=False)
+        db.commit()
+        return len(batch)
+    except Exception:
+        db.rollback()
+        logger.exception("drift counter flush failed — keeping %d counters for the next flush", len(batch))
+        with _lock:
+            _pending.update(batch)
+        return 0
+    finally:
+        db.close()
+
+
+# ──────────────────────────────────────────────
+# REFERENCE SNAPSHOT (training distribution)
+# ──────────────────────────────────────────────
+def build_reference(csv_path=TRAINING_CSV, path=DRIFT_REFERENCE_PATH):
+    """Answer frequencies of the encoder's training data, keyed like the live counters."""
+    import pandas as pd
+    from feature_engineering import load_encoder
+    from survey_columns import rename_form_columns
+
+    df = rename_form_columns(pd.read_csv(csv_path))
+    df = df.loc[:, ~df.columns.duplicated()].fillna("")  # the encoder was fitted on '' for blanks
+
+    columns = {}
+    for col, key_fn, known in column_specs(load_encoder()):
+        if col not in df.columns:
+            continue
+        counts = Counter(key_fn(v) for v in df[col].astype(str))
+        columns[col] = {"counts": dict(counts), "known": sorted(known)}
+
+    snapshot = {
+        "version": 1,
+        "source": os.path.basename(csv_path),
+        "rows": len(df),
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "columns": columns,
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(snapshot, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+    return snapshot
+
+
+def load_reference(path=DRIFT_REFERENCE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+# ──────────────────────────────────────────────
+# PERIODIC CHECK
+# ──────────────────────────────────────────────
+def js_divergence(p_counts, q_counts):
+    """Jensen–Shannon divergence (base 2, 0‥1) between two count dicts."""
+    p_total, q_total = sum(p_counts.values()), sum(q_counts.values())
+    if not p_total or not q_total:
+        return None
+    divergence = 0.0
+    for key in set(p_counts) | set(q_counts):
+        p = p_counts.get(key, 0) / p_total
+        q = q_counts.get(key, 0) / q_total
+        m = (p + q) / 2
+        if p:
+            divergence += 0.5 * p * math.log2(p / m)
+        if q:
+            divergence += 0.5 * q * math.log2(q / m)
+    return divergence
+
+
+def run_drift_check(db, days=DRIFT_WINDOW_DAYS):
+    """Score the last `days` of live counts against the reference; stores and returns the rows."""
+    reference = load_reference()
+    if reference is None:
+        raise FileNotFoundError(f"{DRIFT_REFERENCE_PATH} missing — run `flask admin drift-reference` first")
+
+    since = date.today() - timedelta(days=days - 1)
+    live = defaultdict(Counter)
+    unknown_values = defaultdict(Counter)
+    rows = (
+        db.query(InputDriftCount.column_name, InputDriftCount.value, InputDriftCount.unknown,
+                 func.sum(InputDriftCount.count))
+        .filter(InputDriftCount.day >= since)   # primary key prefix → window rows only
+        .group_by(InputDriftCount.column_name, InputDriftCount.value, InputDriftCount.unknown)
+    )
+    for col, value, unknown, count in rows:
+        live[col][UNKNOWN if unknown else value] += count
+        if unknown:
+            unknown_values[col][value] += count
+
+    now = datetime.now()
+    scores = []
+    for col, ref in reference["columns"].items():
+        samples = sum(live[col].values())
+        known = set(ref["known"])
+        ref_counts = Counter({(k if k in known else UNKNOWN): v for k, v in ref["counts"].items()})
+        top_unknown = unknown_values[col].most_common(1)
+        score = InputDriftScore(
+            computed_at=now,
+            column_name=col,
+            window_days=days,
+            samples=samples,
+            unknown_rate=live[col][UNKNOWN] / samples if samples else None,
+            divergence=js_divergence(live[col], ref_counts),
+            top_unknown=top_unknown[0][0][:MAX_VALUE_LEN] if top_unknown else None,
+        )
+        db.add(score)
+        scores.append(score)
+    db.commit()
+    return scores
+
+
+def drift_summary(db):
+    """Rows of the most recent drift check, most drifted first."""
+    latest = db.query(func.max(InputDriftScore.computed_at)).scalar()
+    if latest is None:
+        return []
+    rows = db.query(InputDriftScore).filter(InputDriftScore.computed_at == latest).all()
+    return sorted(rows, key=lambda r: (r.divergence is None, -(r.divergence or 0)))
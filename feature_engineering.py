@@ -3,9 +3,18 @@ import pandas as pd
 import numpy as np
 import os
 import pickle
+import logging
 import joblib
+import threading
 import tensorflow as tf
 from sklearn.preprocessing import StandardScaler, OrdinalEncoder, LabelBinarizer
+from memory_registry import tracked_load
+from disease_service import service_enabled, DISEASE_MODEL_PATH
+from quantize import load_inference_model, INFERENCE_BACKEND
+from label_tables import LabelTable, load_label_tables, LABEL_TABLES_PATH, SOURCES
+from drift_monitor import record_survey
+
+logger = logging.getLogger(__name__)
 
 
 # ===============================
@@ -61,9 +70,9 @@ class SurveyEncoder:
         # Fit label binarizers for col in self.nominal_columns + self.binary_columns:
         for col in self.nominal_columns + self.binary_columns:
             self._fit_label_binarizer(df[col], col)
-        # Create feature column order for reference
-        X_encoded = self._transform_internal(df)
-        self.feature_columns_ = X_encoded.columns.tolist()
+        # Feature column order = what _transform_internal would produce, without transforming df
+        self.feature_columns_ = self._output_columns()
+        self._plan = None
         self.fitted = True
         return self
 
@@ -92,6 +101,84 @@ class SurveyEncoder:
         encoded_df = encoded_df.reindex(columns=self.feature_columns_, fill_value=0)
         return encoded_df
 
+    # --- batch transform (large frames) ---
+    def _output_columns(self):
+        """Column names in _transform_internal order, derived from the fitted encoders."""
+        columns = list(self.numeric_columns) + list(self.ordinal_columns)
+        for col in self.nominal_columns + self.binary_columns:
+            classes = self.nominal_encoders[col].classes_
+            if len(classes) == 2:
+                columns.append(f"{col}_{classes[1]}")
+            else:
+                columns.extend(f"{col}_{cls}" for cls in classes)
+        return columns
+
+    def _column_plan(self):
+        """
+        Per categorical column: class → code lookup and the output positions of its
+        one-hot block in feature_columns_. Built once, reused for every chunk.
+        """
+        plan = getattr(self, "_plan", None)  # encoders pickled before this existed have no _plan
+        if plan is not None:
+            return plan
+
+        position = {name: i for i, name in enumerate(self.feature_columns_)}
+        plan = {
+            "numeric": [position.get(c, -1) for c in self.numeric_columns],
+            "ordinal": [position.get(c, -1) for c in self.ordinal_columns],
+            "categorical": [],
+        }
+        for col in self.nominal_columns + self.binary_columns:
+            classes = list(self.nominal_encoders[col].classes_)
+            if len(classes) == 2:
+                # binary LabelBinarizer → a single column that is 1 for classes[1]
+                targets = [-1, position.get(f"{col}_{classes[1]}", -1)]
+            elif len(classes) == 1:
+                targets = [-1]  # LabelBinarizer emits all-zero for a single class
+            else:
+                targets = [position.get(f"{col}_{cls}", -1) for cls in classes]
+            codes = {cls: i for i, cls in enumerate(classes)}
+            plan["categorical"].append((col, codes, np.asarray(targets)))
+        self._plan = plan
+        return plan
+
+    def transform_batch(self, df, chunk_size=10_000):
+        """
+        Same values as transform(df).to_numpy(dtype=float), for large frames: each
+        categorical column is normalized once per distinct value and one-hot encoded
+        straight into a preallocated (n_rows, n_features) float64 matrix, chunk by chunk.
+        """
+        if not self.fitted:
+            raise ValueError("Encoder must be fitted before transform.")
+        plan = self._column_plan()
+        out = np.zeros((len(df), len(self.feature_columns_)), dtype=np.float64)
+
+        def scatter(positions, block, rows):
+            positions = np.asarray(positions)
+            keep = positions >= 0
+            out[rows, positions[keep]] = block[:, keep]
+
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            rows = slice(start, start + len(chunk))
+
+            scatter(plan["numeric"], self.scaler.transform(chunk[self.numeric_columns]), rows)
+            scatter(plan["ordinal"], self.ordinal_encoder.transform(chunk[self.ordinal_columns]), rows)
+
+            row_idx = np.arange(rows.start, rows.stop)
+            for col, codes, targets in plan["categorical"]:
+                # normalize distinct values only, then map each to its class (unseen → class 0)
+                values, uniques = pd.factorize(chunk[col].astype(str))
+                normalized = pd.Index(uniques).str.lower().str.strip()
+                unique_codes = np.fromiter((codes.get(v, 0) for v in normalized), dtype=np.intp, count=len(normalized))
+                # missing values (factorize code -1) are unseen too → the trailing 0 picks class 0
+                unique_codes = np.append(unique_codes, 0)
+                dest = targets[unique_codes[values]]
+                hit = dest >= 0
+                out[row_idx[hit], dest[hit]] = 1.0
+
+        return out
+
     def fit_transform(self, df):
         self.fit(df)
         return self.transform(df)
@@ -145,8 +232,20 @@ class SurveyEncoder:
 # ---------------------------
 # Load Survey Encoder
 # ---------------------------
+ENCODER_PATH = "survey_encoder.pkl"
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
 def load_encoder():
-    return SurveyEncoder.load("survey_encoder.pkl")   # EXACTLY like your notebook
+    """Load the fitted SurveyEncoder once per process (footprint recorded in memory_registry)."""
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                _encoder = tracked_load("survey_encoder", "encoder",
+                                        lambda: SurveyEncoder.load(ENCODER_PATH))   # EXACTLY like your notebook
+    return _encoder
 
 
 # ---------------------------
@@ -157,6 +256,7 @@ def encode_survey_data(data: dict):
     Accept raw survey JSON → encode using SurveyEncoder → return numpy array
     """
     encoder = load_encoder()
+    record_survey(data)  # input-drift counters (off with DRIFT_MONITOR=0; batch paths never call this)
     df = pd.DataFrame([data])
 
     # Ensure numeric column is numeric
@@ -169,43 +269,88 @@ def encode_survey_data(data: dict):
     # So drop target column if present in encoded_single, then reindex columns to match X_train
     encoded_for_pred = encoded_df.drop(columns=['Current_Hair_condition'], errors='ignore')
     encoded_for_pred = encoded_for_pred.reindex(columns=encoded_for_pred.columns, fill_value=0)
-    print("Encoded single row shape after dropping target and reindexing:", encoded_for_pred.shape)
+    logger.debug("encoded single row shape after dropping target and reindexing: %s", encoded_for_pred.shape)
 
     encoded_array = encoded_for_pred.to_numpy().reshape(1, -1)
-    print("Encoded shape:", encoded_array.shape)
+    logger.debug("encoded shape: %s", encoded_array.shape)
 
     return encoded_array
 
 
+def encode_survey_frame(df):
+    """
+    Batch version of encode_survey_data: one row per survey → (n, features) array.
+    Row-for-row identical to calling encode_survey_data on each survey dict.
+    """
+    encoder = load_encoder()
+    df = df.copy()
+    if "Consumed_water_per_day_L" in df.columns:
+        df["Consumed_water_per_day_L"] = pd.to_numeric(df["Consumed_water_per_day_L"], errors="coerce").fillna(0)
+
+    encoded = encoder.transform_batch(df)
+    keep = [i for i, col in enumerate(encoder.feature_columns_) if col != 'Current_Hair_condition']
+    return encoded[:, keep]
+
+
 # -----------------------------
 # LOAD ALL MODELS
 # -----------------------------
 MODEL_DIR = "models/"
 
-def load_models():
-    """Load DNN (.h5), disease CNN (.h5), porosity (.pkl), breakage (.pkl)."""
-    models = {}
+_models = None
+_models_lock = threading.Lock()
+
+
+def _load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _label_table_loader(key):
+    """
+    Porosity / breakage are answer → class lookups: prefer the exported JSON tables
+    (no sklearn); fall back to compiling the pickle in memory.
+    """
+    if os.path.exists(LABEL_TABLES_PATH):
+        return LABEL_TABLES_PATH, lambda path: load_label_tables(path)[key]
 
-    # DNN
-    dnn_path = os.path.join(MODEL_DIR, "DNN_hair_Health_classifier_v1.h5")
-    if os.path.exists(dnn_path):
-        models["dnn_model"] = tf.keras.models.load_model(dnn_path)
+    logger.warning("%s not found, compiling %s in memory — run `flask recommend export-label-tables`",
+                   LABEL_TABLES_PATH, SOURCES[key])
+    return SOURCES[key], lambda path: LabelTable.from_encoder(_load_pickle(path))
 
-    # Disease CNN
-    disease_path = os.path.join(MODEL_DIR, "hair_disease_classifier_accur_v1.h5")
-    if os.path.exists(disease_path):
-        models["disease_model"] = tf.keras.models.load_model(disease_path)
 
-    # POROSITY MODEL
-    porosity_model = os.path.join(MODEL_DIR, "porosity_v1.pkl")
-    if os.path.exists(porosity_model):
-        with open(porosity_model, "rb") as f:
-            models["porosity_model"] = pickle.load(f)
+def _load_models():
+    """Load DNN (.h5), disease CNN (.h5), porosity + breakage lookup tables."""
+    models = {}
 
-    # BREAKAGE MODEL
-    breakage_model = os.path.join(MODEL_DIR, "breakage_v1.pkl")
-    if os.path.exists(breakage_model):
-        with open(breakage_model, "rb") as f:
-            models["breakage_model"] = pickle.load(f)
+    # (key, path, kind, loader, optional) — optional models may be refused by MEMORY_BUDGET_*
+    # Keras models go through load_inference_model: INFERENCE_BACKEND=tflite swaps in the quantized export
+    specs = [
+        ("dnn_model", os.path.join(MODEL_DIR, "DNN_hair_Health_classifier_v1.h5"), INFERENCE_BACKEND,
+         load_inference_model, False),
+    ]
+    if not service_enabled():  # otherwise the CNN lives only in the disease_service worker processes
+        specs.append(("disease_model", DISEASE_MODEL_PATH, INFERENCE_BACKEND, load_inference_model, True))
+    for key in ("porosity_model", "breakage_model"):
+        path, loader = _label_table_loader(key)
+        specs.append((key, path, "label_table", loader, False))
+
+    for key, path, kind, loader, optional in specs:
+        if not os.path.exists(path):
+            continue
+        model = tracked_load(key, kind, lambda: loader(path),
+                             optional=optional, expected_bytes=os.path.getsize(path))
+        if model is not None:
+            models[key] = model
 
     return models
+
+
+def load_models():
+    """Models are loaded once per process and shared; callers must treat the dict as read-only."""
+    global _models
+    if _models is None:
+        with _models_lock:
+            if _models is None:
+                _models = _load_models()
+    return _models
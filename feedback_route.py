@@ -1,7 +1,9 @@
 #feedback route.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from db import SessionLocal
+from db import get_db
 from models import Recommendation, Feedback, HairSurvey
+from recommendation_lookup import get_latest_recommendations, sync_latest_iteration
+from analytics import record_feedback
 import json
 
 feedback_bp = Blueprint("feedback", __name__, url_prefix="/feedback")
@@ -9,7 +11,7 @@ feedback_bp = Blueprint("feedback", __name__, url_prefix="/feedback")
 
 @feedback_bp.route("/<int:survey_id>")
 def feedback_page(survey_id):
-    db = SessionLocal()
+    db = get_db()
     try:
         # ➤ Fetch the survey
         survey = db.query(HairSurvey).filter_by(survey_id=survey_id).first()
@@ -19,14 +21,8 @@ def feedback_page(survey_id):
 
         user_id = survey.user_id
 
-        # ➤ Get the last 4 saved recommendations
-        results = (
-            db.query(Recommendation)
-            .filter_by(user_id=user_id)
-            .order_by(Recommendation.rec_id.desc())
-            .limit(4)
-            .all()
-        )
+        # ➤ Get the latest saved recommendation for each model
+        results = [rec for rec, _ in get_latest_recommendations(db, user_id)]
 
         if not results:
             flash("No previous recommendations found", "warning")
@@ -91,15 +87,12 @@ def feedback_page(survey_id):
         flash("Error loading feedback page", "danger")
         return redirect(url_for("home"))
 
-    finally:
-        db.close()
-
 
 
 # ================= 2. SUBMIT FEEDBACK ================= #
 @feedback_bp.route("/submit/<int:user_id>", methods=["POST"])
 def submit_feedback(user_id):
-    db = SessionLocal()
+    db = get_db()
     try:
         for key, value in request.form.items():
             if key.startswith("rec_"):
@@ -117,16 +110,17 @@ def submit_feedback(user_id):
                     rating=rating
                 )
                 db.add(fb)
-                db.commit()
 
                 # Fetch related recommendation
                 rec = db.query(Recommendation).filter_by(rec_id=rec_id).first()
+                record_feedback(db, rec, rating)
 
                 # If thumbs down → increment iteration
                 if rating == 0:
                     rec.iteration = (rec.iteration or 1) + 1
-                    db.commit()
+                    sync_latest_iteration(db, rec)
 
+        db.commit()  # all ratings in one transaction
         flash("Feedback submitted successfully!", "success")
         return redirect(url_for("recommend.improved_recommendation", user_id=user_id))
 
@@ -135,20 +129,16 @@ def submit_feedback(user_id):
         print("❌ Error:", e)
         flash("Error submitting feedback.", "danger")
         return redirect(url_for("home"))
-    finally:
-        db.close()
 
 
 
 
 # ================= 3. FETCH LATEST SURVEY ID ================= #
-def get_latest_survey(user_id):
-    db = SessionLocal()
+def get_latest_survey(db, user_id):
     survey = (
         db.query(HairSurvey)
         .filter_by(user_id=user_id)
         .order_by(HairSurvey.survey_id.desc())
         .first()
     )
-    db.close()
     return survey.survey_id
@@ -0,0 +1,95 @@
+# fragment_cache.py
+"""
+Rendered-HTML cache for the label-driven sections of results.html.
+
+    {{ rules_fragment("porosity", result.labels.porosity) }}
+
+The breakage / disease / porosity sections depend only on the predicted label and
+the model_rules content, so each is rendered once per (section, label, rules version)
+from templates/fragments/<section>.html. The rules version is a hash of the
+model_rules rows: writes through the ORM invalidate it immediately in this process,
+and every process re-checks it at most every RULES_VERSION_TTL_S seconds so edits
+made elsewhere (another worker, a SQL console) are picked up.
+
+    RULES_VERSION_TTL_S=30
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+
+from flask import render_template
+from markupsafe import Markup
+from sqlalchemy import event
+
+from db import SessionLocal
+from metrics import Counter, register
+from models import ModelRule
+
+RULES_VERSION_TTL_S = float(os.getenv("RULES_VERSION_TTL_S", "30"))
+SECTIONS = {"breakage": "breakage_model", "disease": "disease_model", "porosity": "porosity_model"}
+
+FRAGMENT_CACHE = register(Counter(
+    "ai_hair_fragment_cache_total", "results.html rule-section renders by cache outcome.", "result"
+))
+
+_lock = threading.Lock()
+_rules = None          # (version, {rule_name: rule_json})
+_checked_at = 0.0
+_fragments = {}        # (section, label, version) → Markup
+
+
+def _load_rules():
+    db = SessionLocal.session_factory()
+    try:
+        rows = db.query(ModelRule.rule_id, ModelRule.rule_name, ModelRule.rule_json).order_by(ModelRule.rule_id).all()
+    finally:
+        db.close()
+    rules = {}
+    for _, rule_name, rule_json in rows:
+        rules.setdefault(rule_name, rule_json)  # fetch_rule uses the first row per name
+    payload = json.dumps([tuple(row) for row in rows], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:12], rules
+
+
+def rules_snapshot():
+    """(version, {rule_name: rule_json}), re-read when invalidated or older than the TTL."""
+    global _rules, _checked_at
+    if _rules is None or time.monotonic() - _checked_at > RULES_VERSION_TTL_S:
+        with _lock:
+            if _rules is None or time.monotonic() - _checked_at > RULES_VERSION_TTL_S:
+                version, rules = _load_rules()
+                if _rules is not None and version != _rules[0]:
+                    _fragments.clear()
+                _rules, _checked_at = (version, rules), time.monotonic()
+    return _rules
+
+
+def invalidate(*_):
+    global _checked_at
+    _checked_at = 0.0
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(ModelRule, _event, invalidate)
+
+
+def rules_fragment(section, label):
+    """Cached HTML for one rule-driven results section."""
+    label = str(label) if label else None
+    version, rules = rules_snapshot()
+    key = (section, label, version)
+    html = _fragments.get(key)
+    if html is not None:
+        FRAGMENT_CACHE.inc("hit")
+        return html
+
+    FRAGMENT_CACHE.inc("miss")
+    data = rules.get(SECTIONS[section]) or {}
+    rule = data.get(label) if label is not None else None
+    html = Markup(render_template(f"fragments/{section}.html", label=label, rule=rule or {}))
+    with _lock:
+        if _rules is not None and _rules[0] == version:
+            _fragments[key] = html
+    return html
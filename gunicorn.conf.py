@@ -0,0 +1,18 @@
+# gunicorn.conf.py
+"""
+    gunicorn -c gunicorn.conf.py app:app
+
+The master memory-maps the exported ranking artifacts (shared_artifacts.preload)
+before forking, so every worker inherits the same read-only pages. The app itself is
+still imported per worker: TensorFlow must not be initialised before fork.
+"""
+import os
+
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+preload_app = False
+
+
+def on_starting(server):
+    from shared_artifacts import preload
+    preload()
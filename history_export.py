@@ -0,0 +1,138 @@
+# history_export.py
+"""
+Streaming export of one user's full recommendation + feedback history.
+
+    GET /user/<user_id>/history.ndjson     one JSON object per recommendation, ratings nested
+    GET /user/<user_id>/history.csv        one row per (recommendation, rating) for spreadsheets
+
+Only the logged-in owner (session user_id) may download a history; anyone else gets 403.
+
+Recommendations are read HISTORY_PAGE_SIZE at a time with keyset pagination on rec_id;
+each page is a single query that also outer-joins the survey, model and feedback rows.
+Every page is written out before the next is read, so memory stays flat and the first
+bytes leave as soon as the first page is ready. Each page uses its own short-lived
+connection — no transaction stays open while a slow client downloads.
+"""
+import io
+import os
+import csv
+import json
+
+from sqlalchemy import select
+
+from db import engine
+from models import Recommendation, Feedback, HairSurvey, ModelVersion
+
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "500"))
+
+CSV_COLUMNS = [
+    "rec_id", "survey_id", "survey_created_at", "model_id", "model_name", "iteration",
+    "prediction", "recommendation", "created_at", "feedback_id", "rating", "feedback_at",
+]
+
+
+def _page_stmt(user_id, after_rec_id, page_size):
+    R, F = Recommendation, Feedback
+    page = (
+        select(R.rec_id)
+        .where(R.user_id == user_id, R.rec_id > after_rec_id)
+        .order_by(R.rec_id)
+        .limit(page_size)
+        .subquery()
+    )
+    return (
+        select(
+            R.rec_id, R.survey_id, HairSurvey.created_at.label("survey_created_at"),
+            R.model_id, ModelVersion.model_name, R.iteration,
+            R.model_prediction.label("prediction"), R.recommendation_json, R.created_at,
+            F.feedback_id, F.rating, F.created_at.label("feedback_at"),
+        )
+        .join(page, page.c.rec_id == R.rec_id)
+        .outerjoin(HairSurvey, HairSurvey.survey_id == R.survey_id)
+        .outerjoin(ModelVersion, ModelVersion.model_id == R.model_id)
+        .outerjoin(F, F.rec_id == R.rec_id)
+        .order_by(R.rec_id, F.feedback_id)
+    )
+
+
+def _decode(recommendation_json):
+    # save_recommendations_to_db stores a json.dumps() string inside the JSON column
+    if isinstance(recommendation_json, str):
+        try:
+            return json.loads(recommendation_json)
+        except ValueError:
+            return recommendation_json
+    return recommendation_json
+
+
+def _iso(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def iter_history_rows(user_id, page_size=HISTORY_PAGE_SIZE):
+    """
+    Yield lists of joined row mappings, one list per page of recommendations.
+    Each query reads one recommendation past the page: when it is there another page
+    follows, otherwise this was the last one — no trailing empty query.
+    """
+    last = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(_page_stmt(user_id, last, page_size + 1)).mappings().all()
+        rec_ids = list(dict.fromkeys(row["rec_id"] for row in rows))
+        more = len(rec_ids) > page_size
+        if more:
+            rows = [row for row in rows if row["rec_id"] != rec_ids[-1]]
+        if rows:
+            yield rows
+        if not more:
+            return
+        last = rows[-1]["rec_id"]
+
+
+def iter_history_records(user_id, page_size=HISTORY_PAGE_SIZE):
+    """Yield lists of history records (one per recommendation, feedback nested), one list per page."""
+    for rows in iter_history_rows(user_id, page_size):
+        records = []
+        for row in rows:
+            if not records or records[-1]["rec_id"] != row["rec_id"]:
+                records.append({
+                    "rec_id": row["rec_id"],
+                    "survey_id": row["survey_id"],
+                    "survey_created_at": row["survey_created_at"],
+                    "model_id": row["model_id"],
+                    "model_name": row["model_name"],
+                    "iteration": row["iteration"],
+                    "prediction": row["prediction"],
+                    "recommendation": _decode(row["recommendation_json"]),
+                    "created_at": _iso(row["created_at"]),
+                    "feedback": [],
+                })
+            if row["feedback_id"] is not None:
+                records[-1]["feedback"].append({
+                    "feedback_id": row["feedback_id"],
+                    "rating": row["rating"],
+                    "created_at": _iso(row["feedback_at"]),
+                })
+        yield records
+
+
+def stream_ndjson(user_id, page_size=HISTORY_PAGE_SIZE):
+    for records in iter_history_records(user_id, page_size):
+        yield "".join(json.dumps(record, default=str) + "\n" for record in records)
+
+
+def stream_csv(user_id, page_size=HISTORY_PAGE_SIZE):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    yield buf.getvalue()  # header goes out before the first query
+
+    for rows in iter_history_rows(user_id, page_size):
+        buf.seek(0)
+        buf.truncate()
+        for row in rows:
+            values = dict(row)
+            values["recommendation"] = json.dumps(_decode(values.pop("recommendation_json")), default=str)
+            writer.writerow([_iso(values[column]) for column in CSV_COLUMNS])
+        yield buf.getvalue()
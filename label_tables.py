@@ -0,0 +1,114 @@
+# label_tables.py
+"""
+Dependency-free replacement for the porosity / breakage LabelEncoder pickles.
+
+    flask recommend export-label-tables     # pickles → models/label_tables_v1.json (parity-checked)
+
+The pickles only map a survey answer to a class index, so they are compiled into
+plain string → int tables. Lookups normalize the answer (strip + lower-case) and
+send anything unseen, blank or missing to the table's unknown bucket (None)
+instead of raising like LabelEncoder.transform.
+"""
+import os
+import json
+import math
+import pickle
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = "models"
+LABEL_TABLES_PATH = os.path.join(MODEL_DIR, "label_tables_v1.json")
+SOURCES = {
+    "porosity_model": os.path.join(MODEL_DIR, "porosity_v1.pkl"),
+    "breakage_model": os.path.join(MODEL_DIR, "breakage_v1.pkl"),
+}
+
+
+def normalize(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return str(value).strip().lower()
+
+
+class LabelTable:
+    """O(1) answer → class index lookup with an explicit unknown bucket."""
+
+    def __init__(self, classes, lookup, unknown=None):
+        self.classes = classes
+        self.lookup_table = lookup
+        self.unknown = unknown
+
+    @classmethod
+    def from_encoder(cls, encoder):
+        classes = [c for c in encoder.classes_ if normalize(c) is not None]  # the fitted NaN class is dropped
+        lookup = {normalize(c): int(i) for i, c in enumerate(encoder.classes_) if normalize(c) is not None}
+        return cls([str(c) for c in classes], lookup)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["classes"], data["lookup"], data.get("unknown"))
+
+    def to_dict(self):
+        return {"classes": self.classes, "lookup": self.lookup_table, "unknown": self.unknown}
+
+    def lookup(self, value):
+        key = normalize(value)
+        if key is None:
+            return self.unknown
+        return self.lookup_table.get(key, self.unknown)
+
+
+# ──────────────────────────────────────────────
+# LOAD (no sklearn)
+# ──────────────────────────────────────────────
+def load_label_tables(path=LABEL_TABLES_PATH):
+    """name → LabelTable from the exported artifact, or {} if it has not been exported."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    return {name: LabelTable.from_dict(table) for name, table in data["tables"].items()}
+
+
+# ──────────────────────────────────────────────
+# EXPORT (unpickling needs sklearn — build step only)
+# ──────────────────────────────────────────────
+def check_parity(encoder, table):
+    """Return [(value, pickle_class, table_class)] for every fitted class the two disagree on."""
+    mismatches = []
+    for value in encoder.classes_:
+        if normalize(value) is None:
+            continue
+        expected = int(encoder.transform([value])[0])
+        for variant in (value, f" {value} ", str(value).upper(), str(value).lower()):
+            got = table.lookup(variant)
+            if got != expected:
+                mismatches.append((variant, expected, got))
+    return mismatches
+
+
+def export_label_tables(sources=SOURCES, path=LABEL_TABLES_PATH):
+    """Compile each pickle into a LabelTable, verify parity, write the JSON artifact."""
+    tables = {}
+    for name, source in sources.items():
+        with open(source, "rb") as f:
+            encoder = pickle.load(f)
+        table = LabelTable.from_encoder(encoder)
+        mismatches = check_parity(encoder, table)
+        if mismatches:
+            raise ValueError(f"{name}: lookup table disagrees with {source}: {mismatches[:5]}")
+        tables[name] = table
+
+    artifact = {
+        "version": 1,
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+        "sources": {name: os.path.basename(source) for name, source in sources.items()},
+        "tables": {name: table.to_dict() for name, table in tables.items()},
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(artifact, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+    return tables
@@ -0,0 +1,229 @@
+# local_db.py
+"""
+Restore AI_HAIR_ASSIST_backup.sql.gz into a local SQLite file (no MySQL needed).
+
+    python local_db.py                       # → local_ai_hair_assist.db
+    python local_db.py --force -o bench.db   # rebuild even if up to date
+
+Then point the app at it:
+
+    DATABASE_URL=sqlite:///local_ai_hair_assist.db flask run
+"""
+import os
+import re
+import gzip
+import json
+import time
+import sqlite3
+import argparse
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DEFAULT_DUMP = os.path.join(BASE_DIR, "AI_HAIR_ASSIST_backup.sql.gz")
+DEFAULT_SQLITE = os.path.join(BASE_DIR, "local_ai_hair_assist.db")
+
+# ──────────────────────────────────────────────
+# DDL TRANSLATION (MySQL → SQLite)
+# ──────────────────────────────────────────────
+_COLUMN_RE = re.compile(r"^`(?P<name>[^`]+)`\s+(?P<type>[a-z]+)(?P<args>\([^)]*\))?(?P<rest>.*)$")
+_KEY_RE = re.compile(r"^(?P<unique>UNIQUE\s+)?KEY\s+`(?P<name>[^`]+)`\s+\((?P<cols>[^)]*)\)")
+_PK_RE = re.compile(r"^PRIMARY KEY\s+\((?P<cols>[^)]*)\)")
+
+# MySQL base type → SQLite declared type (keeps SQLAlchemy type affinity sensible)
+TYPE_MAP = {
+    "int": "INTEGER", "bigint": "INTEGER", "smallint": "INTEGER", "tinyint": "INTEGER",
+    "float": "REAL", "double": "REAL", "decimal": "NUMERIC",
+    "varchar": "VARCHAR", "char": "CHAR", "text": "TEXT", "longtext": "TEXT", "mediumtext": "TEXT",
+    "enum": "TEXT", "json": "JSON",
+    "timestamp": "TIMESTAMP", "datetime": "DATETIME", "date": "DATE",
+}
+
+# column clauses SQLite doesn't understand
+_STRIP_RE = re.compile(
+    r"\s+(?:unsigned|CHARACTER SET \w+|COLLATE \w+|ON UPDATE CURRENT_TIMESTAMP|AUTO_INCREMENT)", re.I
+)
+
+
+def _translate_create(table, body_lines):
+    """Return (create_table_sql, [create_index_sql], {json_column_names})."""
+    columns, indexes, json_cols = [], [], set()
+    primary_key, autoinc_col = None, None
+
+    for raw in body_lines:
+        line = raw.strip().rstrip(",")
+        col = _COLUMN_RE.match(line)
+        if col:
+            name, mysql_type = col["name"], col["type"].lower()
+            sqlite_type = TYPE_MAP.get(mysql_type, "TEXT")
+            if sqlite_type in ("VARCHAR", "CHAR") and col["args"]:
+                sqlite_type += col["args"]
+            if mysql_type == "json":
+                json_cols.add(name)
+            if "AUTO_INCREMENT" in col["rest"]:
+                autoinc_col = name
+            rest = _STRIP_RE.sub("", col["rest"])
+            columns.append([name, sqlite_type, rest])
+            continue
+
+        pk = _PK_RE.match(line)
+        if pk:
+            primary_key = pk["cols"].replace("`", '"')
+            continue
+
+        key = _KEY_RE.match(line)
+        if key:
+            unique = "UNIQUE " if key["unique"] else ""
+            indexes.append(
+                f'CREATE {unique}INDEX "ix_{table}_{key["name"]}" ON "{table}" ({key["cols"].replace("`", chr(34))})'
+            )
+        # CONSTRAINT … FOREIGN KEY / CHECK lines are dropped: SQLite doesn't enforce FKs by default
+
+    defs = []
+    for name, sqlite_type, rest in columns:
+        if name == autoinc_col and primary_key == f'"{name}"':
+            # SQLite only auto-increments an inline INTEGER PRIMARY KEY
+            defs.append(f'"{name}" INTEGER PRIMARY KEY AUTOINCREMENT')
+        else:
+            defs.append(f'"{name}" {sqlite_type}{rest}')
+    if primary_key and not (autoinc_col and primary_key == f'"{autoinc_col}"'):
+        defs.append(f"PRIMARY KEY ({primary_key})")
+
+    create = f'CREATE TABLE "{table}" (\n  ' + ",\n  ".join(defs) + "\n)"
+    return create, indexes, json_cols
+
+
+# ──────────────────────────────────────────────
+# INSERT PARSING (MySQL extended inserts)
+# ──────────────────────────────────────────────
+_TOKEN_RE = re.compile(
+    r"'(?P<str>(?:[^'\\]|\\.|'')*)'"
+    r"|(?P<null>NULL)"
+    r"|(?P<num>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)"
+    r"|(?P<open>\()|(?P<close>\))"
+)
+_ESCAPE_RE = re.compile(r"\\(.)|''", re.S)
+_ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+_INSERT_RE = re.compile(r"^INSERT INTO `(?P<table>[^`]+)` VALUES ")
+
+
+def _unescape(value):
+    if "\\" not in value and "''" not in value:
+        return value
+    return _ESCAPE_RE.sub(lambda m: _ESCAPES.get(m[1], m[1]) if m[1] is not None else "'", value)
+
+
+def _parse_values(values_sql):
+    """Yield one tuple per `(…)` group of a MySQL extended INSERT."""
+    row = None
+    for tok in _TOKEN_RE.finditer(values_sql):
+        kind = tok.lastgroup
+        if kind == "open":
+            row = []
+        elif kind == "close":
+            yield tuple(row)
+            row = None
+        elif kind == "str":
+            row.append(_unescape(tok["str"]))
+        elif kind == "null":
+            row.append(None)
+        else:
+            num = tok["num"]
+            row.append(float(num) if ("." in num or "e" in num.lower()) else int(num))
+
+
+def _normalize_json(value):
+    # keep JSON columns valid JSON text so SQLAlchemy's JSON type and json_extract() work
+    if value is None:
+        return None
+    try:
+        json.loads(value)
+        return value
+    except (TypeError, ValueError):
+        return json.dumps(value)
+
+
+# ──────────────────────────────────────────────
+# RESTORE
+# ──────────────────────────────────────────────
+def restore_dump(dump_path=DEFAULT_DUMP, sqlite_path=DEFAULT_SQLITE, force=False):
+    """Stream the gzipped MySQL dump into `sqlite_path`. Returns {table: row_count}."""
+    if (not force and os.path.exists(sqlite_path)
+            and os.path.getmtime(sqlite_path) >= os.path.getmtime(dump_path)):
+        print(f"✅ {sqlite_path} is up to date (use --force to rebuild).")
+        return None
+
+    tmp_path = sqlite_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    counts, json_cols, pending_indexes = {}, {}, []
+    create_table, create_body = None, []
+
+    with gzip.open(dump_path, "rt", encoding="utf-8") as dump:
+        for line in dump:
+            if create_table is not None:
+                if line.startswith(")"):
+                    ddl, indexes, jcols = _translate_create(create_table, create_body)
+                    conn.execute(f'DROP TABLE IF EXISTS "{create_table}"')
+                    conn.execute(ddl)
+                    pending_indexes.extend(indexes)
+                    json_cols[create_table] = jcols
+                    counts[create_table] = 0
+                    create_table, create_body = None, []
+                else:
+                    create_body.append(line)
+                continue
+
+            if line.startswith("CREATE TABLE `"):
+                create_table = line.split("`")[1]
+                continue
+
+            m = _INSERT_RE.match(line)
+            if not m:
+                continue  # comments, LOCK/UNLOCK, SET, DROP …
+
+            table = m["table"]
+            rows = list(_parse_values(line[m.end():]))
+            if not rows:
+                continue
+            names = [r[1] for r in conn.execute(f'PRAGMA table_info("{table}")')]
+            jcols = [i for i, n in enumerate(names) if n in json_cols.get(table, ())]
+            if jcols:
+                rows = [
+                    tuple(_normalize_json(v) if i in jcols else v for i, v in enumerate(row))
+                    for row in rows
+                ]
+            placeholders = ",".join("?" * len(rows[0]))
+            conn.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})', rows)
+            counts[table] += len(rows)
+
+    # build indexes after the bulk load — much faster than maintaining them per row
+    for ddl in pending_indexes:
+        conn.execute(ddl)
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, sqlite_path)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restore the MySQL backup dump into a local SQLite file.")
+    parser.add_argument("--dump", default=DEFAULT_DUMP, help="gzipped mysqldump (default: %(default)s)")
+    parser.add_argument("-o", "--output", default=DEFAULT_SQLITE, help="SQLite file to write (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the SQLite file is newer than the dump")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = restore_dump(args.dump, args.output, force=args.force)
+    if counts is None:
+        return
+    for table, n in counts.items():
+        print(f"  {table:<20} {n:>7} rows")
+    print(f"✅ Restored {args.output} in {time.perf_counter() - start:.2f}s")
+    print(f"   DATABASE_URL=sqlite:///{args.output}")
+
+
+if __name__ == "__main__":
+    main()
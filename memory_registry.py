@@ -0,0 +1,155 @@
+# memory_registry.py
+"""
+Byte-footprint accounting for everything a worker loads once and keeps resident:
+Keras models, sklearn pickles, the survey encoder, product DataFrames, TF-IDF index.
+
+Each load runs between two tracemalloc snapshots (Python/NumPy heap growth) and is
+also sized directly (weights, DataFrame deep usage, sparse buffers) because TensorFlow's
+own allocator is invisible to tracemalloc.
+
+Budgets (optional):
+    MEMORY_BUDGET_MB=1500        total budget for registered artifacts
+    MEMORY_BUDGET_ENFORCE=1      refuse optional models that would exceed it (default: warn only)
+"""
+import os
+import time
+import pickle
+import logging
+import threading
+import tracemalloc
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MEMORY_BUDGET_BYTES = int(float(os.getenv("MEMORY_BUDGET_MB", "0")) * 1024 * 1024) or None
+MEMORY_BUDGET_ENFORCE = os.getenv("MEMORY_BUDGET_ENFORCE", "0") == "1"
+
+_lock = threading.Lock()
+_entries = {}
+# one traced load at a time: tracemalloc is process-global, so a concurrent load could
+# stop tracing between another's snapshots. Reentrant for loaders that load nested artifacts.
+_trace_lock = threading.RLock()
+
+
+# ──────────────────────────────────────────────
+# SIZING
+# ──────────────────────────────────────────────
+def estimate_nbytes(obj):
+    """Best-effort resident size of a loaded artifact."""
+    if obj is None:
+        return 0
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if hasattr(obj, "memory_usage") and hasattr(obj, "columns"):  # pandas DataFrame
+        return int(obj.memory_usage(deep=True).sum())
+    if all(hasattr(obj, a) for a in ("data", "indices", "indptr")):  # scipy CSR/CSC
+        return int(obj.data.nbytes + obj.indices.nbytes + obj.indptr.nbytes)
+    if hasattr(obj, "get_weights"):  # Keras model
+        return int(sum(w.nbytes for w in obj.get_weights()))
+    if hasattr(obj, "nbytes"):  # TFLiteModel (flatbuffer size)
+        return int(obj.nbytes)
+    try:
+        return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+def _registered_total():
+    # memory-mapped artifacts live in the page cache, shared by every worker → not budgeted
+    with _lock:
+        return sum(e["bytes"] for e in _entries.values() if not e.get("shared"))
+
+
+# ──────────────────────────────────────────────
+# TRACKED LOAD
+# ──────────────────────────────────────────────
+def tracked_load(name, kind, loader, optional=False, expected_bytes=None):
+    """
+    Call loader(), record its footprint under `name`, and return the result.
+    Optional artifacts return None instead of loading when MEMORY_BUDGET_ENFORCE is on
+    and `expected_bytes` (e.g. file size) would push the total past the budget.
+    """
+    if MEMORY_BUDGET_BYTES and expected_bytes:
+        projected = _registered_total() + expected_bytes
+        if projected > MEMORY_BUDGET_BYTES:
+            if optional and MEMORY_BUDGET_ENFORCE:
+                logger.warning(
+                    "memory budget: refusing optional %s '%s' (~%.1f MB would bring total to %.1f / %.1f MB)",
+                    kind, name, expected_bytes / 2**20, projected / 2**20, MEMORY_BUDGET_BYTES / 2**20,
+                )
+                with _lock:
+                    _entries[name] = {"kind": kind, "bytes": 0, "traced_bytes": 0, "estimated_bytes": expected_bytes,
+                                      "optional": optional, "refused": True, "loaded_at": time.time()}
+                return None
+            logger.warning("memory budget: loading %s '%s' is expected to exceed the budget", kind, name)
+
+    with _trace_lock:
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+        try:
+            obj = loader()
+        finally:
+            after = tracemalloc.take_snapshot()
+            if started_here:
+                tracemalloc.stop()
+    traced = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    entry = {
+        "kind": kind,
+        "bytes": max(estimate_nbytes(obj), traced),
+        "traced_bytes": traced,
+        "estimated_bytes": estimate_nbytes(obj),
+        "load_seconds": round(time.perf_counter() - start, 3),
+        "optional": optional,
+        "refused": False,
+        "loaded_at": time.time(),
+    }
+    with _lock:
+        _entries[name] = entry
+    logger.info("loaded %s '%s': %.1f MB (traced %.1f MB)", kind, name, entry["bytes"] / 2**20, traced / 2**20)
+
+    total = _registered_total()
+    if MEMORY_BUDGET_BYTES and total > MEMORY_BUDGET_BYTES:
+        logger.warning("memory budget exceeded: %.1f / %.1f MB after loading '%s'",
+                       total / 2**20, MEMORY_BUDGET_BYTES / 2**20, name)
+    return obj
+
+
+def record(name, kind, obj, shared=False):
+    """Register an artifact built elsewhere (sized directly, no tracemalloc); shared = file-backed mmap."""
+    with _lock:
+        _entries[name] = {"kind": kind, "bytes": estimate_nbytes(obj), "traced_bytes": None,
+                          "estimated_bytes": estimate_nbytes(obj), "optional": False,
+                          "refused": False, "shared": shared, "loaded_at": time.time()}
+    return obj
+
+
+# ──────────────────────────────────────────────
+# REPORT
+# ──────────────────────────────────────────────
+def _process_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Linux reports KiB
+
+
+def memory_report():
+    with _lock:
+        entries = {name: dict(e) for name, e in _entries.items()}
+    total = sum(e["bytes"] for e in entries.values() if not e.get("shared"))
+    return {
+        "pid": os.getpid(),
+        "process_rss_bytes": _process_rss_bytes(),
+        "registered_total_bytes": total,
+        "shared_total_bytes": sum(e["bytes"] for e in entries.values() if e.get("shared")),
+        "budget_bytes": MEMORY_BUDGET_BYTES,
+        "budget_enforced": MEMORY_BUDGET_ENFORCE,
+        "entries": dict(sorted(entries.items(), key=lambda kv: -kv[1]["bytes"])),
+    }
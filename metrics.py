@@ -0,0 +1,105 @@
+# metrics.py
+"""
+Lightweight in-process timing spans + Prometheus text exposition.
+
+    with span("encode"):
+        encoded = encode_survey_data(raw)
+
+Every span feeds the `ai_hair_stage_seconds{stage=...}` histogram, served at
+/admin/metrics. Counters live per process — scrape each worker separately.
+"""
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_name, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label → [bucket counts…, +Inf count, sum]
+
+    def observe(self, label, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[idx] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {label: list(series) for label, series in self._series.items()}
+        for label, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{self.label_name}="{label}",le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{self.label_name}="{label}"}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{self.label_name}="{label}"}} {cumulative}')
+        return "\n".join(lines)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_name):
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, label, amount=1):
+        with self._lock:
+            self._values[label] = self._values.get(label, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for label, value in sorted(snapshot.items()):
+            lines.append(f'{self.name}{{{self.label_name}="{label}"}} {value}')
+        return "\n".join(lines)
+
+
+# ──────────────────────────────────────────────
+# REGISTRY
+# ──────────────────────────────────────────────
+STAGE_SECONDS = Histogram(
+    "ai_hair_stage_seconds", "Time spent in each recommendation pipeline stage.", "stage"
+)
+STAGE_ERRORS = Counter(
+    "ai_hair_stage_errors_total", "Recommendation pipeline stages that raised.", "stage"
+)
+
+REGISTRY = [STAGE_SECONDS, STAGE_ERRORS]
+
+
+def register(metric):
+    """Expose another Histogram/Counter at /admin/metrics."""
+    REGISTRY.append(metric)
+    return metric
+
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(stage, time.perf_counter() - start)
+
+
+def render_prometheus():
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
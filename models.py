@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text
+from sqlalchemy import Column, Integer, String, DateTime, Date, Float, Text, UniqueConstraint, Index, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime, UTC
@@ -125,6 +125,10 @@ class Recommendation(Base):
     recommendation_json = Column(JSON, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_recommendations_user_rec", "user_id", "rec_id"),  # per-user history keyset scans
+    )
+
 
 class Feedback(Base):
     __tablename__ = "feedback"
@@ -136,3 +140,106 @@ class Feedback(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class LatestRecommendation(Base):
+    """Pointer to the newest recommendation per (user, model)."""
+    __tablename__ = "latest_recommendations"
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+    model_id = Column(Integer, ForeignKey("model_versions.model_id"), primary_key=True)
+    rec_id = Column(Integer, ForeignKey("recommendations.rec_id"), nullable=False)
+    iteration = Column(Integer, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class DailyModelRollup(Base):
+    """Per-day counters for each (model, predicted label), updated on every write."""
+    __tablename__ = "daily_model_rollups"
+    day = Column(Date, primary_key=True)
+    model_id = Column(Integer, ForeignKey("model_versions.model_id"), primary_key=True)
+    model_prediction = Column(String(255), primary_key=True, default="")
+    recommendations = Column(Integer, nullable=False, default=0)
+    feedback = Column(Integer, nullable=False, default=0)
+    thumbs_up = Column(Integer, nullable=False, default=0)
+
+
+class SurveyDraft(Base):
+    """Half-finished survey wizard answers, one row per user."""
+    __tablename__ = "survey_drafts"
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+    data = Column(JSON, nullable=False, default=dict)
+    updated_at = Column(DateTime, nullable=False, index=True)
+
+
+class SurveyImage(Base):
+    """Survey → content-addressed upload (see upload_store.py)."""
+    __tablename__ = "survey_images"
+    survey_id = Column(Integer, ForeignKey("hairsurvey.survey_id"), primary_key=True)
+    content_hash = Column(String(64), nullable=False, index=True)
+    path = Column(String(255), nullable=False)
+    preview_path = Column(String(255), nullable=True)
+    size_bytes = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RescoreCheckpoint(Base):
+    """Progress of an offline bulk re-scoring job (see rescore.py), committed with each chunk."""
+    __tablename__ = "rescore_checkpoints"
+    job_id = Column(String(100), primary_key=True)
+    model_id = Column(Integer, ForeignKey("model_versions.model_id"), nullable=False)
+    last_survey_id = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class ShadowPrediction(Base):
+    """Candidate model output recorded next to the live prediction (see shadow.py)."""
+    __tablename__ = "shadow_predictions"
+    shadow_id = Column(Integer, primary_key=True, autoincrement=True)
+    survey_id = Column(Integer, ForeignKey("hairsurvey.survey_id"), nullable=True)
+    candidate_model_id = Column(Integer, ForeignKey("model_versions.model_id"), nullable=True)
+    live_prediction = Column(String(255), nullable=True)
+    candidate_prediction = Column(String(255), nullable=True)
+    live_ms = Column(Float, nullable=True)
+    candidate_ms = Column(Float, nullable=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+
+
+class RecommendationJob(Base):
+    """Background build of a survey's recommendations (see recommendation_jobs.py)."""
+    __tablename__ = "recommendation_jobs"
+    job_id = Column(String(32), primary_key=True)
+    survey_id = Column(Integer, ForeignKey("hairsurvey.survey_id"), nullable=False, index=True)
+    # = survey_id while queued/running, NULL once finished → at most one active job per survey
+    active_survey_id = Column(Integer, nullable=True)
+    status = Column(String(20), nullable=False, default="queued")  # queued | running | done | failed
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (UniqueConstraint("active_survey_id", name="uq_recommendation_jobs_active"),)
+
+
+class InputDriftCount(Base):
+    """Live survey answers per (day, column, answer), flushed from drift_monitor's counters."""
+    __tablename__ = "input_drift_counts"
+    day = Column(Date, primary_key=True)
+    column_name = Column(String(100), primary_key=True)
+    value = Column(String(255), primary_key=True)
+    unknown = Column(Boolean, nullable=False, default=False)  # the fitted encoder has never seen it
+    count = Column(Integer, nullable=False, default=0)
+
+
+class InputDriftScore(Base):
+    """Per-column divergence from the training distribution, one batch per drift check."""
+    __tablename__ = "input_drift_scores"
+    score_id = Column(Integer, primary_key=True, autoincrement=True)
+    computed_at = Column(DateTime, nullable=False, index=True)
+    column_name = Column(String(100), nullable=False)
+    window_days = Column(Integer, nullable=False)
+    samples = Column(Integer, nullable=False, default=0)
+    unknown_rate = Column(Float, nullable=True)
+    divergence = Column(Float, nullable=True)
+    top_unknown = Column(String(255), nullable=True)
@@ -0,0 +1,71 @@
+# predict_budget.py
+"""
+Concurrent predictors with per-model latency budgets.
+
+The four predictors are independent, so they run side by side in a shared thread
+pool. Each one gets a budget measured from the moment they are all submitted; a
+predictor still running when its budget is spent is counted as an overrun and handed
+back as a Future, so the caller can render without it and fill it in later.
+
+    PREDICT_BUDGET_DNN_MS=500
+    PREDICT_BUDGET_POROSITY_MS=100
+    PREDICT_BUDGET_BREAKAGE_MS=100
+    PREDICT_BUDGET_DISEASE_MS=1500     the CNN on a large upload is the usual straggler
+    PREDICT_WORKERS=8                  pool threads shared by all requests in the process
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from metrics import Counter, register
+
+logger = logging.getLogger(__name__)
+
+PREDICT_BUDGETS_S = {
+    name: int(os.getenv(f"PREDICT_BUDGET_{name.upper()}_MS", default)) / 1000
+    for name, default in (("dnn", "500"), ("porosity", "100"), ("breakage", "100"), ("disease", "1500"))
+}
+PREDICT_WORKERS = int(os.getenv("PREDICT_WORKERS", "8"))
+
+BUDGET_OVERRUNS = register(Counter(
+    "ai_hair_predict_budget_overruns_total", "Predictors still running when their latency budget ran out.", "model"
+))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=PREDICT_WORKERS, thread_name_prefix="predict")
+    return _pool
+
+
+def run_predictors(tasks, budgets=PREDICT_BUDGETS_S):
+    """
+    Run {name: callable} concurrently. Returns (results, late): results for every
+    task that finished within its budget, and {name: Future} for the rest. With
+    budgets=None every task is awaited. Exceptions from on-time tasks propagate.
+    """
+    start = time.monotonic()
+    futures = {name: _get_pool().submit(fn) for name, fn in tasks.items()}
+
+    results, late = {}, {}
+    order = sorted(futures, key=lambda name: (budgets or {}).get(name, float("inf")))
+    for name in order:
+        if budgets is None or name not in budgets:
+            results[name] = futures[name].result()
+            continue
+        remaining = start + budgets[name] - time.monotonic()
+        try:
+            results[name] = futures[name].result(timeout=max(remaining, 0))
+        except TimeoutError:
+            BUDGET_OVERRUNS.inc(name)
+            logger.info("predictor %s over its %.0f ms budget — deferring", name, budgets[name] * 1000)
+            late[name] = futures[name]
+    return results, late
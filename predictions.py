@@ -4,13 +4,20 @@ import pandas as pd
 import cv2
 import os
 import json
+import logging
 from feature_engineering import encode_survey_data
-from db import SessionLocal
+from db import engine
 from sqlalchemy import text
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from collections import defaultdict
 from models import ModelRule
+from metrics import span
+from memory_registry import tracked_load, record
+from shared_artifacts import get_ranking_index, RankingIndex
+from shadow import submit_shadow
+from disease_service import predict_image, service_enabled, DiseaseServiceBusy
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
 
 LABEL_MAP = {
         "dnn_model": { 3: "Healthy", 2: "Moisturized",
@@ -27,7 +34,8 @@ def predict_dnn(models, survey):
         return None
 
     raw_dict = survey.to_dict() if hasattr(survey, "to_dict") else (survey if isinstance(survey, dict) else dict(survey))
-    encoded = encode_survey_data(raw_dict)
+    with span("encode"):
+        encoded = encode_survey_data(raw_dict)
 
     # If encoder returned DataFrame with target column, drop it
     if isinstance(encoded, pd.DataFrame) and "Current_Hair_condition" in encoded.columns:
@@ -40,33 +48,42 @@ def predict_dnn(models, survey):
         arr = arr.T
     arr = arr.reshape(1, -1)
 
-    print("ENCODED SHAPE:", arr.shape)  # debug
+    logger.debug("encoded shape: %s", arr.shape)
 
-    pred = dnn.predict(arr)
+    start = perf_counter()
+    with span("dnn"):
+        pred = dnn.predict(arr, verbose=0)
     cls = int(np.argmax(pred, axis=1)[0])
 
+    # candidate version (if configured) scores a sample of these in the background
+    submit_shadow(arr, cls, perf_counter() - start, raw_dict.get("survey_id"), LABEL_MAP["dnn_model"])
+
     return (cls)
 
 
 # -----------------------------
 # 2) DISEASE CNN PREDICTION
 # -----------------------------
-def predict_disease(models, survey_id):
-    cnn = models.get("disease_model")
-    if cnn is None:
+def predict_disease(models, path):
+    """`path`: the survey's stored image (upload_store.survey_image_path), None when there is none."""
+    if models.get("disease_model") is None and not service_enabled():
         return None
 
-    path = f"static/uploads/{survey_id}.jpg"
-    if not os.path.exists(path):
+    if path is None:
         return None
 
-    img = cv2.imread(path)
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    img = cv2.resize(img, (224, 224))
-    img = img.astype("float32") / 255.0
-    img = np.expand_dims(img, axis=0)
+    with span("cnn"):
+        img = cv2.imread(path)
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        img = cv2.resize(img, (224, 224))
+        img = img.astype("float32") / 255.0
+        img = np.expand_dims(img, axis=0)
 
-    pred = cnn.predict(img)
+        try:
+            pred = predict_image(models, img)
+        except DiseaseServiceBusy:
+            logger.warning("disease model busy, skipping diagnosis for %s", path)
+            return None
     cls = int(np.argmax(pred, axis=1)[0])
 
     return cls
@@ -96,8 +113,9 @@ def predict_porosity(models, survey):
     if raw_value is None:
         return None
 
-    label = model.transform([raw_value])[0]
-    return int(label)
+    with span("porosity"):
+        label = model.lookup(raw_value)  # LabelTable: unseen / blank answers → None
+    return label
 
 
 # -----------------------------
@@ -122,69 +140,61 @@ def predict_breakage(models, survey):
     if raw_value is None:
         return None
 
-    label = model.transform([raw_value])[0]
-    return int(label)
+    with span("breakage"):
+        label = model.lookup(raw_value)  # LabelTable: unseen / blank answers → None
+    return label
 
 
 # -----------------------------
 # 5) FULL COMBINED RESULTS HELPER (DNN rule fetch for ingredients)
 # -----------------------------
-def fetch_rule_dnn(model_type, cls_index):
+def fetch_rule_dnn(db, model_type, cls_index):
     if cls_index is None:
         return None
 
-    db = SessionLocal()
-    try:
-        # get label name e.g. 3 → "Healthy"
-        label = LABEL_MAP.get(model_type, {}).get(cls_index)
-
-        print("\n🔍 MODEL TYPE:", model_type)
-        print("🔍 CLASS INDEX:", cls_index)
-        print("🔍 LABEL MAP RESULT:", label)
+    # get label name e.g. 3 → "Healthy"
+    label = LABEL_MAP.get(model_type, {}).get(cls_index)
+    logger.debug("rule lookup: model_type=%s class_index=%s label=%s", model_type, cls_index, label)
 
+    with span("rule_lookup"):
         row = db.query(ModelRule).filter_by(rule_name=model_type).first()
 
-        if not row:
-            print("❌ No rule row found in DB")
-            return None
-
-        data = row.rule_json  # already dict from SQLAlchemy
+    if not row:
+        logger.warning("no rule row found for %s", model_type)
+        return None
 
-        print("📌 AVAILABLE KEYS IN JSON:", list(data.keys()))
+    data = row.rule_json  # already dict from SQLAlchemy
 
-        # fallback to key as string or index if needed
-        result = data.get(label) or data.get(str(label)) or data.get(cls_index)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("available keys in rule json: %s", list(data.keys()))
 
-        if result:
-            print("✅ MATCH FOUND →", result)
-            return result
-        else:
-            print(f"⚠ NO MATCH FOR '{label}' (or '{str(label)}')")
-            return None
+    # fallback to key as string or index if needed
+    result = data.get(label) or data.get(str(label)) or data.get(cls_index)
 
-    finally:
-        db.close()
+    if result:
+        logger.debug("rule match for %s: %s", label, result)
+        return result
+    else:
+        logger.info("no rule match for %r in %s", label, model_type)
+        return None
 
 #---------------- INGREDIENT DATA LOADING ----------------#
 def get_products():
-    db = SessionLocal()
-    try:
-        return pd.read_sql(text("SELECT * FROM products_clean"), db.bind)
-    finally:
-        db.close()
+    with engine.connect() as conn:
+        return pd.read_sql(text("SELECT * FROM products_clean"), conn)
 
-df = get_products()
+# TF-IDF over product functions: memory-mapped from `flask recommend export-shared-artifacts`,
+# or built from products_clean when there is no export (see shared_artifacts.py)
+ranking_index = tracked_load(
+    "ranking_index", "sparse_index",
+    lambda: get_ranking_index(build=lambda: RankingIndex.build(get_products())),
+)
+if ranking_index.mapped:
+    record("ranking_index", "mmap", ranking_index, shared=True)
 
-# Only keep necessary columns
-df_filtered = df[["ingredients", "functions"]].dropna().drop_duplicates().reset_index(drop=True)
 
-# TF-IDF on functions
-vectorizer = TfidfVectorizer(stop_words="english")
-tfidf_matrix = vectorizer.fit_transform(df_filtered["functions"].fillna(""))
-
-
-def recommend_ingredients_grouped(model_type, condition, iteration=1, top_n=3):
-    target_functions = fetch_rule_dnn(model_type, condition)
+def recommend_ingredients_grouped(db, model_type, condition, iteration=1, top_n=3):
+    target_functions = fetch_rule_dnn(db, model_type, condition)
 
     if not target_functions:
         return {"error": f"No ingredient rules found for: {condition}"}
@@ -199,20 +209,19 @@ def recommend_ingredients_grouped(model_type, condition, iteration=1, top_n=3):
             ]
 
     # Vector similarity
-    target_vec = vectorizer.transform([" ".join(target_functions)])
-    sim_scores = cosine_similarity(target_vec, tfidf_matrix).flatten()
-
-    df_filtered["score"] = sim_scores
-    ranked = df_filtered.sort_values(by="score", ascending=False).head(50)
+    with span("tfidf_rank"):
+        sim_scores = ranking_index.scores(" ".join(target_functions))
+        # same sort as the old DataFrame.sort_values → identical order among tied scores
+        ranked = pd.Series(sim_scores).sort_values(ascending=False).index[:50]
 
     grouped_recs = defaultdict(list)
 
-    # Group by function
-    for _, row in ranked.iterrows():
-        for func in str(row["functions"]).split(", "):
+    # Group by function (only the top rows' strings are ever decoded)
+    for i in ranked:
+        for func in ranking_index.functions[i].split(", "):
             if func in target_functions:
                 grouped_recs[func].append(
-                    (row["ingredients"], row["score"])
+                    (ranking_index.ingredients[i], float(sim_scores[i]))
                 )
 
     # ───────── Iteration-based slicing ─────────
@@ -0,0 +1,233 @@
+# quantize.py
+"""
+Quantized CPU inference for the Keras models.
+
+    flask recommend export-quantized --model dnn --mode int8          # → models/DNN_hair_Health_classifier_v1.int8.tflite
+    flask recommend export-quantized --model disease --mode float16
+    INFERENCE_BACKEND=tflite TFLITE_MODE=int8 flask run                # load_models() prefers the .tflite artifacts
+    KERAS_COMPILED_PREDICT=0 flask run                                 # plain model.predict for the Keras backend
+
+Calibration data comes from what is already stored: hairsurvey rows (DNN) and
+uploaded scalp images (disease CNN). A held-out slice is never shown to the
+converter; the artifact is only written if its top-1 agreement with the float
+Keras model on that slice reaches --threshold.
+"""
+import os
+import glob
+import json
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from disease_service import DISEASE_MODEL_PATH
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "keras")  # keras | tflite
+TFLITE_MODE = os.getenv("TFLITE_MODE", "int8")                # int8 | float16
+KERAS_COMPILED_PREDICT = os.getenv("KERAS_COMPILED_PREDICT", "1") == "1"
+MODES = ("int8", "float16")
+
+MODEL_FILES = {
+    "dnn": os.path.join("models", "DNN_hair_Health_classifier_v1.h5"),
+    "disease": DISEASE_MODEL_PATH,
+}
+
+
+def quantized_path(h5_path, mode=TFLITE_MODE):
+    return f"{os.path.splitext(h5_path)[0]}.{mode}.tflite"
+
+
+# ──────────────────────────────────────────────
+# INTERPRETER BACKEND
+# ──────────────────────────────────────────────
+class TFLiteModel:
+    """tf.lite.Interpreter behind the subset of the Keras API the predictors use: predict(X, verbose=0)."""
+
+    def __init__(self, path):
+        import tensorflow as tf
+
+        self.path = path
+        self.nbytes = os.path.getsize(path)
+        self._interpreter = tf.lite.Interpreter(model_path=path, num_threads=os.cpu_count())
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch = None
+        self._lock = threading.Lock()  # an Interpreter must not be invoked concurrently
+
+    def predict(self, X, verbose=0):
+        X = np.asarray(X, dtype=self._input["dtype"])
+        with self._lock:
+            if self._batch != X.shape[0]:
+                self._interpreter.resize_tensor_input(self._input["index"], X.shape)
+                self._interpreter.allocate_tensors()
+                self._batch = X.shape[0]
+            self._interpreter.set_tensor(self._input["index"], X)
+            self._interpreter.invoke()
+            return self._interpreter.get_tensor(self._output["index"]).copy()
+
+
+class CompiledKerasModel:
+    """
+    Keras model behind one traced tf.function with a fixed (None, *input_shape) float32
+    signature. model.predict() builds a data adapter and step loop on every call — far
+    more than the math for a single survey row; this is a direct graph call instead.
+    """
+
+    def __init__(self, model):
+        import tensorflow as tf
+
+        self.model = model
+        self.input_shape = tuple(model.input_shape[1:])
+        signature = [tf.TensorSpec((None, *self.input_shape), tf.float32)]
+        self._infer = tf.function(lambda x: model(x, training=False), input_signature=signature)
+
+    def predict(self, X, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[1:] != self.input_shape:
+            raise ValueError(f"expected input (n, {', '.join(map(str, self.input_shape))}), got {X.shape}")
+        return self._infer(X).numpy()
+
+    def warmup(self):
+        """Trace the graph now (dummy batch of one) instead of on the first request."""
+        self.predict(np.zeros((1, *self.input_shape), dtype=np.float32))
+        return self
+
+    def get_weights(self):  # memory_registry sizing
+        return self.model.get_weights()
+
+
+def load_inference_model(h5_path):
+    """
+    The configured backend for `h5_path`: a TFLiteModel when selected and exported,
+    else the Keras model — wrapped in a warmed CompiledKerasModel unless disabled.
+    """
+    if INFERENCE_BACKEND == "tflite":
+        path = quantized_path(h5_path)
+        if os.path.exists(path):
+            return TFLiteModel(path)
+        logger.warning("INFERENCE_BACKEND=tflite but %s is missing — using %s", path, h5_path)
+
+    import tensorflow as tf
+    model = tf.keras.models.load_model(h5_path)
+    if KERAS_COMPILED_PREDICT:
+        return CompiledKerasModel(model).warmup()
+    return model
+
+
+# ──────────────────────────────────────────────
+# CALIBRATION / HOLD-OUT DATA
+# ──────────────────────────────────────────────
+def survey_samples(limit=2000):
+    """Encoded feature rows for every stored survey (DNN inputs)."""
+    import pandas as pd
+    from sqlalchemy import select
+    from db import engine
+    from models import HairSurvey
+    from feature_engineering import encode_survey_frame
+
+    table = HairSurvey.__table__
+    with engine.connect() as conn:
+        df = pd.DataFrame(conn.execute(select(table).order_by(table.c.survey_id).limit(limit)).mappings().all())
+    return encode_survey_frame(df).astype(np.float32)
+
+
+def upload_samples(limit=500):
+    """Preprocessed stored uploads (disease CNN inputs), same pipeline as predict_disease."""
+    import cv2
+    from upload_store import UPLOAD_ROOT
+
+    paths = sorted(
+        p for p in glob.glob(os.path.join(UPLOAD_ROOT, "**", "*"), recursive=True)
+        if p.lower().endswith((".jpg", ".jpeg", ".png", ".webp")) and "_preview." not in os.path.basename(p)
+    )[:limit]
+    images = []
+    for path in paths:
+        img = cv2.imread(path)
+        if img is None:
+            continue
+        img = cv2.resize(cv2.cvtColor(img, cv2.COLOR_BGR2RGB), (224, 224))
+        images.append(img.astype("float32") / 255.0)
+    return np.stack(images) if images else np.empty((0, 224, 224, 3), dtype=np.float32)
+
+
+def split_holdout(X, holdout=0.2, seed=0):
+    idx = np.random.default_rng(seed).permutation(len(X))
+    n_holdout = max(1, int(round(len(X) * holdout)))
+    return X[idx[n_holdout:]], X[idx[:n_holdout]]
+
+
+# ──────────────────────────────────────────────
+# EXPORT + PARITY GATE
+# ──────────────────────────────────────────────
+def convert(keras_model, mode, calibration):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        # int8 weights + activations calibrated on stored data; float in/out so callers are unchanged
+        def representative_dataset():
+            for row in calibration:
+                yield [row[None, ...]]
+        converter.representative_dataset = representative_dataset
+    return converter.convert()
+
+
+def top1_agreement(keras_model, tflite_path, X):
+    expected = np.argmax(keras_model.predict(X, verbose=0), axis=1)
+    got = np.argmax(TFLiteModel(tflite_path).predict(X), axis=1)
+    return float(np.mean(expected == got))
+
+
+def export_quantized(model_key, mode="int8", threshold=0.98, holdout=0.2, seed=0):
+    """
+    Convert, gate on held-out top-1 agreement, and publish. Returns the report dict;
+    raises ValueError (nothing published) when agreement < threshold.
+    """
+    import tensorflow as tf
+
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    h5_path = MODEL_FILES[model_key]
+    if not os.path.exists(h5_path):
+        raise FileNotFoundError(h5_path)
+
+    X = survey_samples() if model_key == "dnn" else upload_samples()
+    if len(X) < 2:
+        raise ValueError(f"not enough stored {model_key} samples to calibrate and validate ({len(X)})")
+    calibration, held_out = split_holdout(X, holdout, seed)
+
+    keras_model = tf.keras.models.load_model(h5_path)
+    flatbuffer = convert(keras_model, mode, calibration)
+
+    target = quantized_path(h5_path, mode)
+    candidate = target + ".candidate"
+    with open(candidate, "wb") as f:
+        f.write(flatbuffer)
+
+    agreement = top1_agreement(keras_model, candidate, held_out)
+    report = {
+        "model": model_key,
+        "source": os.path.basename(h5_path),
+        "mode": mode,
+        "calibration_samples": len(calibration),
+        "holdout_samples": len(held_out),
+        "top1_agreement": round(agreement, 4),
+        "threshold": threshold,
+        "size_bytes": len(flatbuffer),
+        "source_size_bytes": os.path.getsize(h5_path),
+        "exported_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    if agreement < threshold:
+        os.remove(candidate)
+        raise ValueError(f"{model_key}/{mode}: top-1 agreement {agreement:.2%} < {threshold:.2%} — not published")
+
+    os.replace(candidate, target)
+    with open(target + ".json", "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    return report
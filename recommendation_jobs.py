@@ -0,0 +1,176 @@
+# recommendation_jobs.py
+"""
+Recommendation builds as background jobs.
+
+The build route only records a job and returns; a small local thread pool runs
+predictions + ranking + the DB save. Job state lives in recommendation_jobs so any
+worker can answer the status poll. A survey has at most one queued/running job —
+a second request for it gets the existing job id back.
+
+    RECOMMEND_JOB_WORKERS=2        background threads per process
+    RECOMMEND_JOB_TIMEOUT_S=600    an active job not updated for this long is treated as abandoned
+                                   (its thread died with a restart/deploy) — checked on submit and on read
+"""
+import os
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import IntegrityError
+
+from db import SessionLocal
+from models import HairSurvey, RecommendationJob
+
+logger = logging.getLogger(__name__)
+
+RECOMMEND_JOB_WORKERS = int(os.getenv("RECOMMEND_JOB_WORKERS", "2"))
+RECOMMEND_JOB_TIMEOUT = timedelta(seconds=int(os.getenv("RECOMMEND_JOB_TIMEOUT_S", "600")))
+ACTIVE = ("queued", "running")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=RECOMMEND_JOB_WORKERS, thread_name_prefix="recommend-job")
+    return _pool
+
+
+# ──────────────────────────────────────────────
+# SUBMIT (request thread)
+# ──────────────────────────────────────────────
+def _active_job(db, survey_id):
+    return db.query(RecommendationJob).filter_by(active_survey_id=survey_id).first()
+
+
+def _expire(db, job):
+    job.status = "failed"
+    job.error = "abandoned (worker restarted or timed out)"
+    job.active_survey_id = None
+    job.finished_at = job.updated_at = datetime.now()
+
+
+def submit_job(db, survey_id):
+    """Return (job, created) — an existing active job for the survey, or a newly queued one."""
+    existing = _active_job(db, survey_id)
+    if existing is not None:
+        if not _is_stale(existing):
+            return existing, False
+        _expire(db, existing)
+        db.commit()
+
+    now = datetime.now()
+    job = RecommendationJob(job_id=uuid.uuid4().hex, survey_id=survey_id, active_survey_id=survey_id,
+                            status="queued", created_at=now, updated_at=now)
+    try:
+        db.add(job)
+        db.commit()
+    except IntegrityError:
+        # a concurrent request queued one first → coalesce onto it
+        db.rollback()
+        existing = _active_job(db, survey_id)
+        if existing is None:
+            raise
+        return existing, False
+
+    _get_pool().submit(run_job, job.job_id)
+    return job, True
+
+
+def _is_stale(job):
+    return job.status in ACTIVE and datetime.now() - job.updated_at >= RECOMMEND_JOB_TIMEOUT
+
+
+def get_job(db, job_id):
+    """The job, with an abandoned queued/running one marked failed first."""
+    job = db.get(RecommendationJob, job_id)
+    if job is not None and _is_stale(job):
+        _expire(db, job)
+        db.commit()
+    return job
+
+
+# ──────────────────────────────────────────────
+# RUN (pool thread)
+# ──────────────────────────────────────────────
+def run_job(job_id):
+    from feature_engineering import load_models
+    from recommendation_routes import build_recommendations_within_budget, save_recommendations_to_db
+
+    # no request here → the job's own session, handed to every helper
+    db = SessionLocal.session_factory()
+    late = {}
+    try:
+        job = db.get(RecommendationJob, job_id)
+        if job is None or job.status not in ACTIVE:
+            return
+        job.status = "running"
+        job.updated_at = datetime.now()
+        db.commit()
+
+        try:
+            survey = db.query(HairSurvey).filter_by(survey_id=job.survey_id).first()
+            if survey is None:
+                raise LookupError(f"survey {job.survey_id} not found")
+            # sections over their latency budget are left pending and filled in by _fill_late
+            result, late = build_recommendations_within_budget(db, load_models(), survey)
+            save_recommendations_to_db(db, survey.survey_id, survey.user_id, result)
+            user_id = survey.user_id
+        except Exception as e:
+            db.rollback()
+            logger.exception("recommendation job %s failed", job_id)
+            job = db.get(RecommendationJob, job_id)
+            job.status, job.error, job.result = "failed", str(e), None
+        else:
+            job.status, job.result = "done", result
+
+        job.active_survey_id = None
+        job.finished_at = job.updated_at = datetime.now()
+        db.commit()
+
+        # only once the partial result is committed, so a fill-in never races the first save
+        if job.status == "done":
+            survey_id = job.survey_id
+            for name, future in late.items():
+                future.add_done_callback(lambda f, name=name: _fill_late(job_id, survey_id, user_id, name, f))
+    finally:
+        db.close()
+
+
+_fill_lock = threading.Lock()  # serializes read-modify-write of job.result between late sections
+
+
+def _fill_late(job_id, survey_id, user_id, name, future):
+    """Done-callback of a predictor that overran its budget: add its section to the finished job."""
+    from recommendation_routes import section_result, save_recommendations_to_db
+
+    db = SessionLocal.session_factory()
+    try:
+        try:
+            cls = future.result()
+        except Exception:
+            logger.exception("late %s prediction for job %s failed", name, job_id)
+            cls = None
+        label, recommendation = section_result(db, name, cls)
+
+        with _fill_lock:
+            job = db.get(RecommendationJob, job_id)
+            result = dict(job.result or {})
+            for key, value in (("classes", cls), ("labels", label), ("recommendations", recommendation)):
+                result[key] = {**result.get(key, {}), name: value}
+            result["pending"] = [p for p in result.get("pending", []) if p != name]
+            job.result = result  # new object → the JSON column is marked dirty
+            job.updated_at = datetime.now()
+            save_recommendations_to_db(db, survey_id, user_id,
+                                       {"labels": {name: label}, "recommendations": {name: recommendation}})
+    except Exception:
+        db.rollback()
+        logger.exception("could not fill in %s for job %s", name, job_id)
+    finally:
+        db.close()
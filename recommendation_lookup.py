@@ -0,0 +1,99 @@
+# recommendation_lookup.py
+from sqlalchemy import func, select
+from models import Recommendation, LatestRecommendation
+
+
+# ──────────────────────────────────────────────
+# WRITE: keep (user_id, model_id) → newest rec_id
+# ──────────────────────────────────────────────
+def upsert_latest_recommendation(db, rec):
+    """
+    Point the (user_id, model_id) lookup row at `rec`.
+    `rec` must already be flushed so rec.rec_id is set.
+    Does not commit — the caller owns the transaction.
+    """
+    if rec.user_id is None or rec.model_id is None:
+        return None  # anonymous / diagnostic rows are not tracked
+
+    latest = db.get(LatestRecommendation, (rec.user_id, rec.model_id))
+    if latest is None:
+        latest = LatestRecommendation(user_id=rec.user_id, model_id=rec.model_id)
+        db.add(latest)
+
+    latest.rec_id = rec.rec_id
+    latest.iteration = rec.iteration
+    return latest
+
+
+def refresh_latest_recommendations(db, model_id, user_ids):
+    """
+    Point the `model_id` lookup rows of `user_ids` at their newest recommendation —
+    for bulk inserts that bypass upsert_latest_recommendation. Other models' rows are
+    left alone. Does not commit. Returns the number of rows upserted.
+    """
+    user_ids = {u for u in user_ids if u is not None}
+    if not user_ids:
+        return 0
+    newest = (
+        select(func.max(Recommendation.rec_id))
+        .where(Recommendation.model_id == model_id, Recommendation.user_id.in_(user_ids))
+        .group_by(Recommendation.user_id)
+    )
+    rows = db.query(Recommendation).filter(Recommendation.rec_id.in_(newest)).all()
+    # one query for the existing lookup rows, so the upserts below find them in the session
+    db.query(LatestRecommendation).filter(
+        LatestRecommendation.model_id == model_id, LatestRecommendation.user_id.in_(user_ids)
+    ).all()
+    for rec in rows:
+        upsert_latest_recommendation(db, rec)
+    return len(rows)
+
+
+def sync_latest_iteration(db, rec):
+    """Mirror an iteration bump on `rec` into the lookup, if it is still the latest."""
+    if rec.user_id is None or rec.model_id is None:
+        return
+    latest = db.get(LatestRecommendation, (rec.user_id, rec.model_id))
+    if latest is not None and latest.rec_id == rec.rec_id:
+        latest.iteration = rec.iteration
+
+
+# ──────────────────────────────────────────────
+# READ: one indexed query per user
+# ──────────────────────────────────────────────
+def get_latest_recommendations(db, user_id):
+    """
+    Return [(Recommendation, iteration)] — newest recommendation per model
+    for `user_id`, ordered by rec_id desc (same order the routes used before).
+    """
+    return (
+        db.query(Recommendation, LatestRecommendation.iteration)
+        .join(LatestRecommendation, LatestRecommendation.rec_id == Recommendation.rec_id)
+        .filter(LatestRecommendation.user_id == user_id)
+        .order_by(Recommendation.rec_id.desc())
+        .all()
+    )
+
+
+# ──────────────────────────────────────────────
+# BACKFILL: rebuild the lookup from recommendations
+# ──────────────────────────────────────────────
+def rebuild_latest_recommendations(db):
+    """Recompute every lookup row from the recommendations table. Returns row count."""
+    newest = (
+        select(func.max(Recommendation.rec_id))
+        .where(Recommendation.user_id.isnot(None), Recommendation.model_id.isnot(None))
+        .group_by(Recommendation.user_id, Recommendation.model_id)
+    )
+    rows = db.query(Recommendation).filter(Recommendation.rec_id.in_(newest)).all()
+
+    db.query(LatestRecommendation).delete()
+    for rec in rows:
+        db.add(LatestRecommendation(
+            user_id=rec.user_id,
+            model_id=rec.model_id,
+            rec_id=rec.rec_id,
+            iteration=rec.iteration,
+        ))
+    db.commit()
+    return len(rows)
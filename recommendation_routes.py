@@ -1,15 +1,32 @@
 # recommendation_routes.py
 from flask import Blueprint, jsonify, render_template, redirect, url_for, flash, request
 from models import  ModelRule, HairSurvey, Recommendation
-from db import SessionLocal
+from db import get_db
 from feature_engineering import encode_survey_data, load_models
 from predictions import recommend_ingredients_grouped, predict_dnn, predict_disease, predict_porosity, predict_breakage
+from recommendation_lookup import upsert_latest_recommendation, get_latest_recommendations, rebuild_latest_recommendations
+from analytics import record_recommendation
+from upload_store import survey_image_path
 import json
+import logging
 from datetime import datetime, UTC
 from flask import render_template
+from metrics import span
+from rescore import run_rescore, DEFAULT_MODEL_FILE, DEFAULT_CHUNK_SIZE
+from label_tables import export_label_tables, LABEL_TABLES_PATH
+from recommendation_jobs import submit_job, get_job, RECOMMEND_JOB_TIMEOUT
+from quantize import export_quantized, MODEL_FILES, MODES
+from fragment_cache import rules_fragment
+from predict_budget import run_predictors, PREDICT_BUDGETS_S
+from shared_artifacts import export_shared_artifacts, SHARED_ARTIFACT_DIR
+import click
+
+logger = logging.getLogger(__name__)
 
 
 recommend_bp = Blueprint("recommend", __name__, url_prefix="/recommend")
+# label-driven results.html sections, cached per (section, label, rules version)
+recommend_bp.add_app_template_global(rules_fragment)
 
 LABEL_MAP = {
     "porosity_model": { 0: "low", 1: "medium", 2: "high"
@@ -27,70 +44,72 @@ LABEL_MAP = {
     }
 }
 
-def fetch_rule(model_type, cls_index):
+def fetch_rule(db, model_type, cls_index):
     if cls_index is None:
         return None
 
-    db = SessionLocal()
-    try:
-        # get label name e.g. 3 → "Healthy"
-        label = LABEL_MAP.get(model_type, {}).get(cls_index)
-
-        print("\n🔍 MODEL TYPE:", model_type)
-        print("🔍 CLASS INDEX:", cls_index)
-        print("🔍 LABEL MAP RESULT:", label)
+    # get label name e.g. 3 → "Healthy"
+    label = LABEL_MAP.get(model_type, {}).get(cls_index)
+    logger.debug("rule lookup: model_type=%s class_index=%s label=%s", model_type, cls_index, label)
 
+    with span("rule_lookup"):
         row = db.query(ModelRule).filter_by(rule_name=model_type).first()
 
-        if not row:
-            print("❌ No rule row found in DB")
-            return None
+    if not row:
+        logger.warning("no rule row found for %s", model_type)
+        return None
+
+    data = row.rule_json  # already dict from SQLAlchemy
 
-        data = row.rule_json  # already dict from SQLAlchemy
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("available keys in rule json: %s", list(data.keys()))
 
-        print("📌 AVAILABLE KEYS IN JSON:", list(data.keys()))
+    # fallback to key as string or index if needed
+    result = data.get(label) or data.get(str(label)) or data.get(cls_index)
+
+    if result:
+        logger.debug("rule match for %s: %s", label, result)
+        return result
+    else:
+        logger.info("no rule match for %r in %s", label, model_type)
+        return None
+
+def section_result(db, name, cls):
+    """(label, recommendation) for one predicted section."""
+    label = LABEL_MAP[f"{name}_model"].get(cls)
+    if name == "dnn":
+        return label, recommend_ingredients_grouped(db, "dnn_model", cls, top_n=3)
+    return label, fetch_rule(db, f"{name}_model", cls)
 
-        # fallback to key as string or index if needed
-        result = data.get(label) or data.get(str(label)) or data.get(cls_index)
 
-        if result:
-            print("✅ MATCH FOUND →", result)
-            return result
-        else:
-            print(f"⚠ NO MATCH FOR '{label}' (or '{str(label)}')")
-            return None
+def build_recommendations_within_budget(db, models, survey, budgets=PREDICT_BUDGETS_S):
+    """
+    Run the four predictors concurrently. Returns (result, late): sections whose
+    predictor overran its budget are listed in result["pending"] and returned as
+    {name: Future of the class index} for the caller to fill in with section_result().
+    The predictors run in pool threads and never touch `db`: the image path is read here.
+    """
+    image_path = survey_image_path(db, survey.survey_id)
+    classes, late = run_predictors({
+        "dnn": lambda: predict_dnn(models, survey),
+        "porosity": lambda: predict_porosity(models, survey),              # numeric
+        "breakage": lambda: predict_breakage(models, survey),              # numeric
+        "disease": lambda: predict_disease(models, image_path),            # string/integer depending on model
+    }, budgets=budgets)
+
+    result = {"classes": {}, "labels": {}, "recommendations": {}, "pending": sorted(late)}
+    for name in ("dnn", "porosity", "breakage", "disease"):
+        if name in classes:
+            result["classes"][name] = classes[name]
+            result["labels"][name], result["recommendations"][name] = section_result(db, name, classes[name])
+    return result, late
 
-    finally:
-        db.close()
 
 #@recommend_bp.route("/build_all_recommendations/<int:survey_id>")
-def build_all_recommendations(models, survey):
-    # Run predictions
-    dnn_cls = predict_dnn(models, survey)
-    por_cls = predict_porosity(models, survey)             # numeric
-    brk_cls = predict_breakage(models, survey)             # numeric
-    dis_cls = predict_disease(models, survey.survey_id)    # string/integer depending on model
-
-    return {
-        "classes": {
-            "dnn": dnn_cls,
-            "porosity": por_cls,
-            "breakage": brk_cls,
-            "disease": dis_cls
-        },
-        "labels": {
-            "dnn": LABEL_MAP["dnn_model"].get(dnn_cls),
-            "porosity": LABEL_MAP["porosity_model"].get(por_cls),
-            "breakage": LABEL_MAP["breakage_model"].get(brk_cls),
-            "disease": LABEL_MAP["disease_model"].get(dis_cls)
-        },
-        "recommendations": {
-            "dnn": recommend_ingredients_grouped("dnn_model",dnn_cls, top_n=3),
-            "porosity": fetch_rule("porosity_model", por_cls),
-            "breakage": fetch_rule("breakage_model", brk_cls),
-            "disease": fetch_rule("disease_model", dis_cls)
-        }
-    }
+def build_all_recommendations(db, models, survey):
+    """Every section, waiting for all predictors (they still run concurrently)."""
+    result, _ = build_recommendations_within_budget(db, models, survey, budgets=None)
+    return result
 
 # ──────────────────────────────────────────────
 # SAVE recommendations to DB
@@ -111,87 +130,116 @@ def save_recommendations_to_db(db, survey_id, user_id, rec_dict):
         "disease": 4     # YOUR DB uses model_id = 5 for disease
     }
 
-    for key in ["dnn", "porosity", "breakage", "disease"]:
-        rec_content = rec_dict["recommendations"].get(key)
-        model_pred_label = rec_dict["labels"].get(key)
-
-        if rec_content is None:
-            continue  # safeguard
+    # one span for the whole write: the row inserts, lookup upserts and the commit
+    with span("db_save"):
+        for key in ["dnn", "porosity", "breakage", "disease"]:
+            rec_content = rec_dict["recommendations"].get(key)
+            model_pred_label = rec_dict["labels"].get(key)
 
-        new_rec = Recommendation(
-            survey_id=survey_id,
-            user_id=user_id,
-            model_id=model_map[key],
-            model_prediction=model_pred_label,  # <-- SAVED HERE
-            recommendation_json=json.dumps(rec_content),
-            created_at=datetime.now()
-        )
+            if rec_content is None:
+                continue  # safeguard
 
-        db.add(new_rec)
+            new_rec = Recommendation(
+                survey_id=survey_id,
+                user_id=user_id,
+                model_id=model_map[key],
+                model_prediction=model_pred_label,  # <-- SAVED HERE
+                recommendation_json=json.dumps(rec_content),
+                created_at=datetime.now()
+            )
+            db.add(new_rec)
+            db.flush()  # assign rec_id for the lookup row
+            upsert_latest_recommendation(db, new_rec)
+            record_recommendation(db, new_rec)
 
-    db.commit()
+        db.commit()
 
 
 # ──────────────────────────────────────────────
 # PUBLIC ROUTE
 # /recommend/build_all_recommendations/<survey_id>
+# Queues (or joins) a background job and sends the browser to its result page.
 # ──────────────────────────────────────────────
 @recommend_bp.route("/build_all_recommendations/<int:survey_id>")
 def build_recommendations_route(survey_id):
-    db = SessionLocal()
-    try:
-        survey = db.query(HairSurvey).filter_by(survey_id=survey_id).first()
-        if not survey:
-            return jsonify({"error": "Survey not found"}), 404
+    db = get_db()
+    with span("survey_load"):
+        exists = db.query(HairSurvey.survey_id).filter_by(survey_id=survey_id).first()
+    if not exists:
+        return jsonify({"error": "Survey not found"}), 404
+
+    job, _ = submit_job(db, survey_id)
+    return redirect(url_for("recommend.job_result", job_id=job.job_id))
+
+
+@recommend_bp.route("/jobs/<job_id>")
+def job_status(job_id):
+    """Lightweight poll target: one primary-key read, no result payload."""
+    db = get_db()
+    job = get_job(db, job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify({
+        "job_id": job.job_id,
+        "survey_id": job.survey_id,
+        "status": job.status,
+        "error": job.error,
+        # sections still being predicted after the page was rendered (latency budget overruns)
+        "pending": (job.result or {}).get("pending", []) if job.status == "done" else [],
+        "result_url": url_for("recommend.job_result", job_id=job.job_id),
+    })
+
+
+@recommend_bp.route("/jobs/<job_id>/result")
+def job_result(job_id):
+    db = get_db()
+    job = get_job(db, job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    if job.status == "failed":
+        flash("Could not generate recommendations.", "danger")
+        return redirect(url_for("home"))
 
-        models = load_models()
-        result = build_all_recommendations(models, survey)
-        user_id = survey.user_id
-        # Save to database
-        save_recommendations_to_db(db, survey_id, user_id, result)
+    if job.status != "done":
+        return render_template("recommendation_pending.html", job=job,
+                               max_wait_s=int(RECOMMEND_JOB_TIMEOUT.total_seconds())), 202
 
-        # Instead of returning JSON → Render template & pass result
-        return render_template("results.html", result=result, survey=survey)
+    survey = db.query(HairSurvey).filter_by(survey_id=job.survey_id).first()
+    return render_template("results.html", result=job.result, survey=survey, job_id=job.job_id)
 
-    finally:
-        db.close()
 
 @recommend_bp.route("/improved/<int:user_id>")
 def improved_recommendation(user_id):
 
-    db = SessionLocal()
+    db = get_db()
     try:
         # ───────── 1. Get latest survey (ALWAYS NEW) ─────────
-        latest_survey = (
-            db.query(HairSurvey)
-            .filter_by(user_id=user_id)
-            .order_by(HairSurvey.survey_id.desc())
-            .first()
-        )
+        with span("survey_load"):
+            latest_survey = (
+                db.query(HairSurvey)
+                .filter_by(user_id=user_id)
+                .order_by(HairSurvey.survey_id.desc())
+                .first()
+            )
 
         if not latest_survey:
             flash("No survey found.", "warning")
             return redirect(url_for("home"))
 
         # ───────── 2. Get latest recommendation per model ─────────
-        latest_recs = (
-            db.query(Recommendation)
-            .filter_by(user_id=user_id)
-            .order_by(Recommendation.rec_id.desc())
-            .all()
-        )
-
-        model_latest = {}
-        for rec in latest_recs:
-            if rec.model_id not in model_latest:
-                model_latest[rec.model_id] = rec
+        model_latest = {
+            rec.model_id: (rec, iteration)
+            for rec, iteration in get_latest_recommendations(db, user_id)
+        }
 
         # ───────── 3. Run predictions on NEW survey ─────────
-        models = load_models()
+        with span("model_load"):
+            models = load_models()
         dnn_cls = predict_dnn(models, latest_survey)
         por_cls = predict_porosity(models, latest_survey)
         brk_cls = predict_breakage(models, latest_survey)
-        dis_cls = predict_disease(models, latest_survey.survey_id)
+        dis_cls = predict_disease(models, survey_image_path(db, latest_survey.survey_id))
 
         improved_results = {
             "labels": {},
@@ -199,14 +247,15 @@ def improved_recommendation(user_id):
         }
 
         # ───────── 4. Generate recommendations ─────────
-        for model_id, rec in model_latest.items():
+        for model_id, (rec, iteration) in model_latest.items():
 
-            iteration = rec.iteration or 1
+            iteration = iteration or 1
 
             # 🔁 DNN — feedback-adaptive
             if model_id == 1:
                 improved_results["labels"]["dnn"] = LABEL_MAP["dnn_model"].get(dnn_cls)
                 improved_results["recommendations"]["dnn"] = recommend_ingredients_grouped(
+                    db,
                     model_type="dnn_model",
                     condition=dnn_cls,
                     iteration=iteration,
@@ -219,21 +268,21 @@ def improved_recommendation(user_id):
             elif model_id == 2:
                 improved_results["labels"]["porosity"] = LABEL_MAP["porosity_model"].get(por_cls)
                 improved_results["recommendations"]["porosity"] = fetch_rule(
-                    "porosity_model", por_cls
+                    db, "porosity_model", por_cls
                 )
 
             # 📘 BREAKAGE — rules
             elif model_id == 3:
                 improved_results["labels"]["breakage"] = LABEL_MAP["breakage_model"].get(brk_cls)
                 improved_results["recommendations"]["breakage"] = fetch_rule(
-                    "breakage_model", brk_cls
+                    db, "breakage_model", brk_cls
                 )
 
             # 📘 DISEASE — rules
             elif model_id == 4:
                 improved_results["labels"]["disease"] = LABEL_MAP["disease_model"].get(dis_cls)
                 improved_results["recommendations"]["disease"] = fetch_rule(
-                    "disease_model", dis_cls
+                    db, "disease_model", dis_cls
                 )
 
         # ───────── 5. Save NEW recommendations ─────────
@@ -252,12 +301,75 @@ def improved_recommendation(user_id):
 
     except Exception as e:
         db.rollback()
-        print("❌ Error in improved_recommendation:", e)
+        logger.exception("Error in improved_recommendation: %s", e)
         flash("Could not generate improved recommendations.", "danger")
         return redirect(url_for("home"))
 
-    finally:
-        db.close()
 
+# ──────────────────────────────────────────────
+# CLI: flask recommend rebuild-latest
+# ──────────────────────────────────────────────
+@recommend_bp.cli.command("rebuild-latest")
+def rebuild_latest_command():
+    """Backfill the latest-recommendation lookup from existing rows."""
+    db = get_db()
+    count = rebuild_latest_recommendations(db)
+    print(f"✅ Rebuilt {count} latest-recommendation rows.")
+
+
+# ──────────────────────────────────────────────
+# CLI: flask recommend rescore --model-id N
+# ──────────────────────────────────────────────
+@recommend_bp.cli.command("rescore")
+@click.option("--model-id", type=int, required=True, help="model_versions.model_id to tag the new rows with")
+@click.option("--model-file", default=DEFAULT_MODEL_FILE, show_default=True, help="Keras DNN to score with")
+@click.option("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, show_default=True)
+@click.option("--workers", type=int, default=0, help="process pool size (0 = score in this process)")
+@click.option("--restart", is_flag=True, help="start over even if this model_id was already rescored")
+def rescore_command(model_id, model_file, chunk_size, workers, restart):
+    """Re-score every stored survey with a new model version (resumable)."""
+    written = run_rescore(model_id, model_file=model_file, chunk_size=chunk_size, workers=workers, restart=restart)
+    print(f"✅ Wrote {written} recommendations for model_id {model_id}.")
 
 
+# ──────────────────────────────────────────────
+# CLI: flask recommend export-label-tables
+# ──────────────────────────────────────────────
+@recommend_bp.cli.command("export-label-tables")
+def export_label_tables_command():
+    """Compile the porosity/breakage pickles into JSON lookup tables (parity-checked)."""
+    tables = export_label_tables()
+    for name, table in tables.items():
+        print(f"✅ {name}: {len(table.lookup_table)} classes, parity OK")
+    print(f"✅ Wrote {LABEL_TABLES_PATH}")
+
+
+# ──────────────────────────────────────────────
+# CLI: flask recommend export-shared-artifacts
+# ──────────────────────────────────────────────
+@recommend_bp.cli.command("export-shared-artifacts")
+def export_shared_artifacts_command():
+    """Export the TF-IDF ranking index + product strings as memory-mappable .npy files."""
+    meta = export_shared_artifacts()
+    print(f"✅ {meta['rows']} products, {len(meta['vocabulary'])} terms → {SHARED_ARTIFACT_DIR} "
+          f"(restart workers to map it)")
+
+
+# ──────────────────────────────────────────────
+# CLI: flask recommend export-quantized --model dnn --mode int8
+# ──────────────────────────────────────────────
+@recommend_bp.cli.command("export-quantized")
+@click.option("--model", "model_key", type=click.Choice(sorted(MODEL_FILES)), required=True)
+@click.option("--mode", type=click.Choice(MODES), default="int8", show_default=True)
+@click.option("--threshold", type=float, default=0.98, show_default=True, help="min held-out top-1 agreement")
+@click.option("--holdout", type=float, default=0.2, show_default=True, help="fraction kept out of calibration")
+def export_quantized_command(model_key, mode, threshold, holdout):
+    """Export a quantized .tflite artifact, gated on agreement with the float model."""
+    try:
+        report = export_quantized(model_key, mode=mode, threshold=threshold, holdout=holdout)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    print(f"✅ {report['model']}/{report['mode']}: top-1 agreement {report['top1_agreement']:.2%} "
+          f"on {report['holdout_samples']} held-out samples, "
+          f"{report['source_size_bytes'] / 2**20:.1f} MB → {report['size_bytes'] / 2**20:.2f} MB")
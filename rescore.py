@@ -0,0 +1,197 @@
+# rescore.py
+"""
+Offline bulk re-scoring of every stored survey with a (new) DNN model version.
+
+    flask recommend rescore --model-id 5 --model-file models/DNN_hair_Health_classifier_v2.h5 --workers 4
+    flask recommend rescore --model-id 5 --model-file … --restart   # score the same version again
+
+Surveys are streamed in survey_id order, encoded and predicted one chunk at a time,
+and bulk-inserted as Recommendation rows tagged with --model-id. Each chunk commits
+together with its checkpoint row and the latest-recommendation lookup rows of its
+users for that model, so a crashed run resumes after the last committed survey
+instead of starting over (or writing duplicates). A finished run is a no-op until
+--restart resets its checkpoint; rows written by earlier runs are kept.
+"""
+import os
+import json
+import logging
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, insert
+
+from db import SessionLocal, engine
+from models import HairSurvey, ModelVersion, Recommendation, RescoreCheckpoint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_FILE = os.path.join("models", "DNN_hair_Health_classifier_v1.h5")
+DEFAULT_CHUNK_SIZE = 500
+
+
+# ──────────────────────────────────────────────
+# READ: surveys in chunks
+# ──────────────────────────────────────────────
+def iter_survey_chunks(after_survey_id, chunk_size):
+    """Yield lists of survey dicts with survey_id > after_survey_id, in survey_id order."""
+    table = HairSurvey.__table__
+    if engine.dialect.name == "sqlite":
+        # no server-side cursors, and an open read cursor would block the chunk commits →
+        # one keyset query per chunk instead
+        last = after_survey_id
+        while True:
+            stmt = select(table).where(table.c.survey_id > last).order_by(table.c.survey_id).limit(chunk_size)
+            with engine.connect() as conn:
+                rows = [dict(r) for r in conn.execute(stmt).mappings()]
+            if not rows:
+                return
+            yield rows
+            last = rows[-1]["survey_id"]
+
+    stmt = select(table).where(table.c.survey_id > after_survey_id).order_by(table.c.survey_id)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        for part in result.mappings().partitions(chunk_size):
+            yield [dict(r) for r in part]
+
+
+# ──────────────────────────────────────────────
+# SCORE: runs in the parent or in pool workers
+# ──────────────────────────────────────────────
+_model = None
+
+
+def _init_worker(model_file):
+    global _model
+    import tensorflow as tf
+    _model = tf.keras.models.load_model(model_file)
+
+
+def score_chunk(rows):
+    """rows → (survey_ids, user_ids, predicted classes). Needs _init_worker() first."""
+    from feature_engineering import encode_survey_frame
+
+    X = encode_survey_frame(pd.DataFrame(rows))
+    classes = np.argmax(_model.predict(X, verbose=0), axis=1)
+    return [r["survey_id"] for r in rows], [r["user_id"] for r in rows], [int(c) for c in classes]
+
+
+def _scored_chunks(chunks, model_file, workers):
+    if workers <= 1:
+        _init_worker(model_file)
+        for rows in chunks:
+            yield score_chunk(rows)
+        return
+
+    # spawn, not fork: TensorFlow in the parent is not fork-safe
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=get_context("spawn"),
+        initializer=_init_worker, initargs=(model_file,),
+    ) as pool:
+        pending = deque()
+        for rows in chunks:
+            pending.append(pool.submit(score_chunk, rows))
+            # results are consumed in submission order so checkpoints only ever move forward;
+            # bounding in-flight chunks keeps memory flat
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# ──────────────────────────────────────────────
+# WRITE: one transaction per chunk (rows + rollups + checkpoint)
+# ──────────────────────────────────────────────
+def _get_checkpoint(db, model_id, restart=False):
+    job_id = f"rescore:{model_id}"
+    checkpoint = db.get(RescoreCheckpoint, job_id)
+    now = datetime.now()
+    if checkpoint is None:
+        checkpoint = RescoreCheckpoint(job_id=job_id, model_id=model_id)
+        db.add(checkpoint)
+    elif not restart:
+        return checkpoint
+    checkpoint.last_survey_id = 0
+    checkpoint.processed = 0
+    checkpoint.started_at = checkpoint.updated_at = now
+    checkpoint.finished_at = None
+    db.commit()
+    return checkpoint
+
+
+def _write_chunk(db, checkpoint, model_id, scored, label_map, rec_json):
+    from analytics import bump_rollup
+    from recommendation_lookup import refresh_latest_recommendations
+
+    survey_ids, user_ids, classes = scored
+    now = datetime.now()
+    rows = [
+        {
+            "survey_id": survey_id,
+            "user_id": user_id,
+            "model_id": model_id,
+            "model_prediction": label_map.get(cls),
+            "recommendation_json": rec_json(cls),
+            "created_at": now,
+        }
+        for survey_id, user_id, cls in zip(survey_ids, user_ids, classes)
+    ]
+    db.execute(insert(Recommendation), rows)
+    refresh_latest_recommendations(db, model_id, user_ids)
+
+    for label, count in Counter(r["model_prediction"] for r in rows).items():
+        bump_rollup(db, now.date(), model_id, label, recommendations=count)
+
+    checkpoint.last_survey_id = survey_ids[-1]
+    checkpoint.processed += len(rows)
+    checkpoint.updated_at = now
+    db.commit()
+
+
+def run_rescore(model_id, model_file=DEFAULT_MODEL_FILE, chunk_size=DEFAULT_CHUNK_SIZE, workers=0, restart=False):
+    """
+    Re-score all surveys not yet covered by the checkpoint (all of them with restart=True).
+    Returns rows written this run.
+    """
+    from predictions import LABEL_MAP, recommend_ingredients_grouped
+
+    # a private session, passed to the ranking helpers too
+    db = SessionLocal.session_factory()
+    try:
+        if db.query(ModelVersion.model_id).filter_by(model_id=model_id).first() is None:
+            raise ValueError(f"model_id {model_id} is not in model_versions")
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(model_file)
+
+        checkpoint = _get_checkpoint(db, model_id, restart=restart)
+        if checkpoint.finished_at is not None:
+            logger.info("rescore:%s already finished at %s (--restart to run it again)",
+                        model_id, checkpoint.finished_at)
+            return 0
+
+        label_map = LABEL_MAP["dnn_model"]
+        cache = {}
+
+        def rec_json(cls):
+            # only a handful of classes → rank ingredients once per class, not once per survey
+            if cls not in cache:
+                cache[cls] = json.dumps(recommend_ingredients_grouped(db, "dnn_model", cls, top_n=3))
+            return cache[cls]
+
+        written = 0
+        chunks = iter_survey_chunks(checkpoint.last_survey_id, chunk_size)
+        for scored in _scored_chunks(chunks, model_file, workers):
+            _write_chunk(db, checkpoint, model_id, scored, label_map, rec_json)
+            written += len(scored[0])
+            logger.info("rescore:%s %d surveys (up to survey_id %d)",
+                        model_id, checkpoint.processed, checkpoint.last_survey_id)
+
+        checkpoint.finished_at = datetime.now()
+        db.commit()
+        return written
+    finally:
+        db.close()
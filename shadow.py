@@ -0,0 +1,174 @@
+# shadow.py
+"""
+Shadow scoring: a candidate DNN version scores a sample of live requests in a
+small background pool, off the request path. Results land in shadow_predictions
+next to the live label; the admin dashboard shows agreement and latency per label.
+
+    SHADOW_MODEL_FILE=models/DNN_hair_Health_classifier_v2.h5
+    SHADOW_MODEL_ID=5              model_versions row of the candidate (optional)
+    SHADOW_SAMPLE_RATE=0.1         fraction of live predictions to shadow
+    SHADOW_WORKERS=1               background threads
+    SHADOW_MAX_PENDING=32          queued jobs beyond this are dropped, never waited on
+"""
+import os
+import random
+import logging
+import threading
+from time import perf_counter
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sqlalchemy import func, case
+
+from db import SessionLocal
+from models import ShadowPrediction
+from metrics import Counter, Histogram, register
+from memory_registry import tracked_load
+
+logger = logging.getLogger(__name__)
+
+SHADOW_MODEL_FILE = os.getenv("SHADOW_MODEL_FILE")
+SHADOW_MODEL_ID = int(os.getenv("SHADOW_MODEL_ID", "0")) or None
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "1"))
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "32"))
+
+SHADOW_SECONDS = register(Histogram(
+    "ai_hair_shadow_seconds", "Candidate model inference time in the shadow pool.", "outcome"
+))
+SHADOW_SKIPPED = register(Counter(
+    "ai_hair_shadow_skipped_total", "Sampled requests the shadow pool did not score.", "reason"
+))
+
+_pool = None
+_slots = threading.BoundedSemaphore(SHADOW_MAX_PENDING)
+_model_lock = threading.Lock()
+_model = None
+_model_failed = False
+
+
+def shadow_enabled():
+    return bool(SHADOW_MODEL_FILE) and not _model_failed
+
+
+def _candidate():
+    """Load the candidate once, on the first shadow job (never in a request thread)."""
+    global _model, _model_failed
+    with _model_lock:
+        if _model is None and not _model_failed:
+            from quantize import load_inference_model, INFERENCE_BACKEND
+            try:
+                # same backend and warm-up as the live DNN, so latencies and outputs compare like for like
+                _model = tracked_load(
+                    "shadow_dnn_model", INFERENCE_BACKEND, lambda: load_inference_model(SHADOW_MODEL_FILE),
+                    optional=True, expected_bytes=os.path.getsize(SHADOW_MODEL_FILE),
+                )
+            except Exception:
+                logger.exception("shadow: could not load %s", SHADOW_MODEL_FILE)
+            _model_failed = _model is None
+        return _model
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _model_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=SHADOW_WORKERS, thread_name_prefix="shadow")
+    return _pool
+
+
+# ──────────────────────────────────────────────
+# SUBMIT (request thread — must never block)
+# ──────────────────────────────────────────────
+def submit_shadow(features, live_cls, live_seconds, survey_id=None, label_map=None):
+    """Maybe queue a candidate prediction for `features` (the exact array the live model saw)."""
+    if not shadow_enabled() or random.random() >= SHADOW_SAMPLE_RATE:
+        return False
+    if not _slots.acquire(blocking=False):
+        SHADOW_SKIPPED.inc("queue_full")
+        return False
+
+    label_map = label_map or {}
+    job = (np.array(features, copy=True), label_map.get(live_cls, live_cls), live_seconds, survey_id, label_map)
+    try:
+        future = _get_pool().submit(_score, *job)
+    except RuntimeError:  # interpreter shutting down
+        _slots.release()
+        return False
+    future.add_done_callback(lambda _: _slots.release())
+    return True
+
+
+# ──────────────────────────────────────────────
+# SCORE + RECORD (shadow thread)
+# ──────────────────────────────────────────────
+def _score(features, live_label, live_seconds, survey_id, label_map):
+    model = _candidate()
+    if model is None:
+        SHADOW_SKIPPED.inc("model_unavailable")
+        return
+
+    start = perf_counter()
+    try:
+        pred = model.predict(features, verbose=0)
+    except Exception:
+        SHADOW_SECONDS.observe("error", perf_counter() - start)
+        logger.exception("shadow: candidate predict failed")
+        return
+    elapsed = perf_counter() - start
+    SHADOW_SECONDS.observe("ok", elapsed)
+
+    cls = int(np.argmax(pred, axis=1)[0])
+    db = SessionLocal.session_factory()  # own session: this thread has no request scope
+    try:
+        db.add(ShadowPrediction(
+            survey_id=survey_id,
+            candidate_model_id=SHADOW_MODEL_ID,
+            live_prediction=None if live_label is None else str(live_label),
+            candidate_prediction=str(label_map.get(cls, cls)),
+            live_ms=live_seconds * 1000.0,
+            candidate_ms=elapsed * 1000.0,
+            created_at=datetime.now(),
+        ))
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("shadow: could not record prediction")
+    finally:
+        db.close()
+
+
+# ──────────────────────────────────────────────
+# REPORT
+# ──────────────────────────────────────────────
+def shadow_summary(db, days=7):
+    """Per (candidate, live label): volume, agreement rate and mean latencies."""
+    since = datetime.now() - timedelta(days=days)
+    agree = func.sum(case((ShadowPrediction.live_prediction == ShadowPrediction.candidate_prediction, 1), else_=0))
+    rows = (
+        db.query(
+            ShadowPrediction.candidate_model_id,
+            ShadowPrediction.live_prediction,
+            func.count(),
+            agree,
+            func.avg(ShadowPrediction.live_ms),
+            func.avg(ShadowPrediction.candidate_ms),
+        )
+        .filter(ShadowPrediction.created_at >= since)
+        .group_by(ShadowPrediction.candidate_model_id, ShadowPrediction.live_prediction)
+        .order_by(ShadowPrediction.candidate_model_id, ShadowPrediction.live_prediction)
+        .all()
+    )
+    return [
+        {
+            "candidate_model_id": model_id,
+            "live_prediction": label,
+            "count": count,
+            "agreement_rate": (agreed or 0) / count if count else None,
+            "live_ms": round(live_ms, 2) if live_ms is not None else None,
+            "candidate_ms": round(candidate_ms, 2) if candidate_ms is not None else None,
+        }
+        for model_id, label, count, agreed, live_ms, candidate_ms in rows
+    ]
@@ -0,0 +1,225 @@
+# shared_artifacts.py
+"""
+Read-only ingredient ranking data as flat files that every worker memory-maps.
+
+    flask recommend export-shared-artifacts     # products_clean → models/shared/ (re-run when products change)
+
+Without an export each worker reads products_clean and fits its own TF-IDF index
+(and keeps its own copy of the product strings). With one, the CSR arrays, the
+vectorizer's idf weights and the ingredient / function strings are opened with
+np.load(mmap_mode="r"): the pages live in the OS page cache once, however many
+workers map them, and nothing is rebuilt at import time.
+
+Strings are stored as one UTF-8 byte buffer + int64 offsets per column, so a lookup
+decodes only the rows a recommendation actually returns.
+
+Forking servers call preload() in the master (see gunicorn.conf.py) — workers then
+inherit the open maps instead of opening their own. Keras weights are not covered:
+TensorFlow copies them into its own buffers and must not be initialised before fork;
+the TFLite backend (INFERENCE_BACKEND=tflite) already maps its flatbuffer from disk.
+
+    SHARED_ARTIFACT_DIR=models/shared
+"""
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+SHARED_ARTIFACT_DIR = os.getenv("SHARED_ARTIFACT_DIR", os.path.join("models", "shared"))
+META_FILE = "meta.json"
+ARRAYS = ("tfidf_data", "tfidf_indices", "tfidf_indptr", "idf",
+          "ingredients_utf8", "ingredients_offsets", "functions_utf8", "functions_offsets")
+
+
+# ──────────────────────────────────────────────
+# STRING COLUMNS
+# ──────────────────────────────────────────────
+def encode_strings(values):
+    """list[str] → (uint8 UTF-8 buffer, int64 offsets of length n + 1)."""
+    encoded = [str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+class StringColumn:
+    """Row i of a buffer + offsets pair, decoded on access."""
+
+    def __init__(self, buffer, offsets):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    @property
+    def nbytes(self):
+        return int(self.buffer.nbytes + self.offsets.nbytes)
+
+
+# ──────────────────────────────────────────────
+# RANKING INDEX
+# ──────────────────────────────────────────────
+class RankingIndex:
+    """
+    TF-IDF over the distinct (ingredients, functions) product pairs. Row vectors are
+    L2-normalised by the vectorizer, so a cosine similarity is one sparse mat-vec.
+    """
+
+    def __init__(self, vectorizer, matrix, ingredients, functions, mapped=False):
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.ingredients = ingredients
+        self.functions = functions
+        self.mapped = mapped
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @classmethod
+    def build(cls, products):
+        """In-process index from a products_clean DataFrame (no export needed)."""
+        pairs = products[["ingredients", "functions"]].dropna().drop_duplicates().reset_index(drop=True)
+        vectorizer = TfidfVectorizer(stop_words="english")
+        matrix = vectorizer.fit_transform(pairs["functions"].fillna("")).tocsr()
+        return cls(vectorizer, matrix, pairs["ingredients"].tolist(), pairs["functions"].tolist())
+
+    @classmethod
+    def load(cls, directory=SHARED_ARTIFACT_DIR):
+        """Memory-map an exported index; None when there is no (complete) export."""
+        meta_path = os.path.join(directory, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        try:
+            arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+        except FileNotFoundError as e:
+            logger.warning("incomplete shared artifact export in %s (%s) — ignoring it", directory, e)
+            return None
+
+        vectorizer = TfidfVectorizer(stop_words="english", vocabulary=meta["vocabulary"])
+        vectorizer.idf_ = arrays["idf"]
+        matrix = sp.csr_matrix(
+            (arrays["tfidf_data"], arrays["tfidf_indices"], arrays["tfidf_indptr"]),
+            shape=tuple(meta["shape"]), copy=False,
+        )
+        return cls(
+            vectorizer, matrix,
+            StringColumn(arrays["ingredients_utf8"], arrays["ingredients_offsets"]),
+            StringColumn(arrays["functions_utf8"], arrays["functions_offsets"]),
+            mapped=True,
+        )
+
+    def export(self, directory=SHARED_ARTIFACT_DIR):
+        """Write the flat files; meta.json goes last so readers never see a partial export."""
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, META_FILE)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+        ingredients = encode_strings(self.ingredients[i] for i in range(len(self)))
+        functions = encode_strings(self.functions[i] for i in range(len(self)))
+        arrays = {
+            "tfidf_data": self.matrix.data,
+            "tfidf_indices": self.matrix.indices,
+            "tfidf_indptr": self.matrix.indptr,
+            "idf": self.vectorizer.idf_,
+            "ingredients_utf8": ingredients[0], "ingredients_offsets": ingredients[1],
+            "functions_utf8": functions[0], "functions_offsets": functions[1],
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+
+        vocabulary = sorted(self.vectorizer.vocabulary_, key=self.vectorizer.vocabulary_.get)
+        meta = {
+            "version": 1,
+            "rows": len(self),
+            "shape": list(self.matrix.shape),
+            "vocabulary": vocabulary,
+            "built_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, meta_path)
+        return meta
+
+    def scores(self, text):
+        """Cosine similarity of `text` to every row (float64, one per row)."""
+        query = self.vectorizer.transform([text])
+        return np.asarray((self.matrix @ query.T).todense()).ravel()
+
+    @property
+    def nbytes(self):
+        strings = sum(
+            col.nbytes if isinstance(col, StringColumn) else sum(len(s) for s in col)
+            for col in (self.ingredients, self.functions)
+        )
+        m = self.matrix
+        return int(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes + strings)
+
+
+# ──────────────────────────────────────────────
+# PROCESS-WIDE INSTANCE
+# ──────────────────────────────────────────────
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_ranking_index(build=None):
+    """
+    The process's RankingIndex: the memory-mapped export when there is one, else
+    build() (predictions passes a products_clean loader). Opened once per process —
+    or once in a forking master, via preload().
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = RankingIndex.load()
+                if index is None:
+                    if build is None:
+                        return None
+                    logger.warning("%s has no export, building the ranking index in memory — "
+                                   "run `flask recommend export-shared-artifacts`", SHARED_ARTIFACT_DIR)
+                    index = build()
+                _index = index
+    return _index
+
+
+def preload():
+    """
+    Open the exported artifacts and fault their pages in, before workers are forked.
+    Imports nothing that starts threads (no TensorFlow), so it is safe in a master.
+    """
+    index = get_ranking_index()
+    if index is None:
+        logger.info("no shared artifacts in %s to preload", SHARED_ARTIFACT_DIR)
+        return None
+    m = index.matrix
+    for array in (m.data, m.indices, m.indptr, index.ingredients.buffer, index.functions.buffer):
+        np.add.reduce(array, dtype=np.float64)  # read every page once → page cache
+    logger.info("preloaded shared artifacts: %d rows, %.1f MB mapped", len(index), index.nbytes / 2**20)
+    return index
+
+
+def export_shared_artifacts(directory=SHARED_ARTIFACT_DIR):
+    """products_clean → flat files in `directory`. Returns the written metadata."""
+    import pandas as pd
+    from sqlalchemy import text
+    from db import engine
+
+    with engine.connect() as conn:
+        products = pd.read_sql(text("SELECT ingredients, functions FROM products_clean"), conn)
+    return RankingIndex.build(products).export(directory)
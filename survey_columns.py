@@ -0,0 +1,65 @@
+# survey_columns.py
+"""Google Form question headers → HairSurvey column names."""
+
+FORM_COLUMN_MAP = {
+    "Timestamp": "created_at",
+    "Score": "Score",
+    "Age": "Age",
+    "Race": "Race",
+    "Gender": "Gender",
+    "Country": "Country",
+    "Hair type": "Hair_type",
+    "Hair porosity": "Hair_porosity",
+    "Hair texture": "Hair_texture",
+    "Hair density": "Hair_density",
+    "Harline condition": "Harline_condition",
+    "Hair edges condition": "Hair_edges_condition",
+    "Hair Loss state": "Hair_Loss_state",
+    "Hair Breakage": "Hair_Breakage",
+    "Hair length: [Current Hair Length]": "Hair_length_Current_Hair_Length",
+    "Hair length: [Hair goal]": "Hair_length_Hair_goal",
+    "Hair look": "Hair_look",
+    "Current Hair condition": "Current_Hair_condition",
+    "Scalp condition": "Scalp_condition",
+    "Ingredient promotes your hair health?": "Ingredient_promotes_your_hair_health",
+    "Is your hair chemically treated?": "Is_your_hair_chemically_treated",
+    "Keratin Treatment": "Keratin_Treatment",
+    "Professional treatments": "Professional_treatments",
+    "Protective hairstyles, No. 1?": "Protective_hairstyles_No_1",
+    "Protective hairstyles, No. 2?": "Protective_hairstyles_No_2",
+    "Condition of protective hairstyles used.": "Condition_of_protective_hairstyles_used",
+    "Protective hairstyles maintenance": "Protective_hairstyles_maintenance",
+    "How often do you: [Heat-styling tools]": "How_often_do_you_Heatstyling_tools",
+    "How often do you: [Tight hairstyle]": "How_often_do_you_Tight_hairstyle",
+    "How often do you: [Hair moisturizer]": "How_often_do_you_Hair_moisturizer",
+    "How often do you: [Scalp massages]": "How_often_do_you_Scalp_massages",
+    "How often do you: [Hair Wash]": "How_often_do_you_Hair_Wash",
+    "Occurrence of hair breakage?": "Occurrence_of_hair_breakage",
+    "Causes of hair breakage": "Causes_of_hair_breakage",
+    "Other (please specify):": "Other_please_specify",
+    "Comb type": "Comb_type",
+    "Detangling style": "Detangling_style",
+    "Hair Supplement used": "Hair_Supplement_used",
+    "medication or Condition affecting Hair growth": "medication_or_Condition_affecting_Hair_growth",
+    "Hair or scalp allergies": "Hair_or_scalp_allergies",
+    "Family history of hair loss or slow growth": "Family_history_of_hair_loss_or_slow_growth",
+    "Eating diet": "Eating_diet",
+    "Consumed water/day (L)": "Consumed_water_per_day_L",
+    "Consumed_water_per_day_L": "Consumed_water_per_day_L",
+    "Satin scarf/bonnet or pillowcase": "Satin_scarfbonnet_or_pillowcase",
+    "Main factor influencing your hair health or growth": "Main_factor_influencing_your_hair_health_or_growth",
+    "Tips or products have worked well for your hair": "Tips_or_products_have_worked_well_for_your_hair",
+    "Hair state and their cause: [Hydrated & Healthy]": "Hair_state_and_their_cause_Hydrated__Healthy",
+    "Hair state and their cause: [Promote Frizzy]": "Hair_state_and_their_cause_Promote_Frizzy",
+    "Hair state and their cause: [Tangled]": "Hair_state_and_their_cause_Tangled",
+    "Hair state and their cause: [dryness & breaking]": "Hair_state_and_their_cause_dryness__breaking",
+    "Would you participate in follow-up studies?": "Would_you_participate_in_followup_studies",
+    "Email": "Email",
+    "Email address": "Email_address",
+}
+
+
+def rename_form_columns(df):
+    """Rename a Google Form export's headers to HairSurvey columns, dropping unmapped ones."""
+    keep = [h for h in df.columns if str(h).strip() in FORM_COLUMN_MAP]
+    return df[keep].rename(columns=lambda h: FORM_COLUMN_MAP[str(h).strip()])
@@ -0,0 +1,80 @@
+# survey_drafts.py
+import os
+from datetime import datetime, timedelta
+
+from models import SurveyDraft, HairSurvey
+
+# Drafts untouched for longer than this are treated as abandoned
+DRAFT_TTL = timedelta(hours=float(os.getenv("SURVEY_DRAFT_TTL_HOURS", "72")))
+
+
+def _is_stale(draft):
+    return draft.updated_at is not None and datetime.now() - draft.updated_at > DRAFT_TTL
+
+
+# ──────────────────────────────────────────────
+# READ
+# ──────────────────────────────────────────────
+def get_draft(db, user_id):
+    """
+    Return the user's current draft answers as a dict ({} if none or expired).
+    Always one primary-key read: any worker may have written the draft last, so a
+    per-process copy would pre-fill pages with stale answers.
+    """
+    draft = db.get(SurveyDraft, user_id)
+    return {} if draft is None or _is_stale(draft) else dict(draft.data or {})
+
+
+# ──────────────────────────────────────────────
+# WRITE: partial upsert per wizard page
+# ──────────────────────────────────────────────
+def update_draft(db, user_id, fields):
+    """Merge `fields` into the user's draft and commit. Returns the merged dict."""
+    draft = db.get(SurveyDraft, user_id)
+    if draft is None:
+        draft = SurveyDraft(user_id=user_id, data={})
+        db.add(draft)
+    elif _is_stale(draft):
+        draft.data = {}
+
+    merged = dict(draft.data or {})
+    merged.update(fields)
+    draft.data = merged  # reassign so the JSON column is marked dirty
+    draft.updated_at = datetime.now()
+    db.commit()
+
+    return merged
+
+
+# ──────────────────────────────────────────────
+# PROMOTE: final page → HairSurvey row
+# ──────────────────────────────────────────────
+def promote_draft(db, user_id, fields):
+    """
+    Merge the last page's `fields` into the draft and insert it as a single
+    HairSurvey row, deleting the draft in the same transaction.
+    Returns the new survey_id.
+    """
+    draft = db.get(SurveyDraft, user_id)
+    data = {} if draft is None or _is_stale(draft) else dict(draft.data or {})
+    data.update(fields)
+    data["user_id"] = user_id
+
+    survey_entry = HairSurvey(**data)
+    db.add(survey_entry)
+    if draft is not None:
+        db.delete(draft)
+    db.commit()
+
+    return survey_entry.survey_id
+
+
+# ──────────────────────────────────────────────
+# CLEANUP
+# ──────────────────────────────────────────────
+def purge_stale_drafts(db):
+    """Delete drafts older than DRAFT_TTL. Returns the number removed."""
+    cutoff = datetime.now() - DRAFT_TTL
+    removed = db.query(SurveyDraft).filter(SurveyDraft.updated_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return removed
@@ -0,0 +1,201 @@
+# survey_import.py
+"""
+Bulk ingestion of Google Form survey exports into hairsurvey.
+
+    flask survey import-form "Hair Care Survey_v2 (Responses) - Form responses 1.csv"
+    flask survey import-form wave3.csv --chunk-size 5000 --score      # + one DNN call per chunk
+
+Headers are mapped through survey_columns.FORM_COLUMN_MAP (unmapped questions are
+dropped). The CSV is read IMPORT_CHUNK_SIZE rows at a time; every cleaning step is a
+whole-column pandas operation, and each chunk is one bulk INSERT + commit.
+
+A response is a duplicate when (respondent, timestamp to the minute) is already in
+hairsurvey or earlier in the run — respondent being the lower-cased email, blank for
+anonymous answers. Minutes, because older imports stored timestamps without seconds.
+"""
+import os
+import json
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert, select, func
+
+from db import SessionLocal
+from models import HairSurvey, Recommendation
+from survey_columns import rename_form_columns
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "2000"))
+SURVEY_COLUMNS = [c.name for c in HairSurvey.__table__.columns if c.name not in ("survey_id", "user_id")]
+WATER = "Consumed_water_per_day_L"
+MAX_WATER_LITRES = 10.0  # larger daily amounts are typos or another unit, not data
+WATER_UNITS = {
+    "": 1.0,  # a bare number is litres
+    **dict.fromkeys(("l", "lt", "lts", "ltr", "ltrs", "litre", "litres", "liter", "liters"), 1.0),
+    **dict.fromkeys(("ml", "mls", "millilitre", "millilitres", "milliliter", "milliliters"), 0.001),
+    **dict.fromkeys(("cup", "cups"), 0.25),
+}
+DNN_MODEL_ID = 1
+
+
+# ──────────────────────────────────────────────
+# CLEANING (vectorized, one chunk at a time)
+# ──────────────────────────────────────────────
+def parse_water_litres(values):
+    """
+    Free-text daily water answers → litres (float, NaN when there is no amount).
+    Handles '2', '1.5L', '2 litres', '500mL', '1/2', '1L - 2L' / '500ml to 1l' (midpoint,
+    each side in its own unit), '2 cups'. Non-volume units ('500g') and amounts over
+    MAX_WATER_LITRES come out NaN.
+    """
+    text = values.astype("string").str.lower().str.strip()
+    number = r"(\d+(?:[.,]\d+)?)"
+    unit = r"\s*((?!to\b)[a-z]+)?"  # any word but the range separator; checked against WATER_UNITS
+    parts = text.str.extract(rf"{number}{unit}\s*(?:(-|to|/)\s*{number}{unit})?")
+    first = pd.to_numeric(parts[0].str.replace(",", ".", regex=False), errors="coerce").astype("float64")
+    second = pd.to_numeric(parts[3].str.replace(",", ".", regex=False), errors="coerce").astype("float64")
+    separator = parts[2].fillna("")
+
+    # a side without a unit takes the other side's ('1-2L', '500ml - 1'); neither → litres
+    first_unit = parts[1].fillna(parts[4]).fillna("")
+    second_unit = parts[4].fillna(parts[1]).fillna("")
+    first_factor = first_unit.map(WATER_UNITS).astype("float64")
+    second_factor = second_unit.map(WATER_UNITS).astype("float64")
+
+    litres = first * first_factor
+    litres = litres.mask(separator.isin(["-", "to"]), (first * first_factor + second * second_factor) / 2)
+    litres = litres.mask(separator == "/", first / second * second_factor)
+    return litres.mask(litres > MAX_WATER_LITRES)
+
+
+def clean_chunk(raw):
+    """Form export chunk (all strings) → DataFrame with exactly SURVEY_COLUMNS."""
+    df = rename_form_columns(raw)
+    df = df.loc[:, ~df.columns.duplicated()]  # two headers map to the water column
+    df = df.reindex(columns=SURVEY_COLUMNS)
+
+    text_columns = [c for c in SURVEY_COLUMNS if c != WATER]
+    # unanswered questions are stored as '' (what the survey encoder was fitted on)
+    df[text_columns] = df[text_columns].fillna("").apply(lambda col: col.astype(str).str.strip())
+    df[WATER] = parse_water_litres(df[WATER])
+    return df
+
+
+def dedup_keys(created_at, email, email_address):
+    """(minute, respondent) keys for aligned Series of raw hairsurvey values."""
+    minute = pd.to_datetime(created_at, dayfirst=True, format="mixed", errors="coerce").dt.strftime("%d/%m/%Y %H:%M")
+    minute = minute.fillna(created_at.astype(str).str.strip())
+    address = email_address.fillna("").astype(str).str.strip().str.lower()
+    respondent = address.where(address != "", email.fillna("").astype(str).str.strip().str.lower())
+    return list(zip(minute, respondent))
+
+
+def _existing_keys(db, minutes):
+    table = HairSurvey.__table__
+    prefixes = sorted({m[:16] for m in minutes})
+    if not prefixes:
+        return set()
+    # older rows are 'dd/mm/yyyy HH:MM', newer 'dd/mm/yyyy HH:MM:SS' → compare the minute prefix
+    rows = db.execute(
+        select(table.c.created_at, table.c.Email, table.c.Email_address)
+        .where(func.substr(table.c.created_at, 1, 16).in_(prefixes))
+    ).all()
+    if not rows:
+        return set()
+    existing = pd.DataFrame(rows, columns=["created_at", "Email", "Email_address"])
+    return set(dedup_keys(existing["created_at"], existing["Email"], existing["Email_address"]))
+
+
+# ──────────────────────────────────────────────
+# OPTIONAL BATCH SCORING
+# ──────────────────────────────────────────────
+class ChunkScorer:
+    """One DNN call per imported chunk; rows are written as model_id 1 recommendations."""
+
+    def __init__(self):
+        from quantize import MODEL_FILES, load_inference_model
+        from predictions import LABEL_MAP
+
+        self.model = load_inference_model(MODEL_FILES["dnn"])
+        self.label_map = LABEL_MAP["dnn_model"]
+        self._rec_json = {}
+
+    def rec_json(self, db, cls):
+        from predictions import recommend_ingredients_grouped
+
+        if cls not in self._rec_json:
+            self._rec_json[cls] = json.dumps(recommend_ingredients_grouped(db, "dnn_model", cls, top_n=3))
+        return self._rec_json[cls]
+
+    def score(self, db, df, survey_ids):
+        from collections import Counter
+        from analytics import bump_rollup
+        from feature_engineering import encode_survey_frame
+
+        X = encode_survey_frame(df.assign(survey_id=survey_ids))
+        classes = np.argmax(self.model.predict(X, verbose=0), axis=1)
+        now = datetime.now()
+        rows = [
+            {
+                "survey_id": survey_id,
+                "user_id": None,
+                "model_id": DNN_MODEL_ID,
+                "model_prediction": self.label_map.get(int(cls)),
+                "recommendation_json": self.rec_json(db, int(cls)),
+                "created_at": now,
+            }
+            for survey_id, cls in zip(survey_ids, classes)
+        ]
+        db.execute(insert(Recommendation), rows)
+        for label, count in Counter(r["model_prediction"] for r in rows).items():
+            bump_rollup(db, now.date(), DNN_MODEL_ID, label, recommendations=count)
+        return len(rows)
+
+
+# ──────────────────────────────────────────────
+# IMPORT
+# ──────────────────────────────────────────────
+def import_form_csv(path, chunk_size=IMPORT_CHUNK_SIZE, score=False):
+    """Returns {"read", "inserted", "duplicates", "scored"} for the run."""
+    stats = {"read": 0, "inserted": 0, "duplicates": 0, "scored": 0}
+    scorer = ChunkScorer() if score else None
+    table = HairSurvey.__table__
+    seen = set()
+
+    # a private session: this also runs outside any request (CLI)
+    db = SessionLocal.session_factory()
+    try:
+        reader = pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False, na_values=[""])
+        for raw in reader:
+            df = clean_chunk(raw)
+            stats["read"] += len(df)
+
+            keys = dedup_keys(df["created_at"], df["Email"], df["Email_address"])
+            existing = _existing_keys(db, [k[0] for k in keys])
+            keep = np.zeros(len(keys), dtype=bool)
+            for i, key in enumerate(keys):
+                keep[i] = key not in seen and key not in existing
+                seen.add(key)
+            df = df[keep]
+            stats["duplicates"] += len(keys) - len(df)
+            if df.empty:
+                continue
+
+            records = df.replace({np.nan: None}).to_dict("records")
+            survey_ids = db.execute(
+                insert(table).returning(table.c.survey_id, sort_by_parameter_order=True), records
+            ).scalars().all()
+            stats["inserted"] += len(survey_ids)
+            if scorer is not None:
+                stats["scored"] += scorer.score(db, df, survey_ids)
+            db.commit()
+            logger.info("import %s: %d read, %d inserted so far", path, stats["read"], stats["inserted"])
+        return stats
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
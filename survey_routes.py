@@ -1,7 +1,9 @@
 # survey_routes.py
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
-from db import SessionLocal
-from models import HairSurvey
+from db import get_db
+from survey_drafts import get_draft, update_draft, promote_draft, purge_stale_drafts
+from survey_import import import_form_csv, IMPORT_CHUNK_SIZE
+import click
 
 survey_bp = Blueprint('survey', __name__, url_prefix='/survey')
 
@@ -15,56 +17,57 @@ def require_login_redirect():
 def page2():
     if not require_login_redirect():
         return redirect(url_for('login'))
+    user_id = session['user_id']
+    db = get_db()
     if request.method == 'POST':
-        session['survey_data'] = session.get('survey_data', {})
-        session['survey_data'].update({
+        update_draft(db, user_id, {
             'Age': request.form.get('age'),
             'Race': request.form.get('race'),
             'Gender': request.form.get('gender'),
             'Country': request.form.get('country'),
         })
         return redirect(url_for('survey.page3'))
-    return render_template('page2.html', survey=session.get('survey_data', {}))
+    return render_template('page2.html', survey=get_draft(db, user_id))
 
 
 @survey_bp.route('/page3', methods=['GET', 'POST'])
 def page3():
     if not require_login_redirect():
         return redirect(url_for('login'))
+    user_id = session['user_id']
+    db = get_db()
     if request.method == 'POST':
-        # load, update, then REASSIGN to session so Flask persists nested dict changes
-        survey_data = session.get('survey_data', {})
-        survey_data.update({
+        # partial upsert of this page's answers into the server-side draft
+        survey_data = update_draft(db, user_id, {
             'Hair_type': request.form.get('hair_type'),
             'Hair_porosity': request.form.get('hair_porosity'),
             'Hair_texture': request.form.get('hair_texture'),
             'Hair_density': request.form.get('hair_density'),
         })
-        session['survey_data'] = survey_data  # <--- crucial
         # small log entry for debugging (won't affect DB)
-        current_app.logger.info("Survey page3 saved to session: %s", survey_data)
+        current_app.logger.info("Survey page3 saved to draft: %s", survey_data)
         return redirect(url_for('survey.page4'))
-    return render_template('page3.html', survey=session.get('survey_data', {}))
+    return render_template('page3.html', survey=get_draft(db, user_id))
 
 
 @survey_bp.route('/page4', methods=['GET', 'POST'])
 def page4():
     if not require_login_redirect():
         return redirect(url_for('login'))
+    user_id = session['user_id']
+    db = get_db()
     if request.method == 'POST':
-        # load, update, then REASSIGN to session so Flask persists nested dict changes
-        survey_data = session.get('survey_data', {})
-        survey_data.update({
+        # partial upsert of this page's answers into the server-side draft
+        survey_data = update_draft(db, user_id, {
             'Hair_edges_condition': request.form.get('hair_edges_condition'),
             'Hair_Loss_state': request.form.get('hair_loss_state'),
             'Hair_Breakage': request.form.get('hair_breakage'),
             'Current_Hair_condition': request.form.get('current_hair_condition'),
         })
-        session['survey_data'] = survey_data  # <--- crucial
         # small log entry for debugging (won't affect DB)
-        current_app.logger.info("Survey page4 saved to session: %s", survey_data)
+        current_app.logger.info("Survey page4 saved to draft: %s", survey_data)
         return redirect(url_for('survey.page5'))
-    return render_template('page4.html', survey=session.get('survey_data', {}))
+    return render_template('page4.html', survey=get_draft(db, user_id))
 
 
 @survey_bp.route('/page5', methods=['GET', 'POST'])
@@ -73,34 +76,27 @@ def page5():
 
     if not require_login_redirect():
         return redirect(url_for('login'))
+    user_id = session['user_id']
 
     if request.method == 'POST':
-        session['survey_data'].update({
+        last_page = {
             'Eating_diet': request.form.get('Eating_diet'),
             'Consumed_water_per_day_L': request.form.get('Consumed_water_per_day_L'),
             'Hair_length_Current_Hair_Length': request.form.get('Hair_length_Current_Hair_Length'),
             'Hair_length_Hair_goal': request.form.get('Hair_length_Hair_goal'),
             'Satin_scarfbonnet_or_pillowcase': request.form.get('satin_scarfbonnet_or_pillowcase'),
-        })
-
-        survey_data = session.get('survey_data', {})
-        survey_data['user_id'] = session.get('user_id')
+        }
 
-        # persist to DB safely
+        # promote draft → hairsurvey row (single INSERT, draft deleted in same txn)
+        db = get_db()
         try:
-            with SessionLocal() as db:
-                survey_entry = HairSurvey(**survey_data)
-                db.add(survey_entry)
-                db.commit()
-                db.refresh(survey_entry)
-                saved_id = survey_entry.survey_id
+            saved_id = promote_draft(db, user_id, last_page)
 
         except Exception as e:
+            db.rollback()
             flash(f"Error saving survey: {e}", "danger")
-            return render_template('page5.html', survey=session.get('survey_data', {}))
+            return render_template('page5.html', survey={**get_draft(db, user_id), **last_page})
 
-        # clear session data
-        session.pop('survey_data', None)
         flash("Survey saved successfully — thank you!", "success")
 
         # If user clicked Next -> go to diagnostic with real survey id
@@ -110,4 +106,30 @@ def page5():
         # If user clicked Save -> send to a success page or dashboard (adjust as desired)
         return redirect(url_for('diagnostic.diagnostic_choice', survey_id=saved_id))
 
-    return render_template('page5.html', survey=session.get('survey_data', {}))
+    db = get_db()
+    return render_template('page5.html', survey=get_draft(db, user_id))
+
+
+# ──────────────────────────────────────────────
+# CLI: flask survey purge-drafts
+# ──────────────────────────────────────────────
+@survey_bp.cli.command("purge-drafts")
+def purge_drafts_command():
+    """Delete survey drafts left unfinished for longer than SURVEY_DRAFT_TTL_HOURS."""
+    db = get_db()
+    removed = purge_stale_drafts(db)
+    print(f"✅ Removed {removed} stale survey drafts.")
+
+
+# ──────────────────────────────────────────────
+# CLI: flask survey import-form <export.csv>
+# ──────────────────────────────────────────────
+@survey_bp.cli.command("import-form")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, show_default=True)
+@click.option("--score/--no-score", default=False, help="also predict each chunk with the DNN (one batched call)")
+def import_form_command(csv_path, chunk_size, score):
+    """Bulk-load a Google Form responses export into hairsurvey (duplicates skipped)."""
+    stats = import_form_csv(csv_path, chunk_size=chunk_size, score=score)
+    print(f"✅ Read {stats['read']} responses: {stats['inserted']} inserted, "
+          f"{stats['duplicates']} duplicates skipped, {stats['scored']} scored.")
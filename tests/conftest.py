@@ -0,0 +1,105 @@
+# tests/conftest.py
+"""
+Shared fixtures: the app running in-process against a scratch copy of the SQLite
+restore (python local_db.py), so tests never write to the configured database.
+
+db.py reads DATABASE_URL at import, so the environment is set here, before any test
+module imports the app. Every test in a session shares the one scratch database.
+"""
+import os
+import shutil
+import tempfile
+import itertools
+
+import pytest
+
+from local_db import restore_dump, DEFAULT_SQLITE
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRATCH = tempfile.mkdtemp(prefix="ai_hair_tests_")
+SCRATCH_DB = os.path.join(SCRATCH, "tests.db")
+HISTORY_PAGE_SIZE = 2   # small, so an export of the flow's recommendations spans several pages
+
+os.chdir(REPO_ROOT)     # model paths are relative to the repo root
+restore_dump(sqlite_path=DEFAULT_SQLITE)
+shutil.copyfile(DEFAULT_SQLITE, SCRATCH_DB)
+os.environ["DATABASE_URL"] = f"sqlite:///{SCRATCH_DB}?timeout=30"
+os.environ["UPLOAD_ROOT"] = os.path.join(SCRATCH, "uploads")
+os.environ["HISTORY_PAGE_SIZE"] = str(HISTORY_PAGE_SIZE)
+os.environ["DRIFT_MONITOR"] = "0"  # test surveys are not live traffic
+
+# wizard form field → hairsurvey column, per survey page
+PAGE_FIELDS = {
+    "page2": {"age": "Age", "race": "Race", "gender": "Gender", "country": "Country"},
+    "page3": {"hair_type": "Hair_type", "hair_porosity": "Hair_porosity",
+              "hair_texture": "Hair_texture", "hair_density": "Hair_density"},
+    "page4": {"hair_edges_condition": "Hair_edges_condition", "hair_loss_state": "Hair_Loss_state",
+              "hair_breakage": "Hair_Breakage", "current_hair_condition": "Current_Hair_condition"},
+    "page5": {"Eating_diet": "Eating_diet", "Consumed_water_per_day_L": "Consumed_water_per_day_L",
+              "Hair_length_Current_Hair_Length": "Hair_length_Current_Hair_Length",
+              "Hair_length_Hair_goal": "Hair_length_Hair_goal",
+              "satin_scarfbonnet_or_pillowcase": "Satin_scarfbonnet_or_pillowcase"},
+}
+SCALP_IMAGE = os.path.join(REPO_ROOT, "static", "uploads", "158.jpg")
+
+_emails = itertools.count()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    import sys
+    if "db" in sys.modules:
+        sys.modules["db"].engine.dispose()
+    shutil.rmtree(SCRATCH, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app as flask_app
+    flask_app.config["TESTING"] = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def new_user(app):
+    """Register a fresh user and log `client` in as them. Returns the user_id."""
+    def login(client):
+        email = f"user-{os.getpid()}-{next(_emails)}@example.test"
+        client.post("/register", data={"name": "Test User", "email": email, "password": "pw"})
+        resp = client.post("/login", data={"email": email, "password": "pw"})
+        assert "/survey/page2" in resp.location, "login failed"
+        with client.session_transaction() as session:
+            return session["user_id"]
+    return login
+
+
+@pytest.fixture(scope="session")
+def survey_forms(app):
+    """Wizard form data per page, answered like a stored survey (porosity, breakage and water set)."""
+    from db import SessionLocal
+    from models import HairSurvey
+
+    db = SessionLocal.session_factory()
+    try:
+        survey = (
+            db.query(HairSurvey)
+            .filter(HairSurvey.Hair_porosity != "", HairSurvey.Hair_Breakage != "",
+                    HairSurvey.Consumed_water_per_day_L > 0)
+            .order_by(HairSurvey.survey_id)
+            .first()
+        )
+    finally:
+        db.close()
+    return {
+        page: {name: "" if getattr(survey, col) is None else str(getattr(survey, col)) for name, col in fields.items()}
+        for page, fields in PAGE_FIELDS.items()
+    }
+
+
+@pytest.fixture(scope="session")
+def scalp_image():
+    return SCALP_IMAGE
@@ -0,0 +1,151 @@
+# tests/test_checkout_counts.py
+"""
+Connection checkouts per page: every request should use one database connection.
+
+    python -m pytest tests/test_checkout_counts.py -q
+
+Walks the flow with the Flask test client (see conftest.py) and counts pool
+checkouts made by the request thread only — background recommendation jobs, drift
+flushes and shadow scoring open their own sessions. A route may make more than one
+checkout only when listed in MAX_CHECKOUTS; the history export is bounded by its
+page count.
+"""
+import re
+import time
+import math
+import threading
+from collections import defaultdict
+
+import pytest
+
+DEFAULT_MAX = 1
+MAX_CHECKOUTS = {
+    # the request's session + the model_rules version re-read (run_flow makes it due here)
+    "GET /recommend/jobs/<id>/result": 2,
+}
+HISTORY_ROUTE = "GET /user/<id>/history.ndjson"  # 1 auth check + 1 connection per page, see below
+
+
+# ──────────────────────────────────────────────
+# COUNTING
+# ──────────────────────────────────────────────
+class CheckoutCounter:
+    """Pool 'checkout' events per route, for one thread."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.thread = threading.get_ident()
+        self.route = None
+        self.counts = defaultdict(list)
+        event.listen(engine, "checkout", self._on_checkout)
+
+    def _on_checkout(self, *_):
+        if self.route is not None and threading.get_ident() == self.thread:
+            self.counts[self.route][-1] += 1
+
+    def measure(self, route, fn):
+        self.route = route
+        self.counts[route].append(0)
+        try:
+            return fn()
+        finally:
+            self.route = None
+
+
+# ──────────────────────────────────────────────
+# FLOW
+# ──────────────────────────────────────────────
+def run_flow(client, counter, survey_forms, image):
+    """Walk the user flow + admin pages once. Returns the new user's id."""
+    from fragment_cache import invalidate
+
+    def read(resp):
+        resp.get_data()  # streamed bodies (the history export) run their queries while being read
+        return resp
+
+    def get(route, path):
+        return counter.measure(route, lambda: read(client.get(path)))
+
+    def post(route, path, data, **kwargs):
+        return counter.measure(route, lambda: read(client.post(path, data=data, **kwargs)))
+
+    email = f"checkouts-{time.time_ns()}@example.test"
+    get("GET /register", "/register")
+    post("POST /register", "/register", {"name": "Checkout Count", "email": email, "password": "pw"})
+    get("GET /login", "/login")
+    resp = post("POST /login", "/login", {"email": email, "password": "pw"})
+    assert "/survey/page2" in resp.location, "login failed"
+
+    for page, form in survey_forms.items():
+        get(f"GET /survey/{page}", f"/survey/{page}")
+        resp = post(f"POST /survey/{page}", f"/survey/{page}", form)
+    survey_id = int(re.search(r"/diagnostic_choice/(\d+)", resp.location).group(1))
+
+    get("GET /diagnostic_choice/<id>", f"/diagnostic_choice/{survey_id}")
+    with open(image, "rb") as f:
+        post("POST /imagesaved/<id>", f"/imagesaved/{survey_id}",
+             {"survey_id": survey_id, "image_file": (f, "scalp.jpg")},
+             content_type="multipart/form-data")
+    get("GET /user_type/<id>", f"/user_type/{survey_id}")
+
+    resp = get("GET /recommend/build_all_recommendations/<id>", f"/recommend/build_all_recommendations/{survey_id}")
+    job_id = re.search(r"/recommend/jobs/(\w+)/result", resp.location).group(1)
+    status = "queued"
+    while status in ("queued", "running"):
+        time.sleep(0.2)
+        status = get("GET /recommend/jobs/<id>", f"/recommend/jobs/{job_id}").get_json()["status"]
+    assert status == "done", f"recommendation job {status}"
+    # the rules version is re-read on a request thread once RULES_VERSION_TTL_S lapses —
+    # make it due so that checkout is counted instead of depending on test order
+    invalidate()
+    get("GET /recommend/jobs/<id>/result", f"/recommend/jobs/{job_id}/result")
+
+    html = get("GET /feedback/<survey_id>", f"/feedback/{survey_id}").get_data(as_text=True)
+    rec_ids = list(dict.fromkeys(re.findall(r'name="rec_(\d+)"', html)))
+    user_id = int(re.search(r"/feedback/submit/(\d+)", html).group(1))
+    ratings = {f"rec_{rid}": "0" if i % 2 else "1" for i, rid in enumerate(rec_ids)}
+    post("POST /feedback/submit/<user_id>", f"/feedback/submit/{user_id}", ratings)
+    get("GET /recommend/improved/<user_id>", f"/recommend/improved/{user_id}")
+
+    get(HISTORY_ROUTE, f"/user/{user_id}/history.ndjson")
+    get("GET /admin/", "/admin/")
+    get("GET /admin/analytics", "/admin/analytics")
+    return user_id
+
+
+# ──────────────────────────────────────────────
+# TEST
+# ──────────────────────────────────────────────
+@pytest.fixture(scope="module")
+def flow(app, survey_forms, scalp_image):
+    """(checkouts per route, user_id) for one walk of the user flow + admin pages."""
+    from db import engine
+
+    counter = CheckoutCounter(engine)
+    user_id = run_flow(app.test_client(), counter, survey_forms, scalp_image)
+    return dict(counter.counts), user_id
+
+
+def test_every_route_within_checkout_budget(flow):
+    counts, _ = flow
+    over = {
+        route: route_counts for route, route_counts in counts.items()
+        if route != HISTORY_ROUTE and max(route_counts) > MAX_CHECKOUTS.get(route, DEFAULT_MAX)
+    }
+    assert not over, f"routes over their checkout budget (checkouts per request): {over}"
+
+
+def test_history_export_one_checkout_per_page(flow):
+    from db import SessionLocal
+    from models import Recommendation
+    from history_export import HISTORY_PAGE_SIZE
+
+    counts, user_id = flow
+    db = SessionLocal.session_factory()
+    try:
+        rows = db.query(Recommendation).filter_by(user_id=user_id).count()
+    finally:
+        db.close()
+    assert rows > HISTORY_PAGE_SIZE, "the export should span several pages"
+    assert counts[HISTORY_ROUTE] == [1 + math.ceil(rows / HISTORY_PAGE_SIZE)]
@@ -0,0 +1,24 @@
+# tests/test_history_export.py
+"""Access control on the streamed history export (user_routes.history_ndjson / history_csv)."""
+import pytest
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_owner_can_export_own_history(app, new_user, fmt):
+    client = app.test_client()
+    user_id = new_user(client)
+    assert client.get(f"/user/{user_id}/history.{fmt}").status_code == 200
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_other_users_history_is_forbidden(app, new_user, fmt):
+    owner, intruder = app.test_client(), app.test_client()
+    owner_id = new_user(owner)
+    new_user(intruder)
+    assert intruder.get(f"/user/{owner_id}/history.{fmt}").status_code == 403
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_anonymous_history_is_forbidden(app, new_user, fmt):
+    owner_id = new_user(app.test_client())
+    assert app.test_client().get(f"/user/{owner_id}/history.{fmt}").status_code == 403
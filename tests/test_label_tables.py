@@ -0,0 +1,56 @@
+# tests/test_label_tables.py
+"""Parity of the JSON label tables with the porosity / breakage LabelEncoder pickles."""
+import json
+import pickle
+
+import pytest
+
+from label_tables import LabelTable, SOURCES, LABEL_TABLES_PATH, check_parity, export_label_tables, load_label_tables
+
+
+def _encoder(name):
+    with open(SOURCES[name], "rb") as f:
+        return pickle.load(f)
+
+
+@pytest.mark.parametrize("name", sorted(SOURCES))
+def test_table_matches_pickle(name):
+    encoder = _encoder(name)
+    assert check_parity(encoder, LabelTable.from_encoder(encoder)) == []
+
+
+def test_committed_artifact_matches_fresh_export(tmp_path):
+    fresh = tmp_path / "label_tables.json"
+    export_label_tables(path=str(fresh))
+    with open(LABEL_TABLES_PATH) as f:
+        committed = json.load(f)
+    exported = json.loads(fresh.read_text())
+    assert committed["sources"] == exported["sources"]
+    assert committed["tables"] == exported["tables"]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("High", 0),
+    ("  high  ", 0),
+    ("MEDIUM", 2),
+    ("\tLow\n", 1),
+    ("", None),
+    ("   ", None),
+    (None, None),
+    (float("nan"), None),
+    ("Very high", None),
+])
+def test_porosity_lookup_variants(value, expected):
+    assert load_label_tables()["porosity_model"].lookup(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("Extreme- High Breakage", 0),
+    (" low breakage ", 3),
+    ("MEDIUM BREAKAGE", 4),
+    ("", None),
+    (None, None),
+    ("No breakage", None),
+])
+def test_breakage_lookup_variants(value, expected):
+    assert load_label_tables()["breakage_model"].lookup(value) == expected
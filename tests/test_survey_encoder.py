@@ -0,0 +1,54 @@
+# tests/test_survey_encoder.py
+"""SurveyEncoder.transform_batch must equal transform(), one row at a time, on any input."""
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from feature_engineering import load_encoder
+
+
+@pytest.fixture(scope="module")
+def encoder():
+    return load_encoder()
+
+
+@pytest.fixture(scope="module")
+def surveys(encoder):
+    """Stored hairsurvey rows plus rows with unseen, missing and mixed-case answers."""
+    from db import engine
+
+    with engine.connect() as conn:
+        df = pd.read_sql(text("SELECT * FROM hairsurvey ORDER BY survey_id"), conn)
+    categorical = encoder.ordinal_columns + encoder.nominal_columns + encoder.binary_columns
+    base = df.iloc[0]
+    edge = [
+        base.to_dict() | {col: "never seen before" for col in categorical},
+        base.to_dict() | {col: np.nan for col in categorical},
+        base.to_dict() | {col: None for col in categorical},
+        base.to_dict() | {col: f"  {str(base[col]).upper()} " for col in categorical},
+        base.to_dict() | {col: "" for col in categorical},
+    ]
+    df = pd.concat([df, pd.DataFrame(edge)], ignore_index=True)
+    # what encode_survey_data feeds the encoder
+    df["Consumed_water_per_day_L"] = pd.to_numeric(df["Consumed_water_per_day_L"], errors="coerce").fillna(0)
+    return df
+
+
+@pytest.fixture(scope="module")
+def row_by_row(encoder, surveys):
+    return np.vstack([encoder.transform(surveys.iloc[[i]]).to_numpy(dtype=float) for i in range(len(surveys))])
+
+
+def test_stored_surveys_present(surveys):
+    assert len(surveys) > 100
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 10_000])
+def test_transform_batch_matches_row_by_row(encoder, surveys, row_by_row, chunk_size):
+    assert len(surveys) % 7 and len(surveys) % 64  # chunks that do not divide the rows evenly
+    np.testing.assert_array_equal(encoder.transform_batch(surveys, chunk_size=chunk_size), row_by_row)
+
+
+def test_transform_batch_matches_whole_frame(encoder, surveys):
+    np.testing.assert_array_equal(encoder.transform_batch(surveys), encoder.transform(surveys).to_numpy(dtype=float))
@@ -0,0 +1,160 @@
+# upload_store.py
+import os
+import hashlib
+import tempfile
+
+from PIL import Image
+
+from models import SurveyImage
+
+# -------------------------
+#   CONFIG
+# -------------------------
+UPLOAD_ROOT = os.getenv("UPLOAD_ROOT", os.path.join("static", "uploads"))
+STATIC_DIR = "static"
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "10")) * 1024 * 1024)
+CHUNK_SIZE = 64 * 1024
+PREVIEW_SIZE = (256, 256)
+
+# PIL format name → stored extension
+FORMAT_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+
+
+def _default_tmp_dir():
+    # next to UPLOAD_ROOT (same filesystem → os.replace stays atomic), but never inside the
+    # served static/ tree: partial and rejected uploads must not be reachable by URL
+    parent = os.path.dirname(os.path.abspath(UPLOAD_ROOT))
+    static = os.path.abspath(STATIC_DIR)
+    if parent == static or parent.startswith(static + os.sep):
+        parent = os.path.dirname(static)
+    return os.path.join(parent, ".upload-tmp")
+
+
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or _default_tmp_dir()
+
+
+class UploadError(Exception):
+    """Upload rejected (too large, empty or not a supported image)."""
+
+
+# -------------------------
+#  LAYOUT
+# -------------------------
+def _shard_dir(content_hash):
+    # ab/cd/abcd1234… keeps every directory small
+    return os.path.join(UPLOAD_ROOT, content_hash[:2], content_hash[2:4])
+
+
+def _stream_to_temp(stream, max_bytes):
+    """Copy `stream` to a temp file in chunks, hashing as we go. Returns (tmp_path, sha256, size)."""
+    os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_TMP_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"Image is larger than {max_bytes / (1024 * 1024):g} MB.")
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    if size == 0:
+        os.remove(tmp_path)
+        raise UploadError("Uploaded file is empty.")
+    return tmp_path, digest.hexdigest(), size
+
+
+def _detect_extension(path):
+    try:
+        with Image.open(path) as img:
+            img.verify()
+            fmt = img.format
+    except Exception:
+        fmt = None
+    if fmt not in FORMAT_EXTENSIONS:
+        raise UploadError("Invalid image format.")
+    return FORMAT_EXTENSIONS[fmt]
+
+
+def _write_preview(src_path, preview_path):
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_TMP_DIR, suffix=".part")
+    os.close(fd)
+    try:
+        with Image.open(src_path) as img:
+            img = img.convert("RGB")
+            img.thumbnail(PREVIEW_SIZE)
+            img.save(tmp_path, "JPEG", quality=80)
+        os.replace(tmp_path, preview_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+# -------------------------
+#  WRITE
+# -------------------------
+def store_image(file_storage, max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Stream an uploaded file to content-addressed storage.
+    Identical images are stored once; the preview is generated only
+    when the original is first written.
+    Returns (content_hash, path, preview_path, size).
+    """
+    tmp_path, content_hash, size = _stream_to_temp(file_storage.stream, max_bytes)
+    try:
+        ext = _detect_extension(tmp_path)
+    except UploadError:
+        os.remove(tmp_path)
+        raise
+
+    shard = _shard_dir(content_hash)
+    os.makedirs(shard, exist_ok=True)
+    path = os.path.join(shard, f"{content_hash}.{ext}")
+    preview_path = os.path.join(shard, f"{content_hash}_preview.jpg")
+
+    if os.path.exists(path):
+        os.remove(tmp_path)  # duplicate → reuse existing file
+    else:
+        os.replace(tmp_path, path)
+
+    if not os.path.exists(preview_path):
+        _write_preview(path, preview_path)
+
+    return content_hash, path, preview_path, size
+
+
+def save_survey_image(db, survey_id, file_storage):
+    """Store the upload and record it as the image for `survey_id`. Commits."""
+    content_hash, path, preview_path, size = store_image(file_storage)
+
+    mapping = db.get(SurveyImage, survey_id)
+    if mapping is None:
+        mapping = SurveyImage(survey_id=survey_id)
+        db.add(mapping)
+    mapping.content_hash = content_hash
+    mapping.path = path
+    mapping.preview_path = preview_path
+    mapping.size_bytes = size
+    db.commit()
+    return mapping
+
+
+# -------------------------
+#  READ
+# -------------------------
+def survey_image_path(db, survey_id):
+    """Path of the image stored for a survey (falls back to the legacy {survey_id}.jpg)."""
+    mapping = db.get(SurveyImage, survey_id)
+    if mapping is not None and os.path.exists(mapping.path):
+        return mapping.path
+
+    legacy = os.path.join(UPLOAD_ROOT, f"{survey_id}.jpg")
+    return legacy if os.path.exists(legacy) else None
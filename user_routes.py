@@ -1,19 +1,47 @@
 # user_routes.py
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from db import SessionLocal
-from models import HairSurvey
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, Response, abort
+from db import get_db
+from models import HairSurvey, User
+from history_export import stream_ndjson, stream_csv
 
 user_bp = Blueprint("user", __name__, url_prefix="")
 
 @user_bp.route("/user_type/<int:survey_id>")
 def user_type(survey_id):
     """Landing: choose New or Returning user."""
-    db = SessionLocal()
-    survey = db.query(HairSurvey).filter_by(survey_id=survey_id).first()
-    db.close()
+    survey = get_db().query(HairSurvey).filter_by(survey_id=survey_id).first()
 
     user_id = survey.user_id
     print("✅ user: MATCH FOUND →", user_id)
     print("✅ survey: MATCH FOUND →", survey_id)
 
-    return render_template("user_types.html", survey_id=survey_id, user_id=user_id)
\ No newline at end of file
+    return render_template("user_types.html", survey_id=survey_id, user_id=user_id)
+
+
+# ──────────────────────────────────────────────
+# HISTORY EXPORT (streamed, see history_export.py)
+# ──────────────────────────────────────────────
+def _require_user(user_id):
+    """Only the logged-in owner may export a history."""
+    if session.get("user_id") != user_id:
+        abort(403)
+    if get_db().query(User.user_id).filter_by(user_id=user_id).first() is None:
+        abort(404)
+
+
+@user_bp.route("/user/<int:user_id>/history.ndjson")
+def history_ndjson(user_id):
+    _require_user(user_id)
+    return Response(stream_ndjson(user_id), mimetype="application/x-ndjson", headers={
+        "Content-Disposition": f"attachment; filename=history_{user_id}.ndjson",
+        "X-Accel-Buffering": "no",
+    })
+
+
+@user_bp.route("/user/<int:user_id>/history.csv")
+def history_csv(user_id):
+    _require_user(user_id)
+    return Response(stream_csv(user_id), mimetype="text/csv", headers={
+        "Content-Disposition": f"attachment; filename=history_{user_id}.csv",
+        "X-Accel-Buffering": "no",
+    })